@@ -1,8 +1,16 @@
 from flask import Flask, render_template, send_from_directory
 import os
-from db.get_db_access_connection import get_db_connection
+import mimetypes
+from db.get_db_access_connection import get_db_pool, executar_com_reconexao, _is_connection_error
+from db.must_api import (colunas_tabela, colunas_numericas, montar_consulta, executar_consulta,
+                         abrir_stream, versao_dados, chave_requisicao, CacheRespostas, etag_arquivo,
+                         LIMIT_TODOS, MIMETYPE_NDJSON, ParametroInvalido)
+from db.access_pool import PoolTimeoutError
+from db.compressao import (Compressao, precomprimir_diretorio, arquivo_precomprimido,
+                           escolher_codificacao, SUFIXOS)
 import pyodbc
-from flask import jsonify
+from flask import jsonify, request
+from werkzeug.security import safe_join
 
 
 #gunicorn --bind 0.0.0.0:8080 app:app
@@ -19,6 +27,8 @@ class PikachuServer:
         Chama os métodos para configurar o site e as rotas.
         """
         self.app = None
+        # Respostas de /api/data por versão dos dados (import_data.py invalida)
+        self.cache_respostas = CacheRespostas()
         self.setup_website()
         self.setup_routes()
 
@@ -32,6 +42,22 @@ class PikachuServer:
         # O '.' indica que a pasta raiz do projeto é o diretório atual.
         self.app = Flask(__name__, template_folder='templates', static_folder='static')
 
+        # gzip/brotli: estáticos pré-comprimidos agora, respostas dinâmicas no after_request
+        precomprimir_diretorio(self.app.static_folder)
+        self.compressao = Compressao(self.app)
+
+    def resposta_condicional(self, corpo, etag, mimetype='application/json', headers=None):
+        """
+        Monta a resposta com ETag forte; se o If-None-Match do cliente bate,
+        devolve 304 sem corpo. `no-cache` obriga o navegador a revalidar.
+        """
+        response = self.app.response_class(corpo, mimetype=mimetype)
+        response.headers.update(headers or {})
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept'
+        return response.make_conditional(request)
+
     def setup_routes(self):
         """
         Define todas as rotas da aplicação web.
@@ -59,34 +85,104 @@ class PikachuServer:
                 O arquivo solicitado do diretório raiz.
             """
             # Envia arquivos como 'must_tables_PDF_notes_merged.json' para o cliente.
-            return send_from_directory(self.app.static_folder, filename)
+            # ETag = hash do conteúdo: recarregar a página custa só um 304.
+            caminho = safe_join(self.app.static_folder, filename)
+            if caminho and os.path.isfile(caminho):
+                # Irmão .br/.gz gerado no startup, se o cliente aceitar
+                disponiveis = [c for c in SUFIXOS if arquivo_precomprimido(caminho, c)]
+                codificacao = escolher_codificacao(request.accept_encodings, disponiveis)
+                if codificacao:
+                    comprimido = caminho + SUFIXOS[codificacao]
+                    response = send_from_directory(
+                        self.app.static_folder, filename + SUFIXOS[codificacao],
+                        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                        etag=etag_arquivo(comprimido) or True)
+                    response.headers['Content-Encoding'] = codificacao
+                    response.vary.add('Accept-Encoding')
+                    if response.status_code == 200:
+                        self.compressao.registrar(request.url_rule.rule, os.path.getsize(caminho),
+                                                  os.path.getsize(comprimido))
+                    return response
+            etag = etag_arquivo(caminho) if caminho else None
+            response = send_from_directory(self.app.static_folder, filename, etag=etag or True)
+            if response.status_code == 200:
+                tamanho = os.path.getsize(caminho)
+                self.compressao.registrar(request.url_rule.rule, tamanho, tamanho)
+            return response
         
 
         @self.app.route('/api/data')
         def get_data():
             """
-            Rota de API que busca todos os dados da tabela no SQL Server
-            e os retorna em formato JSON.
+            Rota de API que busca os dados da tabela no SQL Server e os retorna
+            em formato JSON, uma página por vez.
+
+            Query string (tudo resolvido no SQL):
+                fields=EMPRESA,Cód ONS        projeção de colunas
+                empresa=..&cod_ons=..&tensao=..   filtros (vários valores separados por vírgula)
+                limit=500&after=<id>          paginação por chave (keyset)
+                page=3                        página numerada, alternativa ao `after`
+                limit=all                     tabela inteira (filtrada), em streaming
+
+            Com `Accept: application/x-ndjson` (ou limit=all) a resposta é
+            enviada em streaming: o cursor é lido com fetchmany e cada bloco é
+            codificado e enviado na hora (JSON array ou NDJSON), sem montar a
+            tabela inteira em memória. Essas respostas não passam pelo cache.
+
+            Cabeçalhos da resposta:
+                X-Total-Count   total de linhas que atendem aos filtros
+                X-Next-Cursor   valor de `after` para a próxima página (ausente na última)
+                ETag            hash do corpo; com If-None-Match igual a resposta é 304
+
+            As respostas ficam em cache até o import_data.py gravar uma nova
+            versão dos dados: repetir a mesma consulta não toca o banco.
+
+            As conexões vêm do pool do SQL Server (pre-ping no checkout e
+            reconexão quando a conexão cai), não de um login novo por requisição.
             """
+            pool = get_db_pool()
             conn = None
+            descartar = False
             try:
-                conn = get_db_connection()
-                if not conn:
-                    return jsonify({"error": "Falha na conexão com o banco de dados"}), 500
-                
-                cursor = conn.cursor()
-                # O nome da tabela deve ser o mesmo definido no script de importação
-                cursor.execute("SELECT * FROM MustTablesPdfNotes") 
-                
-                # Obtém os nomes das colunas a partir do cursor
-                columns = [column[0] for column in cursor.description]
-                
-                # Cria uma lista de dicionários para facilitar a conversão para JSON
-                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-                
-                return jsonify(rows)
-
+                ndjson = request.accept_mimetypes.best_match(['application/json', MIMETYPE_NDJSON]) == MIMETYPE_NDJSON
+                if ndjson or request.args.get('limit') == LIMIT_TODOS:
+                    conn = pool.acquire()
+                    consulta = montar_consulta(request.args, colunas_tabela(conn), colunas_numericas(conn))
+                    stream_conn = conn
+                    total, corpo = abrir_stream(conn, consulta, self.app.json.dumps, ndjson=ndjson,
+                                                liberar=lambda: pool.release(stream_conn))
+                    conn = None  # devolvida ao pool pelo stream ao terminar
+
+                    response = self.app.response_class(
+                        corpo, mimetype=MIMETYPE_NDJSON if ndjson else 'application/json')
+                    response.headers['X-Total-Count'] = str(total)
+                    response.headers['Vary'] = 'Accept'
+                    return response
+
+                versao = versao_dados()
+                chave = chave_requisicao(request.args)
+                item = self.cache_respostas.get(versao, chave)
+                if item is None:
+                    def consultar(conexao):
+                        return executar_consulta(conexao, montar_consulta(request.args, colunas_tabela(conexao),
+                                                                          colunas_numericas(conexao)))
+
+                    resultado = executar_com_reconexao(consultar, pool)
+
+                    headers = {'X-Total-Count': str(resultado['total'])}
+                    if resultado['proximo'] is not None:
+                        headers['X-Next-Cursor'] = str(resultado['proximo'])
+                    item = self.cache_respostas.put(versao, chave, jsonify(resultado['linhas']).get_data(), headers)
+
+                return self.resposta_condicional(item.corpo, item.etag, headers=item.headers)
+
+            except ParametroInvalido as e:
+                return jsonify({"error": str(e)}), 400
+            except PoolTimeoutError as e:
+                print(f"Pool de conexões esgotado: {e}")
+                return jsonify({"error": "Servidor ocupado, tente novamente"}), 503
             except pyodbc.Error as e:
+                descartar = _is_connection_error(e)
                 print(f"Erro ao buscar dados: {e}")
                 return jsonify({"error": "Ocorreu um erro ao consultar o banco de dados"}), 500
             except Exception as e:
@@ -94,7 +190,12 @@ class PikachuServer:
                 return jsonify({"error": "Ocorreu um erro interno no servidor"}), 500
             finally:
                 if conn:
-                    conn.close()
+                    pool.release(conn, discard=descartar)
+
+        @self.app.route('/api/compressao')
+        def get_compressao_stats():
+            """Bytes originais, enviados e economizados pela compressão, por rota."""
+            return jsonify(self.compressao.stats())
 
     def run_server(self, host='0.0.0.0', port=8080):
         """
@@ -0,0 +1,144 @@
+# db/access_cache.py
+"""
+Cache em memória das tabelas de lookup do Access
+
+Tabelas pequenas e lidas o tempo todo (tb_DicionarioVariavel,
+tb_variaveisSelecionadas) são carregadas uma vez e mantidas por
+`LOOKUP_CACHE_TTL` segundos, junto com mapas id -> valor já montados.
+Qualquer escrita na tabela (salvar/atualizar/deletar) invalida a entrada.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CACHE_TTL = float(os.getenv("ACCESS_LOOKUP_CACHE_TTL", "300"))
+
+# Tabelas mantidas em cache
+CACHED_TABLES = ('tb_DicionarioVariavel', 'tb_variaveisSelecionadas')
+
+
+def _db_key(db_path) -> str:
+    return os.path.normcase(os.path.abspath(str(db_path)))
+
+
+class LookupCache:
+    """Cache thread-safe de tabelas inteiras com TTL e invalidação por escrita"""
+
+    def __init__(self, ttl: float = LOOKUP_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (banco, tabela) -> {'expira': float, 'df': DataFrame, 'maps': {(chave, valor): dict}}
+        self._entries: Dict[tuple, Dict[str, Any]] = {}
+        # Versão por (banco, tabela): uma carga iniciada antes de uma escrita não é guardada
+        self._versions: Dict[tuple, int] = {}
+        self.metrics = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _entry(self, db_path, table: str, loader: Callable[[], pd.DataFrame]) -> Dict[str, Any]:
+        key = (_db_key(db_path), table)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expira'] > time.monotonic():
+                self.metrics['hits'] += 1
+                return entry
+            self.metrics['misses'] += 1
+            versao = self._versions.get(key, 0)
+
+        df = loader()
+        entry = {'expira': time.monotonic() + self.ttl, 'df': df, 'maps': {}}
+
+        with self._lock:
+            if self._versions.get(key, 0) == versao:
+                self._entries[key] = entry
+        return entry
+
+    def get_table(self, db_path, table: str, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Retorna a tabela do cache ou a carrega com `loader`
+
+        O DataFrame é compartilhado: quem precisar alterá-lo deve usar .copy().
+        """
+        return self._entry(db_path, table, loader)['df']
+
+    def get_map(self, db_path, table: str, key_col: str, value_col: str,
+                loader: Callable[[], pd.DataFrame]) -> Dict[Any, Any]:
+        """
+        Retorna um dicionário key_col -> value_col montado a partir da tabela
+
+        Linhas com chave ou valor vazios são ignoradas; em chaves repetidas
+        vale a primeira ocorrência.
+        """
+        entry = self._entry(db_path, table, loader)
+        mapa = entry['maps'].get((key_col, value_col))
+        if mapa is None:
+            df = entry['df']
+            if df.empty or key_col not in df.columns or value_col not in df.columns:
+                mapa = {}
+            else:
+                validos = df[[key_col, value_col]].dropna()
+                validos = validos[(validos[key_col] != 0) & (validos[value_col] != '')]
+                validos = validos.drop_duplicates(subset=key_col, keep='first')
+                mapa = dict(zip(validos[key_col], validos[value_col]))
+            entry['maps'][(key_col, value_col)] = mapa
+        return mapa
+
+    def invalidate(self, db_path, table: Optional[str] = None) -> None:
+        """Descarta a tabela (ou todas as tabelas do banco, se table=None)"""
+        db_key = _db_key(db_path)
+        with self._lock:
+            if table is None:
+                keys = [k for k in set(self._entries) | set(self._versions) if k[0] == db_key]
+            else:
+                keys = [(db_key, table)]
+            for key in keys:
+                self._entries.pop(key, None)
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self.metrics['invalidations'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in self._entries:
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'ttl': self.ttl, **self.metrics}
+
+
+lookup_cache = LookupCache()
+
+# Funções chamadas com (db_path, table_name, coluna, ids) após qualquer escrita (ex.: réplica local)
+_ouvintes_escrita: List[Callable[[Any, str, Optional[str], Optional[Iterable]], None]] = []
+
+
+def registrar_ouvinte_escrita(callback: Callable[[Any, str, Optional[str], Optional[Iterable]], None]) -> None:
+    """Registra uma função a ser avisada a cada escrita em uma tabela"""
+    if callback not in _ouvintes_escrita:
+        _ouvintes_escrita.append(callback)
+
+
+def invalidate_lookup(db_path, table_name: str, coluna: Optional[str] = None,
+                      ids: Optional[Iterable] = None) -> None:
+    """
+    Chamada após toda escrita em `table_name`: invalida o cache se for uma
+    das tabelas de lookup e avisa os ouvintes de escrita
+
+    Args:
+        coluna, ids: Linhas afetadas (ex.: 'ID_espelho', [12]), quando quem
+            escreveu as conhece; None = qualquer linha da tabela
+    """
+    if table_name in CACHED_TABLES:
+        lookup_cache.invalidate(db_path, table_name)
+        logger.info(f"♻️ Cache de lookup invalidado: {table_name}")
+    for ouvinte in _ouvintes_escrita:
+        try:
+            ouvinte(db_path, table_name, coluna, ids)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao notificar escrita em {table_name}: {e}")
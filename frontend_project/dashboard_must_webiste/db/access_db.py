@@ -12,13 +12,17 @@ CORREÇÕES APLICADAS:
 - 🔧 CORREÇÃO CRÍTICA: Implementação da regra ID_espelho conforme documentação
 """
 
+import os
+import re
 import pandas as pd
+import numpy as np
 import time
 import logging
-from typing import Optional, Dict, Any
-from pathlib import Path
+import datetime
 import threading
-from queue import Queue, Empty
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, Tuple
+from pathlib import Path
 
 try:
     import pyodbc
@@ -27,22 +31,52 @@ except ImportError:
     ACCESS_AVAILABLE = False
     print("⚠️ pyodbc não instalado. Execute: pip install pyodbc")
 
-# 🔧 CORREÇÃO: Sistema de pool de conexões para evitar "Too many client tasks"
-_connection_pool = Queue(maxsize=5)  # Máximo 5 conexões simultâneas
-_pool_lock = threading.Lock()
+# 🔧 CORREÇÃO: Pool de conexões por arquivo de banco (evita "Too many client tasks"
+# e impede que uma conexão de um .accdb seja entregue para outro)
+try:
+    from db.access_pool import get_connection_pool, get_pool_metrics, run_query, run_non_query, _is_connection_error
+    from db.access_cache import lookup_cache, invalidate_lookup
+    from db.access_schema import get_schema_catalog
+    from db.access_replica import get_replica
+    from db.access_utils import (
+        upsert_with_mirror_id, validate_id_espelho_integrity, id_espelho_manager,
+        salvar_item_with_mirror, salvar_itens_with_mirror, deletar_item_with_mirror, atualizar_item_with_mirror,
+        inserir_com_espelho,
+    )
+except ImportError:
+    from access_pool import get_connection_pool, get_pool_metrics, run_query, run_non_query, _is_connection_error
+    from access_cache import lookup_cache, invalidate_lookup
+    from access_schema import get_schema_catalog
+    from access_replica import get_replica
+    from access_utils import (
+        upsert_with_mirror_id, validate_id_espelho_integrity, id_espelho_manager,
+        salvar_item_with_mirror, salvar_itens_with_mirror, deletar_item_with_mirror, atualizar_item_with_mirror,
+        inserir_com_espelho,
+    )
+
+# Coluna de base de tb_ValoresVariaveis por banco (resolvida uma única vez)
+_campos_base_valores: Dict[str, Optional[str]] = {}
+
+# IDs por bloco do IN nas consultas da subárvore de um limite
+ARVORE_LOTE_IN = 200
+
+# Tabela alvo de um INSERT/UPDATE/DELETE (para avisar caches e réplica)
+_RE_TABELA_ESCRITA = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+\[?(\w+)', re.IGNORECASE)
 
 
 class AccessDatabase:
     """Classe para conexão e operações com banco Access local com pool de conexões"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, usar_replica: bool = True):
         """
         Inicializa conexão com banco Access
         
         Args:
             db_path: Caminho para o arquivo .accdb
+            usar_replica: Permite atender leituras pela réplica SQLite local, se ativa
         """
         self.db_path = Path(db_path)
+        self.usar_replica = usar_replica
         self.connection = None
         self.logger = logging.getLogger(f"{__name__}.AccessDatabase")
         
@@ -52,105 +86,71 @@ class AccessDatabase:
         if not self.db_path.exists():
             raise FileNotFoundError(f"Banco Access não encontrado: {db_path}")
     
-    def _get_connection_from_pool(self) -> Optional[pyodbc.Connection]:
-        """Tenta obter conexão do pool"""
-        try:
-            # Tenta obter conexão do pool com timeout reduzido
-            return _connection_pool.get(timeout=0.1)
-        except Empty:
-            return None
-    
-    def _return_connection_to_pool(self, connection: pyodbc.Connection) -> None:
-        """Retorna conexão ao pool se não estiver cheio"""
-        try:
-            if not _connection_pool.full():
-                _connection_pool.put(connection, timeout=0.1)
-            else:
-                # Pool cheio, fecha a conexão
-                connection.close()
-        except:
-            # Se não conseguir retornar ao pool, fecha a conexão
-            try:
-                connection.close()
-            except:
-                pass
-    
     def connect(self) -> None:
-        """Estabelece conexão com o banco Access usando pool"""
+        """Obtém uma conexão do pool deste banco"""
         try:
-            # Primeiro tenta obter do pool
-            self.connection = self._get_connection_from_pool()
-            
-            if self.connection is None:
-                # Pool vazio, cria nova conexão
-                conn_str = (
-                    r"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};"
-                    rf"DBQ={self.db_path.absolute()};"
-                    r"ExtendedAnsiSQL=1;"
-                )
-                
-                self.connection = pyodbc.connect(conn_str)
-                self.logger.info(f"✅ Nova conexão Access criada: {self.db_path.name}")
-            else:
-                self.logger.info(f"✅ Conexão Access obtida do pool: {self.db_path.name}")
+            self.connection = get_connection_pool(self.db_path).acquire()
+            self.logger.info(f"✅ Conexão Access obtida do pool: {self.db_path.name}")
             
         except Exception as e:
             self.logger.error(f"❌ Erro ao conectar Access: {e}")
             raise
     
-    def disconnect(self) -> None:
-        """Retorna conexão ao pool ao invés de fechar"""
+    def disconnect(self, discard: bool = False) -> None:
+        """
+        Devolve a conexão ao pool ao invés de fechar
+        
+        A validação (SELECT 1) não é feita aqui: o pool só testa a conexão no
+        próximo checkout, e apenas se ela tiver ficado ociosa por muito tempo.
+        
+        Args:
+            discard: True para fechar a conexão (ex.: após erro de comunicação)
+        """
         if self.connection:
-            try:
-                # Testa se a conexão ainda está válida
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT 1")
-                cursor.fetchone()
-                cursor.close()
-                
-                # Conexão válida, retorna ao pool
-                self._return_connection_to_pool(self.connection)
-                self.logger.info("🔌 Conexão Access retornada ao pool")
-                
-            except Exception as e:
-                # Conexão inválida, fecha
-                try:
-                    self.connection.close()
-                    self.logger.info("🔌 Conexão Access fechada (inválida)")
-                except:
-                    pass
-                self.logger.warning(f"⚠️ Conexão Access inválida, fechada: {e}")
-            
+            get_connection_pool(self.db_path).release(self.connection, discard=discard)
+            self.logger.info("🔌 Conexão Access retornada ao pool")
             self.connection = None
     
-    def execute_query(self, query: str) -> pd.DataFrame:
+    def pool_stats(self) -> Dict[str, Any]:
+        """Retorna as métricas do pool de conexões deste banco"""
+        return get_connection_pool(self.db_path).stats()
+    
+    def _catalogo(self):
+        """
+        Catálogo de schema do banco, introspectado (se preciso) na conexão
+        desta instância: dentro de access_session ela já ocupa uma vaga do pool
+        """
+        catalogo = get_schema_catalog(self.db_path)
+        catalogo.load(conn=self.connection)
+        return catalogo
+    
+    def execute_query(self, query: str, params: tuple = None) -> pd.DataFrame:
         """
         Executa query SQL e retorna DataFrame
         
         Args:
             query: Query SQL a ser executada
+            params: Parâmetros para a query
             
         Returns:
             DataFrame com os resultados
         """
+        # ⚡ Leituras atendidas pela réplica local quando ela está ativa
+        replica = get_replica(self.db_path) if self.usar_replica else None
+        if replica is not None:
+            start_time = time.time()
+            df = replica.consultar(query, params)
+            if df is not None:
+                self.logger.info(f"⚡ Query atendida pela réplica em {time.time() - start_time:.3f}s: {len(df)} linhas")
+                return df
+        
         if not self.connection:
             self.connect()
         
         try:
             start_time = time.time()
             
-            # Usar cursor para executar query e depois converter para DataFrame
-            cursor = self.connection.cursor()
-            cursor.execute(query)
-            
-            # Obter nomes das colunas
-            columns = [column[0] for column in cursor.description]
-            
-            # Obter dados
-            rows = cursor.fetchall()
-            
-            # Criar DataFrame
-            df = pd.DataFrame.from_records(rows, columns=columns)
+            df = run_query(self.connection, query, params, db_path=self.db_path)
             
             execution_time = time.time() - start_time
             
@@ -161,13 +161,16 @@ class AccessDatabase:
             self.logger.error(f"❌ Erro na query: {e}")
             raise
     
-    def execute_non_query(self, query: str, params: tuple = None) -> bool:
+    def execute_non_query(self, query: str, params: tuple = None,
+                          coluna: str = None, ids=None) -> bool:
         """
         Executa query que não retorna dados (INSERT, UPDATE, DELETE)
         
         Args:
             query: Query SQL a ser executada
             params: Parâmetros para a query
+            coluna, ids: Linhas afetadas, quando conhecidas (a réplica local
+                relê só essas linhas em vez da tabela inteira)
             
         Returns:
             True se executada com sucesso
@@ -176,31 +179,16 @@ class AccessDatabase:
             self.connect()
         
         try:
-            cursor = self.connection.cursor()
-            if params:
-                # 🔧 CORREÇÃO: Converte parâmetros para tipos Python padrão
-                params_convertidos = []
-                for param in params:
-                    if hasattr(param, 'item'):  # numpy.int64, numpy.float64, etc.
-                        params_convertidos.append(param.item())
-                    else:
-                        params_convertidos.append(param)
-                
-                self.logger.info(f"🔧 Parâmetros convertidos: {params} -> {params_convertidos}")
-                cursor.execute(query, tuple(params_convertidos))
-            else:
-                cursor.execute(query)
-            
-            self.connection.commit()
-            self.logger.info(f"✅ Query executada com sucesso: {cursor.rowcount} linhas afetadas")
+            # 🔧 CORREÇÃO: Parâmetros numpy são convertidos para tipos Python padrão pelo executor
+            rowcount = run_non_query(self.connection, query, params, db_path=self.db_path)
+            self.logger.info(f"✅ Query executada com sucesso: {rowcount} linhas afetadas")
+            tabela = _RE_TABELA_ESCRITA.match(query)
+            if tabela:
+                invalidate_lookup(self.db_path, tabela.group(1), coluna, ids)
             return True
             
         except Exception as e:
             self.logger.error(f"❌ Erro na execução: {e}")
-            try:
-                self.connection.rollback()
-            except:
-                pass
             raise
     
     def salvar_item(self, table_name: str, item_data: dict) -> int:
@@ -243,17 +231,8 @@ class AccessDatabase:
                     else:
                         dados_limpos[key] = value
             
-            # 🔧 CORREÇÃO: Determina o campo ID correto baseado na tabela
-            if table_name == 'tb_ValoresVariaveis':
-                id_field = 'ID_ValorVar'
-            elif table_name == 'tbl_Relacao_BaseCondicionante':
-                id_field = 'ID_Relacao'
-            elif table_name == 'tbl_Resultados_LPP':
-                id_field = 'ID_result'
-            elif table_name == 'tb_variaveisSelecionadas':
-                id_field = 'ID_variavelSel'
-            else:
-                id_field = 'ID'
+            # 🔧 CORREÇÃO: Campo ID correto vem do catálogo de schema
+            id_field = self._catalogo().primary_key(table_name)
             
             # Verifica se é atualização (tem ID) ou inserção
             if id_field in item_data and item_data[id_field]:
@@ -269,7 +248,9 @@ class AccessDatabase:
                 # 🔧 CORREÇÃO CRÍTICA: Usa função utilitária central com UPSERT
                 try:
                     # Usa a função utilitária que implementa a regra ID_espelho + UPSERT
-                    novo_id_espelho = upsert_with_mirror_id(table_name, dados_limpos, self.db_path)
+                    # (upsert_with_mirror_id já avisa a escrita com o ID afetado)
+                    novo_id_espelho = upsert_with_mirror_id(table_name, dados_limpos, self.db_path,
+                                                             conn=self.connection)
                     
                     self.logger.info(f"✅ Item processado em {table_name} com ID_espelho: {novo_id_espelho}")
                     return novo_id_espelho  # ← Retorna ID_espelho para uso em relacionamentos
@@ -300,15 +281,8 @@ class AccessDatabase:
                 self.logger.warning("⚠️ Nenhum dado para atualização")
                 return False
             
-            # 🔧 CORREÇÃO: Determina o campo ID correto baseado na tabela
-            if table_name == 'tb_ValoresVariaveis':
-                id_field = 'ID_ValorVar'
-            elif table_name == 'tbl_Resultados_LPP':
-                id_field = 'ID_result'
-            elif table_name == 'tb_variaveisSelecionadas':
-                id_field = 'ID_variavelSel'
-            else:
-                id_field = 'ID'
+            # 🔧 CORREÇÃO: Campo ID correto vem do catálogo de schema
+            id_field = self._catalogo().primary_key(table_name)
             # 🔧 CORREÇÃO: Remove o campo de ID dos dados a serem atualizados, se presente
             item_data = {k: v for k, v in item_data.items() if k != id_field and k != 'ID' and k != 'ID_result'}
             
@@ -327,7 +301,8 @@ class AccessDatabase:
             self.logger.info(f"🔧 Parâmetros: {params}")
             
             # Executa query
-            return self.execute_non_query(query, params)
+            sucesso = self.execute_non_query(query, params, coluna=id_field, ids=[item_id])
+            return sucesso
             
         except Exception as e:
             self.logger.error(f"❌ Erro ao atualizar item {item_id} em {table_name}: {e}")
@@ -346,24 +321,16 @@ class AccessDatabase:
             True se deletado com sucesso
         """
         try:
-            # 🔧 CORREÇÃO: Determina o campo ID correto baseado na tabela
-            if table_name == 'tb_ValoresVariaveis':
-                id_field = 'ID_ValorVar'
-            elif table_name == 'tbl_Relacao_BaseCondicionante':
-                # Para tabela de relações, usa o campo correto
-                id_field = 'ID_Relacao'
-            elif table_name == 'tb_variaveisSelecionadas':
-                # Para variáveis selecionadas, usa o campo correto
-                id_field = 'ID_variavelSel'
-            else:
-                id_field = 'ID'
+            # 🔧 CORREÇÃO: Campo ID correto vem do catálogo de schema
+            id_field = self._catalogo().primary_key(table_name)
             
             query = f"DELETE FROM {table_name} WHERE {id_field} = ?"
             # 🔧 CORREÇÃO: Garante que item_id seja int Python padrão
             item_id_convertido = int(item_id) if hasattr(item_id, 'item') else item_id
             self.logger.info(f"🔧 Query DELETE: {query} com parâmetro {item_id_convertido} (tipo: {type(item_id_convertido)})")
             
-            sucesso = self.execute_non_query(query, (item_id_convertido,))
+            sucesso = self.execute_non_query(query, (item_id_convertido,),
+                                             coluna=id_field, ids=[item_id_convertido])
             
             if sucesso:
                 self.logger.info(f"✅ Item {item_id} deletado com sucesso de {table_name}")
@@ -390,6 +357,24 @@ class AccessDatabase:
         query = f"SELECT * FROM {table_name}"
         return self.execute_query(query)
     
+    def _get_lookup_table(self, table_name: str) -> pd.DataFrame:
+        """
+        Retorna uma tabela de lookup (tb_DicionarioVariavel, tb_variaveisSelecionadas)
+        do cache em memória, lendo do banco apenas quando expirada ou invalidada
+        """
+        return lookup_cache.get_table(self.db_path, table_name, lambda: self.get_list_dataframe(table_name))
+    
+    def _mapa_lookup(self, table_name: str, key_col: str, value_col: str) -> dict:
+        """Retorna o mapa key_col → value_col de uma tabela de lookup em cache"""
+        return lookup_cache.get_map(
+            self.db_path, table_name, key_col, value_col,
+            lambda: self.get_list_dataframe(table_name),
+        )
+    
+    def _mapa_nomes_dicionario(self) -> dict:
+        """Mapa ID_espelho → NomeEletrico de tb_DicionarioVariavel"""
+        return self._mapa_lookup("tb_DicionarioVariavel", 'ID_espelho', 'NomeEletrico')
+    
     def listar_limites(self) -> pd.DataFrame:
         """
         🔧 CORREÇÃO CRÍTICA: Exige obrigatoriamente o campo ID_espelho
@@ -435,12 +420,12 @@ class AccessDatabase:
             raise
         
         # 🔧 CORREÇÃO: Query exata conforme especificação
-        query = f"""
+        query = """
         SELECT tc.ID_espelho as ID, tc.ID_espelho, tc.NomeConfiguracao, tc.Status, tv.ID_Limite
         FROM tb_cad_configuracao_LPP tc
         INNER JOIN tb_vincula_Limite_Configuracao_LPP tv 
         ON tc.ID_espelho = tv.ID_Configuracao 
-        WHERE tv.ID_Limite = {limite_id}
+        WHERE tv.ID_Limite = ?
         ORDER BY tc.NomeConfiguracao
         """
         
@@ -450,7 +435,7 @@ class AccessDatabase:
             self.logger.warning(f"⚠️ Violações ID_espelho na consulta: {violacoes}")
             query = id_espelho_manager.corrigir_consulta_sql(query)
         
-        return self.execute_query(query)
+        return self.execute_query(query, (limite_id,))
     
     def listar_condicoes(self, limite_id: int, config_id: int) -> pd.DataFrame:
         """
@@ -473,12 +458,12 @@ class AccessDatabase:
             raise
         
         # 🔧 CORREÇÃO: Query exata conforme especificação
-        query = f"""
+        query = """
         SELECT tvcc.ID, tvcc.NomeCondicoes as ID_espelho, tcc.Title, tvcc.NomeConfiguracao
         FROM tb_cadCondicoes_LPP tcc
         RIGHT JOIN tb_vincula_CadConfig_Condicoes_LPP tvcc 
         ON tcc.ID_espelho = tvcc.NomeCondicoes 
-        WHERE tvcc.NomeConfiguracao = {config_id}
+        WHERE tvcc.NomeConfiguracao = ?
         ORDER BY tcc.Title
         """
         
@@ -488,7 +473,7 @@ class AccessDatabase:
             self.logger.warning(f"⚠️ Violações ID_espelho na consulta: {violacoes}")
             query = id_espelho_manager.corrigir_consulta_sql(query)
         
-        return self.execute_query(query)
+        return self.execute_query(query, (config_id,))
     
     def listar_variaveis_selecionadas(self, condicao_id: int) -> pd.DataFrame:
         """
@@ -505,12 +490,12 @@ class AccessDatabase:
         try:
             # 🔧 CORREÇÃO CRÍTICA: Converte ID da condição para ID do vínculo
             # Primeiro, busca o vínculo que contém esta condição
-            query_vinculo = f"""
+            query_vinculo = """
             SELECT tvcc.ID_espelho
             FROM tb_vincula_CadConfig_Condicoes_LPP tvcc
-            WHERE tvcc.NomeCondicoes = {condicao_id}
+            WHERE tvcc.NomeCondicoes = ?
             """
-            df_vinculo = self.execute_query(query_vinculo)
+            df_vinculo = self.execute_query(query_vinculo, (condicao_id,))
             
             if df_vinculo.empty:
                 return pd.DataFrame()
@@ -518,30 +503,22 @@ class AccessDatabase:
             vinculo_id = df_vinculo.iloc[0]['ID_espelho']
             
             # 🔧 CORREÇÃO: Agora busca variáveis usando o ID do vínculo
-            query = f"""
+            query = """
             SELECT tvs.ID_espelho, tvs.ID_Variavel, tvs.ID_Usuario, 
                    tvs.ID_vinculoConfigCondicao, tvs.Ativo, tvs.ValorTeste
             FROM tb_variaveisSelecionadas tvs
-            WHERE tvs.ID_vinculoConfigCondicao = {vinculo_id}
+            WHERE tvs.ID_vinculoConfigCondicao = ?
             ORDER BY tvs.ID_Variavel
             """
-            df_var_sel = self.execute_query(query)
+            df_var_sel = self.execute_query(query, (vinculo_id,))
             
             if df_var_sel.empty:
                 return pd.DataFrame()
             
             # 🔧 CORREÇÃO: Adiciona NomeEletrico usando mapeamento
             try:
-                # Carrega dicionário de variáveis
-                df_dicionario = self.get_list_dataframe("tb_DicionarioVariavel")
-                
-                # Mapeia IDs para nomes
-                mapeamento_nomes = {}
-                for _, var_dict in df_dicionario.iterrows():
-                    id_variavel = var_dict.get('ID_espelho')
-                    nome_variavel = var_dict.get('NomeEletrico', '')
-                    if id_variavel and nome_variavel:
-                        mapeamento_nomes[id_variavel] = nome_variavel
+                # Mapa ID_espelho → NomeEletrico do dicionário (em cache)
+                mapeamento_nomes = self._mapa_nomes_dicionario()
                 
                 # Adiciona coluna NomeEletrico
                 df_var_sel['NomeEletrico'] = df_var_sel['ID_Variavel'].map(mapeamento_nomes)
@@ -559,12 +536,12 @@ class AccessDatabase:
         # 🔧 CORREÇÃO CRÍTICA: Converte ID da condição para ID do vínculo
         try:
             # Primeiro, busca o vínculo que contém esta condição
-            query_vinculo = f"""
+            query_vinculo = """
             SELECT tvcc.ID_espelho
             FROM tb_vincula_CadConfig_Condicoes_LPP tvcc
-            WHERE tvcc.NomeCondicoes = {condicao_id}
+            WHERE tvcc.NomeCondicoes = ?
             """
-            df_vinculo = self.execute_query(query_vinculo)
+            df_vinculo = self.execute_query(query_vinculo, (condicao_id,))
             
             if df_vinculo.empty:
                 return pd.DataFrame()
@@ -572,54 +549,96 @@ class AccessDatabase:
             vinculo_id = df_vinculo.iloc[0]['ID_espelho']
             
             # 🔧 CORREÇÃO CRÍTICA: Buscar TODOS os itens do vínculo e determinar tipo inteligentemente
-            query = f"""
+            query = """
             SELECT tb.ID_BaseCondicionante, tb.NomeBaseCondicionante, 
                    tb.ID_TipoLPP, tb.ValorIDBaseCondicionante, tb.ID_vinculoConfigCondicao,
                    tb.ID_espelho
             FROM tb_BaseCondicionante tb
-            WHERE tb.ID_vinculoConfigCondicao = {vinculo_id}
+            WHERE tb.ID_vinculoConfigCondicao = ?
             ORDER BY tb.NomeBaseCondicionante
             """
-            df_todos = self.execute_query(query)
+            df_todos = self.execute_query(query, (vinculo_id,))
             
             if df_todos.empty:
                 return pd.DataFrame()
             
             # 🔧 CORREÇÃO: Determinar tipo usando a mesma lógica da tela de gerenciamento avançado
-            resultados = []
+            # ⚡ Uma única consulta traz os relacionamentos de todos os itens do vínculo
+            df_relacoes = self._listar_relacoes_vinculo(vinculo_id)
+            tipos = self._classificar_tipos_itens(df_todos, df_relacoes)
             
-            for _, row in df_todos.iterrows():
-                nome = row.get('NomeBaseCondicionante', '')
-                id_espelho = row.get('ID_espelho')
-                
-                # Determinar tipo usando lógica inteligente
-                tipo_determinado = self._determinar_tipo_item(nome, id_espelho)
-                
-                # Filtrar apenas pelo tipo solicitado
-                if tipo_determinado == "Base" and tipo_lpp == 1:
-                    resultados.append(row)
-                elif tipo_determinado == "Condicionante" and tipo_lpp == 2:
-                    resultados.append(row)
-            
-            # Converter lista de resultados para DataFrame
-            if resultados:
-                return pd.DataFrame(resultados)
-            else:
+            # Filtrar apenas pelo tipo solicitado
+            tipo_desejado = {1: "Base", 2: "Condicionante"}.get(tipo_lpp)
+            resultados = df_todos[tipos == tipo_desejado]
+            
+            if resultados.empty:
                 return pd.DataFrame()
+            return resultados
                 
         except Exception as e:
             return pd.DataFrame()
     
+    def _listar_relacoes_vinculo(self, vinculo_id: int) -> pd.DataFrame:
+        """
+        Busca em uma única consulta todos os relacionamentos Base/Condicionante
+        que envolvem algum item do vínculo (substitui uma consulta por item)
+        """
+        query = """
+        SELECT r.ID_Base, r.ID_Condicionante
+        FROM tbl_Relacao_BaseCondicionante r
+        WHERE r.ID_Base IN (
+                SELECT tb.ID_espelho FROM tb_BaseCondicionante tb
+                WHERE tb.ID_vinculoConfigCondicao = ?)
+           OR r.ID_Condicionante IN (
+                SELECT tb.ID_espelho FROM tb_BaseCondicionante tb
+                WHERE tb.ID_vinculoConfigCondicao = ?)
+        """
+        try:
+            return self.execute_query(query, (vinculo_id, vinculo_id))
+        except Exception as e:
+            # Mesmo comportamento de _determinar_tipo_item: sem relações, decide pelo nome
+            self.logger.warning(f"⚠️ Erro ao buscar relacionamentos do vínculo {vinculo_id}: {e}")
+            return pd.DataFrame(columns=['ID_Base', 'ID_Condicionante'])
+    
+    @staticmethod
+    def _classificar_tipos_itens(df_itens: pd.DataFrame, df_relacoes: pd.DataFrame) -> pd.Series:
+        """
+        Versão vetorizada de _determinar_tipo_item para vários itens de uma vez
+        
+        Args:
+            df_itens: DataFrame com ID_espelho e NomeBaseCondicionante
+            df_relacoes: DataFrame com ID_Base e ID_Condicionante
+            
+        Returns:
+            Series ("Base" / "Condicionante") alinhada ao índice de df_itens
+        """
+        ids = df_itens['ID_espelho']
+        eh_base = ids.isin(df_relacoes['ID_Base'].dropna())
+        eh_condicionante = ids.isin(df_relacoes['ID_Condicionante'].dropna())
+        
+        # Se ambos ou nenhum, usar lógica de fallback baseada no nome
+        nome_condicionante = df_itens['NomeBaseCondicionante'].astype('string').str.contains(
+            '[<>=≤≥]', regex=True, na=False
+        ).astype(bool)
+        eh_condicionante_final = (eh_condicionante & ~eh_base) | (
+            (eh_base == eh_condicionante) & nome_condicionante
+        )
+        
+        return pd.Series(
+            np.where(eh_condicionante_final, "Condicionante", "Base"),
+            index=df_itens.index,
+        )
+    
     def _determinar_tipo_item(self, nome: str, id_espelho: int) -> str:
         """Determina se um item é Base ou Condicionante usando lógica inteligente"""
         try:
             # Buscar na tabela de relacionamentos
-            query_relacoes = f"""
+            query_relacoes = """
             SELECT ID_Base, ID_Condicionante
             FROM tbl_Relacao_BaseCondicionante
-            WHERE ID_Base = {id_espelho} OR ID_Condicionante = {id_espelho}
+            WHERE ID_Base = ? OR ID_Condicionante = ?
             """
-            df_relacoes = self.execute_query(query_relacoes)
+            df_relacoes = self.execute_query(query_relacoes, (id_espelho, id_espelho))
             
             if not df_relacoes.empty:
                 # Verificar se este item é usado como Base em algum relacionamento
@@ -657,12 +676,12 @@ class AccessDatabase:
         # 🔧 CORREÇÃO CRÍTICA: Converte ID da condição para ID do vínculo
         try:
             # Primeiro, busca o vínculo que contém esta condição
-            query_vinculo = f"""
+            query_vinculo = """
             SELECT tvcc.ID_espelho
             FROM tb_vincula_CadConfig_Condicoes_LPP tvcc
-            WHERE tvcc.NomeCondicoes = {condicao_id}
+            WHERE tvcc.NomeCondicoes = ?
             """
-            df_vinculo = self.execute_query(query_vinculo)
+            df_vinculo = self.execute_query(query_vinculo, (condicao_id,))
             
             if df_vinculo.empty:
                 return pd.DataFrame()
@@ -670,41 +689,31 @@ class AccessDatabase:
             vinculo_id = df_vinculo.iloc[0]['ID_espelho']
             
             # ✅ CORREÇÃO: Agora busca condicionantes usando o ID do vínculo
-            query = f"""
+            query = """
             SELECT tb.ID_espelho, tb.NomeBaseCondicionante, 
                    tb.ID_TipoLPP, tb.ValorIDBaseCondicionante, tb.ID_vinculoConfigCondicao
             FROM tb_BaseCondicionante tb
-            WHERE tb.ID_TipoLPP = 2 AND tb.ID_vinculoConfigCondicao = {vinculo_id}
+            WHERE tb.ID_TipoLPP = 2 AND tb.ID_vinculoConfigCondicao = ?
             ORDER BY tb.NomeBaseCondicionante
             """
-            return self.execute_query(query)
+            return self.execute_query(query, (vinculo_id,))
         except Exception as e:
             return pd.DataFrame()
     
     def listar_valores_variaveis(self, base_id: int) -> pd.DataFrame:
         """Equivalente ao listar_valores_variaveis() do SharePoint"""
         try:
-            # 🔧 CORREÇÃO CRÍTICA: Usa abordagem mais simples e robusta
-            # Primeiro carrega todos os valores
-            df_valores = self.get_list_dataframe("tb_ValoresVariaveis")
-            
-            if df_valores.empty:
-                return pd.DataFrame()
-            
-            # 🔧 CORREÇÃO: Busca campo de base correto
-            base_field = None
-            campos_base = ['ID_BaseCondicionanteId', 'ID_BaseCondicionante', 'ID_BaseId', 'ID_Base', 'BaseId']
-            for field in campos_base:
-                if field in df_valores.columns:
-                    base_field = field
-                    break
+            # 🔧 CORREÇÃO: Campo de base resolvido uma vez por banco (cache)
+            base_field = self._campo_base_valores()
             
             if not base_field:
                 print(f"DEBUG - ❌ Campo de base não encontrado em tb_ValoresVariaveis")
                 return pd.DataFrame()
             
-            # 🔧 CORREÇÃO: Filtra por base_id
-            valores_base = df_valores[df_valores[base_field] == base_id]
+            # ⚡ Filtro por base_id feito no banco (WHERE parametrizado)
+            valores_base = self.execute_query(
+                f"SELECT * FROM tb_ValoresVariaveis WHERE {base_field} = ?", (base_id,)
+            )
             
             if valores_base.empty:
                 print(f"DEBUG - ⚠️ Nenhum valor encontrado para base {base_id}")
@@ -712,26 +721,14 @@ class AccessDatabase:
             
             # 🔧 CORREÇÃO: Adiciona NomeEletrico usando relacionamento correto
             try:
-                # Carrega dicionário de variáveis e variáveis selecionadas
-                df_dicionario = self.get_list_dataframe("tb_DicionarioVariavel")
-                df_var_sel = self.get_list_dataframe("tb_variaveisSelecionadas")
+                # Mapeia ID_VariavelSel → ID_Variavel → NomeEletrico (tabelas em cache)
+                mapa_variavel = self._mapa_lookup("tb_variaveisSelecionadas", 'ID_variavelSel', 'ID_Variavel')
+                mapa_dicionario = self._mapa_nomes_dicionario()
                 
-                # Mapeia ID_VariavelSel → ID_Variavel → NomeEletrico
-                mapeamento_nomes = {}
-                for _, var_sel in df_var_sel.iterrows():
-                    id_var_sel = var_sel.get('ID_variavelSel')  # ID da variável selecionada
-                    id_variavel = var_sel.get('ID_Variavel')    # ID da variável no dicionário
-                    
-                    if id_variavel:
-                        # Busca nome no dicionário
-                        var_dict = df_dicionario[df_dicionario['ID_espelho'] == id_variavel]
-                        if not var_dict.empty:
-                            nome_variavel = var_dict.iloc[0]['NomeEletrico']
-                            if nome_variavel:
-                                mapeamento_nomes[id_var_sel] = nome_variavel
-                
-                # Adiciona coluna NomeEletrico usando mapeamento correto
-                valores_base['NomeEletrico'] = valores_base['ID_VariavelSel'].map(mapeamento_nomes)
+                # Adiciona coluna NomeEletrico com dois lookups vetorizados
+                valores_base['NomeEletrico'] = (
+                    valores_base['ID_VariavelSel'].map(mapa_variavel).map(mapa_dicionario)
+                )
                 
             except Exception as e:
                 print(f"DEBUG - ⚠️ Erro ao adicionar NomeEletrico: {e}")
@@ -744,18 +741,230 @@ class AccessDatabase:
             print(f"DEBUG - ❌ Erro em listar_valores_variaveis: {e}")
             return pd.DataFrame()
     
+    def _campo_base_valores(self) -> Optional[str]:
+        """
+        Descobre qual coluna de tb_ValoresVariaveis referencia a base
+        
+        Usa o catálogo de schema (ou, sem ele, apenas o cabeçalho da tabela) e
+        guarda o resultado por banco, evitando testar os nomes a cada chamada.
+        """
+        chave = str(self.db_path.absolute())
+        if chave not in _campos_base_valores:
+            campos_base = ['ID_BaseCondicionanteId', 'ID_BaseCondicionante', 'ID_BaseId', 'ID_Base', 'BaseId']
+            campo = self._catalogo().first_existing_column("tb_ValoresVariaveis", campos_base)
+            if campo is None:
+                # Catálogo indisponível: lê só o cabeçalho da tabela
+                df_vazio = self.execute_query("SELECT * FROM tb_ValoresVariaveis WHERE 1 = 0")
+                campo = next((field for field in campos_base if field in df_vazio.columns), None)
+            _campos_base_valores[chave] = campo
+        return _campos_base_valores[chave]
+    
     def listar_resultados_lpp(self, condicao_id: int) -> pd.DataFrame:
         """Equivalente ao listar_resultados_lpp() do SharePoint"""
-        query = f"""
+        query = """
         SELECT tr.ID_result, tr.NomeGrupo, tr.ID_Base, tr.ID_vinculoConfigCondicao
         FROM tbl_Resultados_LPP tr
-        WHERE tr.ID_vinculoConfigCondicao = {condicao_id}
+        WHERE tr.ID_vinculoConfigCondicao = ?
         ORDER BY tr.NomeGrupo
         """
-        return self.execute_query(query)
-    
+        return self.execute_query(query, (condicao_id,))
+
+    def carregar_arvore_lpp(self, limite_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Carrega a árvore do LPP inteira com uma consulta por tabela
+
+        limite → configurações → condições → variáveis selecionadas,
+        bases, condicionantes e resultados
+
+        Substitui a navegação listar_limites → listar_configuracoes →
+        listar_condicoes → ... (uma consulta por nó, centenas para a árvore
+        completa): as tabelas são lidas em lote e a hierarquia é montada em
+        memória com dicionários indexados pelo ID_espelho do pai.
+
+        Args:
+            limite_id: ID_espelho de um limite para carregar apenas a sua subárvore
+
+        Returns:
+            Dicionário pronto para JSON: {'limites': [...], 'consultas': n, 'tempo': s}
+        """
+        inicio = time.time()
+        consultas = 0
+
+        def consultar(query: str, params: tuple = None) -> pd.DataFrame:
+            nonlocal consultas
+            consultas += 1
+            return self.execute_query(query, params)
+
+        def consultar_filhos(query: str, filtro: str, ids, ordem: str = None) -> pd.DataFrame:
+            """Árvore inteira: tabela toda; um limite: só os filhos dos IDs selecionados"""
+            if limite_id is None:
+                return consultar(query.format(filtro=""))
+            return self._consultar_por_ids(consultar, query.format(filtro=filtro), ids, ordem)
+
+        filtro_limite = " WHERE ID_espelho = ?" if limite_id is not None else ""
+        filtro_config = " WHERE tv.ID_Limite = ?" if limite_id is not None else ""
+        params_limite = (limite_id,) if limite_id is not None else None
+
+        df_limites = consultar(f"""
+        SELECT ID, ID_espelho, NomeLimite, Ativo, Status
+        FROM tb_cad_limite_LPP{filtro_limite}
+        ORDER BY NomeLimite
+        """, params_limite)
+
+        df_configs = consultar(f"""
+        SELECT tc.ID_espelho as ID, tc.ID_espelho, tc.NomeConfiguracao, tc.Status, tv.ID_Limite
+        FROM tb_cad_configuracao_LPP tc
+        INNER JOIN tb_vincula_Limite_Configuracao_LPP tv
+        ON tc.ID_espelho = tv.ID_Configuracao{filtro_config}
+        ORDER BY tc.NomeConfiguracao
+        """, params_limite)
+
+        # ID_vinculo (tvcc.ID_espelho) é a chave usada por variáveis, bases e resultados
+        df_condicoes = consultar_filhos("""
+        SELECT tvcc.ID, tvcc.NomeCondicoes as ID_espelho, tcc.Title, tvcc.NomeConfiguracao,
+               tvcc.ID_espelho as ID_vinculo
+        FROM tb_cadCondicoes_LPP tcc
+        RIGHT JOIN tb_vincula_CadConfig_Condicoes_LPP tvcc
+        ON tcc.ID_espelho = tvcc.NomeCondicoes{filtro}
+        ORDER BY tcc.Title
+        """, " WHERE tvcc.NomeConfiguracao IN ({ids})", df_configs.get('ID_espelho', []), 'Title')
+        vinculos = df_condicoes.get('ID_vinculo', [])
+
+        # Variáveis selecionadas e dicionário vêm do cache de lookup quando disponível
+        df_variaveis = self._get_lookup_table("tb_variaveisSelecionadas")
+        colunas_variaveis = [c for c in ['ID_espelho', 'ID_Variavel', 'ID_Usuario',
+                                         'ID_vinculoConfigCondicao', 'Ativo', 'ValorTeste']
+                             if c in df_variaveis.columns]
+        df_variaveis = df_variaveis[colunas_variaveis].copy()
+        if 'ID_Variavel' in df_variaveis.columns:
+            df_variaveis = df_variaveis.sort_values('ID_Variavel', kind='stable')
+            df_variaveis['NomeEletrico'] = df_variaveis['ID_Variavel'].map(self._mapa_nomes_dicionario())
+
+        df_bases = consultar_filhos("""
+        SELECT tb.ID_BaseCondicionante, tb.NomeBaseCondicionante,
+               tb.ID_TipoLPP, tb.ValorIDBaseCondicionante, tb.ID_vinculoConfigCondicao,
+               tb.ID_espelho
+        FROM tb_BaseCondicionante tb{filtro}
+        ORDER BY tb.NomeBaseCondicionante
+        """, " WHERE tb.ID_vinculoConfigCondicao IN ({ids})", vinculos, 'NomeBaseCondicionante')
+
+        if not df_bases.empty:
+            # Relacionamentos das bases carregadas: mesma classificação de listar_bases_condicao
+            df_relacoes = consultar_filhos("""
+            SELECT r.ID_Base, r.ID_Condicionante
+            FROM tbl_Relacao_BaseCondicionante r{filtro}
+            """, " WHERE r.ID_Base IN ({ids}) OR r.ID_Condicionante IN ({ids})", df_bases['ID_espelho'])
+            df_relacoes = df_relacoes.reindex(columns=['ID_Base', 'ID_Condicionante'])
+            df_bases = df_bases.assign(Tipo=self._classificar_tipos_itens(df_bases, df_relacoes))
+        else:
+            df_bases = df_bases.assign(Tipo=pd.Series(dtype=object))
+
+        df_resultados = consultar_filhos("""
+        SELECT tr.ID_result, tr.NomeGrupo, tr.ID_Base, tr.ID_vinculoConfigCondicao
+        FROM tbl_Resultados_LPP tr{filtro}
+        ORDER BY tr.NomeGrupo
+        """, " WHERE tr.ID_vinculoConfigCondicao IN ({ids})", vinculos, 'NomeGrupo')
+
+        # Índices filho por ID_espelho do pai
+        configs_por_limite = self._agrupar_registros(df_configs, 'ID_Limite')
+        condicoes_por_config = self._agrupar_registros(df_condicoes, 'NomeConfiguracao')
+        variaveis_por_vinculo = self._agrupar_registros(df_variaveis, 'ID_vinculoConfigCondicao')
+        bases_por_vinculo = self._agrupar_registros(df_bases, 'ID_vinculoConfigCondicao')
+        resultados_por_vinculo = self._agrupar_registros(df_resultados, 'ID_vinculoConfigCondicao')
+
+        limites = []
+        for limite in self._registros_json(df_limites):
+            configuracoes = []
+            for config in configs_por_limite.get(self._chave_id(limite.get('ID_espelho')), []):
+                condicoes = []
+                for condicao in condicoes_por_config.get(self._chave_id(config.get('ID_espelho')), []):
+                    vinculo = self._chave_id(condicao.get('ID_vinculo'))
+                    itens = bases_por_vinculo.get(vinculo, [])
+                    condicao['variaveis'] = variaveis_por_vinculo.get(vinculo, [])
+                    condicao['bases'] = [item for item in itens if item['Tipo'] == "Base"]
+                    condicao['condicionantes'] = [item for item in itens if item['Tipo'] == "Condicionante"]
+                    condicao['resultados'] = resultados_por_vinculo.get(vinculo, [])
+                    condicoes.append(condicao)
+                config['condicoes'] = condicoes
+                configuracoes.append(config)
+            limite['configuracoes'] = configuracoes
+            limites.append(limite)
+
+        tempo = time.time() - inicio
+        self.logger.info(f"🌳 Árvore LPP carregada em {tempo:.3f}s: {len(limites)} limites, {consultas} consultas")
+        return {'limites': limites, 'consultas': consultas, 'tempo': round(tempo, 3)}
+
+    @staticmethod
+    def _chave_id(valor) -> Any:
+        """Normaliza IDs vindos do banco (float por causa de NaN, numpy) para int"""
+        if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+            return None
+        if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+            return int(valor)
+        if isinstance(valor, np.integer):
+            return int(valor)
+        return valor
+
+    @classmethod
+    def _consultar_por_ids(cls, consultar, query: str, ids, ordem: str = None) -> pd.DataFrame:
+        """
+        Executa `query` com {ids} substituído pelos placeholders do IN, em
+        blocos de ARVORE_LOTE_IN IDs, e concatena os resultados
+
+        Args:
+            consultar: Função (query, params) -> DataFrame
+            query: SQL com um ou mais {ids} (todos recebem o mesmo bloco)
+            ids: IDs do filtro (vazios/repetidos são ignorados)
+            ordem: Coluna para reordenar quando há mais de um bloco
+        """
+        ids = list(dict.fromkeys(i for i in map(cls._chave_id, ids) if i is not None))
+        if not ids:
+            return pd.DataFrame()
+        partes = []
+        for inicio in range(0, len(ids), ARVORE_LOTE_IN):
+            bloco = ids[inicio:inicio + ARVORE_LOTE_IN]
+            sql = query.format(ids=', '.join('?' for _ in bloco))
+            partes.append(consultar(sql, tuple(bloco) * query.count('{ids}')))
+        if len(partes) == 1:
+            return partes[0]
+        df = pd.concat(partes, ignore_index=True)
+        if ordem and ordem in df.columns:
+            # Access ordena texto sem diferenciar maiúsculas
+            df = df.sort_values(ordem, key=lambda s: s.astype('string').str.casefold(),
+                                kind='stable', ignore_index=True)
+        return df
+
+    @staticmethod
+    def _valor_json(valor):
+        """Datas/horas (pd.Timestamp, datetime) → texto ISO; demais valores inalterados"""
+        if isinstance(valor, (datetime.date, datetime.time)):
+            return valor.isoformat()
+        return valor
+
+    @classmethod
+    def _registros_json(cls, df: pd.DataFrame) -> list:
+        """Converte o DataFrame em lista de dicts com tipos Python (NaN → None, datas em ISO)"""
+        if df.empty:
+            return []
+        registros = df.astype(object).where(df.notna(), None)
+        for coluna in registros.columns:
+            tipo = df[coluna].dtype
+            if pd.api.types.is_datetime64_any_dtype(tipo) or tipo == object:
+                # Series object explícita: o map converteria os None de volta para NaN
+                registros[coluna] = pd.Series([cls._valor_json(v) for v in registros[coluna]],
+                                              index=registros.index, dtype=object)
+        return registros.to_dict('records')
+
+    @classmethod
+    def _agrupar_registros(cls, df: pd.DataFrame, coluna_pai: str) -> Dict[Any, list]:
+        """Indexa os registros do DataFrame pela coluna que referencia o pai"""
+        grupos: Dict[Any, list] = {}
+        if df.empty or coluna_pai not in df.columns:
+            return grupos
+        for registro in cls._registros_json(df):
+            grupos.setdefault(cls._chave_id(registro.get(coluna_pai)), []).append(registro)
+        return grupos
 
-    
     def _corrigir_codificacao(self, texto: str) -> str:
         """
         🔧 CORREÇÃO: Método mantido para compatibilidade
@@ -825,10 +1034,66 @@ class AccessDatabase:
                         return valor_corrigido
             
             return valor_float
-            
+
         except (ValueError, TypeError):
             return 0.0
-    
+
+    def _corrigir_escala_valores(self, valores) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Versão vetorizada de _corrigir_escala_valor para uma coluna inteira
+
+        Aplica as mesmas regras, na mesma ordem de prioridade, sobre um array
+        NumPy e registra uma única linha de log com o total de correções.
+
+        Args:
+            valores: Series, array ou lista com os valores lidos do Access
+
+        Returns:
+            (valores corrigidos em float64, máscara booleana dos valores corrigidos)
+        """
+        try:
+            numeros = np.asarray(valores, dtype=float)
+        except (ValueError, TypeError):
+            # Coluna com textos não numéricos: converte o que for possível
+            numeros = pd.to_numeric(pd.Series(valores, dtype=object), errors='coerce')
+            numeros = numeros.to_numpy(dtype=float, na_value=np.nan)
+
+        # Vazios e valores não numéricos viram 0.0 (mesmo retorno da versão escalar)
+        valor = np.where(np.isnan(numeros), 0.0, numeros)
+        absoluto = np.abs(valor)
+
+        with np.errstate(invalid='ignore'):
+            # Múltiplo de 1000 (≥ 1000, exceto múltiplos de 5000/10000 e o próprio 1000)
+            div_1000 = (
+                (np.remainder(absoluto, 1000) == 0) & (absoluto >= 1000)
+                & (np.remainder(absoluto, 10000) != 0) & (np.remainder(absoluto, 5000) != 0)
+                & (absoluto != 1000)
+            )
+            # Múltiplo de 10 (≥ 10, exceto múltiplos de 50/100)
+            div_10 = ~div_1000 & (
+                (np.remainder(absoluto, 10) == 0) & (absoluto >= 10)
+                & (np.remainder(absoluto, 100) != 0) & (np.remainder(absoluto, 50) != 0)
+            )
+            # Valores pequenos que eram decimais de 0.001 a 0.999 multiplicados por 1000
+            teste_div_1000 = absoluto / 1000
+            div_1000_decimal = ~div_1000 & ~div_10 & (
+                (absoluto > 0) & (absoluto < 1000)
+                & (teste_div_1000 >= 0.001) & (teste_div_1000 <= 0.999)
+            )
+
+        por_1000 = div_1000 | div_1000_decimal
+        corrigidos = np.where(por_1000, valor / 1000, np.where(div_10, valor / 10, valor))
+        mascara = por_1000 | div_10
+
+        total = int(mascara.sum())
+        if total:
+            self.logger.info(
+                f"🔧 Correção de escala: {total} de {len(valor)} valores corrigidos "
+                f"(÷1000: {int(div_1000.sum())}, ÷1000 decimal: {int(div_1000_decimal.sum())}, "
+                f"÷10: {int(div_10.sum())})"
+            )
+        return corrigidos, mascara
+
     def _tabela_tem_campo_id_espelho(self, table_name: str) -> bool:
         """
         Verifica se uma tabela tem o campo ID_espelho
@@ -840,25 +1105,7 @@ class AccessDatabase:
             True se a tabela tem campo ID_espelho
         """
         try:
-            # Lista de tabelas que SABEMOS que têm ID_espelho
-            tabelas_com_id_espelho = [
-                'tb_BaseCondicionante',
-                'tb_cad_AgrupamentoCondicoes_LPP', 
-                'tb_cad_configuracao_LPP',
-                'tb_cad_limite_LPP',
-                'tb_cadCondicoes_LPP',
-                'tb_DicionarioVariavel',
-                'tb_TipoLPP',
-                'tb_ValoresTesteVariaveis_LPP',
-                'tb_ValoresVariaveis',
-                'tb_variaveisSelecionadas',
-                'tb_vincula_CadConfig_Condicoes_LPP',
-                'tb_vincula_Limite_Configuracao_LPP',
-                'tbl_Relacao_BaseCondicionante',
-                'tbl_Resultados_LPP'
-            ]
-            
-            return table_name in tabelas_com_id_espelho
+            return self._catalogo().has_id_espelho(table_name)
             
         except Exception as e:
             self.logger.warning(f"⚠️ Erro ao verificar campo ID_espelho em {table_name}: {e}")
@@ -1063,17 +1310,8 @@ class AccessDatabase:
             Tupla (sucesso, id_espelho_encontrado)
         """
         try:
-            # Determina o campo ID correto
-            if table_name == 'tb_ValoresVariaveis':
-                id_field = 'ID_ValorVar'
-            elif table_name == 'tbl_Relacao_BaseCondicionante':
-                id_field = 'ID_Relacao'
-            elif table_name == 'tbl_Resultados_LPP':
-                id_field = 'ID_result'
-            elif table_name == 'tb_variaveisSelecionadas':
-                id_field = 'ID_variavelSel'
-            else:
-                id_field = 'ID'
+            # Campo ID correto vem do catálogo de schema
+            id_field = self._catalogo().primary_key(table_name)
             
             # Verifica se ID_espelho foi atualizado
             query_verificar = f"SELECT ID_espelho FROM {table_name} WHERE {id_field} = ?"
@@ -1118,17 +1356,8 @@ class AccessDatabase:
             
             where_clause = " AND ".join(condicoes)
             
-            # Determina o campo ID correto
-            if table_name == 'tb_ValoresVariaveis':
-                id_field = 'ID_ValorVar'
-            elif table_name == 'tbl_Relacao_BaseCondicionante':
-                id_field = 'ID_Relacao'
-            elif table_name == 'tbl_Resultados_LPP':
-                id_field = 'ID_result'
-            elif table_name == 'tb_variaveisSelecionadas':
-                id_field = 'ID_variavelSel'
-            else:
-                id_field = 'ID'
+            # Campo ID correto vem do catálogo de schema
+            id_field = self._catalogo().primary_key(table_name)
             
             query = f"SELECT {id_field} FROM {table_name} WHERE {where_clause}"
             
@@ -1156,15 +1385,7 @@ class AccessDatabase:
         Returns:
             Lista de campos para verificar unicidade
         """
-        # Mapeamento de campos únicos por tabela
-        campos_unicos_por_tabela = {
-            'tb_variaveisSelecionadas': ['ID_Variavel', 'ID_vinculoConfigCondicao'],
-            'tb_ValoresVariaveis': ['ID_Base', 'ID_VariavelSel'],
-            'tbl_Relacao_BaseCondicionante': ['ID_Base', 'ID_Condicionante', 'ID_Result_fk'],
-            'tbl_Resultados_LPP': ['ID_Base', 'ID_vinculoConfigCondicao', 'NomeGrupo']
-        }
-        
-        return campos_unicos_por_tabela.get(table_name, [])
+        return self._catalogo().unique_keys(table_name)
 
 
 # Funções de conveniência para compatibilidade com SharePoint
@@ -1173,167 +1394,125 @@ def get_access_database(db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaol
     return AccessDatabase(db_path)
 
 
+# 🔧 CORREÇÃO: Sessões compartilhadas por banco para as funções *_access
+# Antes cada chamada criava um AccessDatabase e fechava a conexão com
+# db.connection.close(), o que contornava o pool (conexão nova a cada chamada
+# e vaga nunca devolvida). Agora cada thread reaproveita a sua instância por
+# banco e a conexão volta ao pool ao final do bloco.
+_sessoes: Dict[str, threading.local] = {}
+_sessoes_lock = threading.Lock()
+
+
+def _sessao_local(db_path) -> threading.local:
+    key = os.path.normcase(os.path.abspath(str(db_path)))
+    with _sessoes_lock:
+        sessao = _sessoes.get(key)
+        if sessao is None:
+            sessao = threading.local()
+            _sessoes[key] = sessao
+        return sessao
+
+
+@contextmanager
+def access_session(db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> Iterator[AccessDatabase]:
+    """
+    Context manager com a sessão da thread atual para o banco informado
+
+    A instância de AccessDatabase é criada uma vez por thread e por banco;
+    a conexão é emprestada do pool na entrada e devolvida na saída (blocos
+    aninhados reaproveitam a mesma conexão). Em caso de erro, a transação
+    pendente é desfeita antes da devolução.
+
+    Exemplo:
+        with access_session(db_path) as db:
+            df = db.listar_limites()
+    """
+    sessao = _sessao_local(db_path)
+    db = getattr(sessao, 'db', None)
+    if db is None:
+        db = AccessDatabase(db_path)
+        sessao.db = db
+        sessao.profundidade = 0
+
+    if sessao.profundidade == 0:
+        db.connect()
+    sessao.profundidade += 1
+    descartar = False
+    try:
+        yield db
+    except Exception as e:
+        descartar = _is_connection_error(e)
+        if db.connection and not descartar:
+            try:
+                db.connection.rollback()
+            except Exception:
+                descartar = True
+        raise
+    finally:
+        sessao.profundidade -= 1
+        if sessao.profundidade == 0:
+            db.disconnect(discard=descartar)
+
+
 # Funções equivalentes às do SharePoint para testes
 def listar_limites_access(db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar limites do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_limites()
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def listar_configuracoes_access(limite_id: int, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar configurações do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_configuracoes(limite_id)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def listar_condicoes_access(limite_id: int, config_id: int, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar condições do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_condicoes(limite_id, config_id)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def listar_variaveis_selecionadas_access(condicao_id: int, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar variáveis selecionadas do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_variaveis_selecionadas(condicao_id)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def listar_bases_condicao_access(condicao_id: int, tipo_lpp: int = 1, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar bases do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_bases_condicao(condicao_id, tipo_lpp)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def listar_condicionantes_condicao_access(condicao_id: int, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar condicionantes do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_condicionantes_condicao(condicao_id)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def listar_valores_variaveis_access(base_id: int, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar valores de variáveis do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_valores_variaveis(base_id)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def listar_resultados_lpp_access(condicao_id: int, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Teste: listar resultados LPP do Access"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.listar_resultados_lpp(condicao_id)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
+
+
+def carregar_arvore_lpp_access(limite_id: Optional[int] = None, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> dict:
+    """Carrega a árvore LPP (limites → configurações → condições → itens) em lote"""
+    with access_session(db_path) as db:
+        return db.carregar_arvore_lpp(limite_id)
 
 
 def get_list_dataframe_access(table_name: str, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> pd.DataFrame:
     """Equivalente ao get_list_dataframe() do SharePoint"""
-    # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-    db = get_access_database(db_path)
-    try:
-        # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-        if not db.connection:
-            db.connect()
+    with access_session(db_path) as db:
         return db.get_list_dataframe(table_name)
-    finally:
-        # Fechar conexão manualmente
-        if hasattr(db, 'connection') and db.connection:
-            try:
-                db.connection.close()
-            except:
-                pass
 
 
 def testar_id_espelho_access(db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> dict:
@@ -1347,7 +1526,7 @@ def testar_id_espelho_access(db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_ge
         Dicionário com resultados dos testes
     """
     try:
-        with get_access_database(db_path) as db:
+        with access_session(db_path) as db:
             return db.testar_implementacao_id_espelho()
     except Exception as e:
         return {
@@ -1369,7 +1548,6 @@ def validar_integridade_id_espelho_access(db_path: str = r"\\prd-plm-01\SysPL\Ge
     """
     try:
         # 🔧 CORREÇÃO CRÍTICA: Usa função utilitária central
-        from controle_acoes.services.access_utils import validate_id_espelho_integrity
         return validate_id_espelho_integrity(db_path)
     except Exception as e:
         return {
@@ -1392,13 +1570,7 @@ def get_docs_limite_access(id_espelho: int, db_path: str = r"\\prd-plm-01\SysPL\
         Dicionário com PremissasHtml e ComentariosHtml
     """
     try:
-        # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-        db = get_access_database(db_path)
-        try:
-            # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-            if not db.connection:
-                db.connect()
-            
+        with access_session(db_path) as db:
             # Buscar limite pelo ID_espelho
             query = """
                 SELECT PremissasHtml, ComentariosHtml 
@@ -1421,13 +1593,6 @@ def get_docs_limite_access(id_espelho: int, db_path: str = r"\\prd-plm-01\SysPL\
                     'PremissasHtml': '',
                     'ComentariosHtml': ''
                 }
-        finally:
-            # Fechar conexão manualmente
-            if hasattr(db, 'connection') and db.connection:
-                try:
-                    db.connection.close()
-                except:
-                    pass
                 
     except Exception as e:
         print(f"❌ Erro ao obter documentos do limite {id_espelho}: {e}")
@@ -1452,13 +1617,7 @@ def save_docs_limite_access(id_espelho: int, premissas_html: str, comentarios_ht
         True se salvou com sucesso, False caso contrário
     """
     try:
-        # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-        db = get_access_database(db_path)
-        try:
-            # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-            if not db.connection:
-                db.connect()
-            
+        with access_session(db_path) as db:
             # Atualizar documentos pelo ID_espelho
             query = """
                 UPDATE tb_cad_limite_LPP 
@@ -1469,16 +1628,10 @@ def save_docs_limite_access(id_espelho: int, premissas_html: str, comentarios_ht
             cursor = db.connection.cursor()
             cursor.execute(query, (premissas_html, comentarios_html, id_espelho))
             db.connection.commit()
+            invalidate_lookup(db_path, "tb_cad_limite_LPP", "ID_espelho", [id_espelho])
             
             print(f"✅ Documentos do limite {id_espelho} salvos com sucesso")
             return True
-        finally:
-            # Fechar conexão manualmente
-            if hasattr(db, 'connection') and db.connection:
-                try:
-                    db.connection.close()
-                except:
-                    pass
             
     except Exception as e:
         print(f"❌ Erro ao salvar documentos do limite {id_espelho}: {e}")
@@ -1496,13 +1649,7 @@ def listar_limites_com_docs_access(db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP
         DataFrame com limites e status dos documentos
     """
     try:
-        # 🔧 CORREÇÃO: Não usar context manager, criar instância diretamente
-        db = get_access_database(db_path)
-        try:
-            # 🔧 CORREÇÃO: Garantir que a conexão seja estabelecida
-            if not db.connection:
-                db.connect()
-            
+        with access_session(db_path) as db:
             query = """
                 SELECT 
                     ID_espelho,
@@ -1521,14 +1668,7 @@ def listar_limites_com_docs_access(db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP
                 ORDER BY NomeLimite
             """
             
-            return pd.read_sql(query, db.connection)
-        finally:
-            # Fechar conexão manualmente
-            if hasattr(db, 'connection') and db.connection:
-                try:
-                    db.connection.close()
-                except:
-                    pass
+            return db.execute_query(query)
             
     except Exception as e:
         print(f"❌ Erro ao listar limites com documentos: {e}")
@@ -1615,7 +1755,7 @@ def obter_configuracao_da_condicao(condicao_id: int, db_path: str = r"\\prd-plm-
         ID da configuração ou None se não encontrado
     """
     try:
-        with get_access_database(db_path) as db:
+        with access_session(db_path) as db:
             query = """
                 SELECT NomeConfiguracao
                 FROM tb_vincula_CadConfig_Condicoes_LPP
@@ -1651,7 +1791,7 @@ def deletar_variavel_selecionada_access(condicao_id: int, variavel_id: int, db_p
         True se removido com sucesso, False caso contrário
     """
     try:
-        with get_access_database(db_path) as db:
+        with access_session(db_path) as db:
             # Obter o ID do vínculo da condição
             vinculo_query = """
                 SELECT ID_espelho
@@ -1677,6 +1817,7 @@ def deletar_variavel_selecionada_access(condicao_id: int, variavel_id: int, db_p
             
             cursor.execute(query, (vinculo_id, variavel_id))
             db.connection.commit()
+            invalidate_lookup(db_path, "tb_variaveisSelecionadas", "ID_vinculoConfigCondicao", [vinculo_id])
             
             print(f"✅ Variável {variavel_id} removida da condição {condicao_id}")
             return True
@@ -1705,7 +1846,7 @@ def adicionar_variavel_selecionada_access(condicao_id: int, variavel_id: int, db
         True se adicionado com sucesso, False caso contrário
     """
     try:
-        with get_access_database(db_path) as db:
+        with access_session(db_path) as db:
             cursor = db.connection.cursor()
             
             # 🔧 CORREÇÃO: condicao_id já é o ID_espelho da condição
@@ -1739,26 +1880,16 @@ def adicionar_variavel_selecionada_access(condicao_id: int, variavel_id: int, db
                 print(f"⚠️ Variável {variavel_id} já existe para a condição {condicao_id}")
                 return False
             
-            # 🔧 CORREÇÃO: Inserir sem o campo ID_espelho primeiro (será preenchido depois)
-            insert_query = """
-                INSERT INTO tb_variaveisSelecionadas (ID_vinculoConfigCondicao, ID_Variavel, Ativo, ID_Usuario, Title)
-                VALUES (?, ?, ?, ?, ?)
-            """
-            
+            # 🔧 CORREÇÃO CRÍTICA: INSERT + ID_espelho = ID_variavelSel na mesma transação
             title = f"Variável {variavel_id} - Condição {condicao_id}"
-            cursor.execute(insert_query, (vinculo_id, variavel_id, True, 1, title))
-            
-            # Obter o ID do registro recém-inserido
-            novo_id = cursor.execute("SELECT @@IDENTITY").fetchone()[0]
-            
-            # 🔧 CORREÇÃO CRÍTICA: Atualizar o campo ID_espelho com o valor do ID_variavelSel
-            update_query = """
-                UPDATE tb_variaveisSelecionadas 
-                SET ID_espelho = ? 
-                WHERE ID_variavelSel = ?
-            """
-            cursor.execute(update_query, (novo_id, novo_id))
+            novo_id = inserir_com_espelho(
+                cursor, "tb_variaveisSelecionadas",
+                {'ID_vinculoConfigCondicao': vinculo_id, 'ID_Variavel': variavel_id,
+                 'Ativo': True, 'ID_Usuario': 1, 'Title': title},
+                "ID_variavelSel", True,
+            )
             db.connection.commit()
+            invalidate_lookup(db_path, "tb_variaveisSelecionadas", "ID_variavelSel", [novo_id])
             
             print(f"✅ Variável {variavel_id} adicionada à condição {condicao_id} (ID: {novo_id}, ID_espelho: {novo_id})")
             return True
@@ -1779,7 +1910,7 @@ def obter_limite_da_configuracao(configuracao_id: int, db_path: str = r"\\prd-pl
         ID do limite ou None se não encontrado
     """
     try:
-        with get_access_database(db_path) as db:
+        with access_session(db_path) as db:
             query = """
                 SELECT ID_Limite
                 FROM tb_vincula_Limite_Configuracao_LPP
@@ -1813,7 +1944,7 @@ def obter_configuracoes_por_limite(limite_id: int, db_path: str = r"\\prd-plm-01
         Lista de IDs das configurações associadas ao limite
     """
     try:
-        with get_access_database(db_path) as db:
+        with access_session(db_path) as db:
             query = """
                 SELECT ID_Configuracao
                 FROM tb_vincula_Limite_Configuracao_LPP
@@ -1844,7 +1975,6 @@ def salvar_item_access(table_name: str, item_data: dict, item_id: int = None, db
             item_id = None
         
         # 🔧 CORREÇÃO CRÍTICA: Usa função utilitária central
-        from controle_acoes.services.access_utils import salvar_item_with_mirror
         resultado = salvar_item_with_mirror(table_name, item_data, db_path)
         
         # ✅ CORREÇÃO: Verifica se o resultado é válido
@@ -1857,11 +1987,28 @@ def salvar_item_access(table_name: str, item_data: dict, item_id: int = None, db
         return {"success": False, "id_espelho": None, "error": str(e)}
 
 
+def salvar_itens_access(table_name: str, registros, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> dict:
+    """
+    Salva vários itens de uma vez (UPSERT em lote, uma única transação)
+
+    Args:
+        table_name: Nome da tabela Access
+        registros: DataFrame ou lista de dicionários
+        db_path: Caminho para o banco Access
+
+    Returns:
+        {'success', 'inseridos', 'atualizados', 'ids_espelho'} (+ 'error' em caso de falha)
+    """
+    resultado = salvar_itens_with_mirror(table_name, registros, db_path)
+    if not resultado['success']:
+        print(f"❌ Erro ao salvar itens em lote em {table_name}: {resultado['error']}")
+    return resultado
+
+
 def deletar_item_access(table_name: str, item_id: int, db_path: str = r"\\prd-plm-01\SysPL\GestaoLPP\bd_gestaolpp.accdb") -> bool:
     """Equivalente ao deletar_item() do SharePoint"""
     try:
         # 🔧 CORREÇÃO CRÍTICA: Usa função utilitária central
-        from controle_acoes.services.access_utils import deletar_item_with_mirror
         return deletar_item_with_mirror(table_name, item_id, db_path)
     except Exception as e:
         print(f"❌ Erro ao deletar item: {e}")
@@ -1872,7 +2019,6 @@ def atualizar_item_access(table_name: str, item_id: int, item_data: dict, db_pat
     """Equivalente ao atualizar_item() do SharePoint"""
     try:
         # 🔧 CORREÇÃO CRÍTICA: Usa função utilitária central
-        from controle_acoes.services.access_utils import atualizar_item_with_mirror
         return atualizar_item_with_mirror(table_name, item_id, item_data, db_path)
     except Exception as e:
         print(f"❌ Erro ao atualizar item: {e}")
@@ -0,0 +1,542 @@
+# db/access_pool.py
+"""
+Pool de conexões ODBC por banco Access (.accdb) e executor compartilhado
+
+- ConnectionPool é genérico (a fábrica de conexões recebe a chave do pool);
+  o SQL Server do get_db_access_connection.py usa a mesma classe
+- Um pool por arquivo de banco (chave = caminho absoluto normalizado)
+- Tamanho mínimo/máximo, espera com timeout quando o pool está esgotado
+- Remoção de conexões ociosas há mais de `idle_timeout` segundos
+- Validação preguiçosa: `SELECT 1` só quando a conexão ficou ociosa mais que `validate_after`
+- Contadores (hits, misses, waits, evictions...) para dimensionar o pool
+- Executor único (execute_query / execute_non_query) usado por access_db.py e
+  access_utils.py, com o mesmo encoding e a mesma instrumentação
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional, Any, Iterator
+
+import pandas as pd
+
+try:
+    import pyodbc
+    ACCESS_AVAILABLE = True
+except ImportError:
+    pyodbc = None
+    ACCESS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuração padrão dos pools (pode ser sobrescrita por variáveis de ambiente)
+POOL_MIN_SIZE = int(os.getenv("ACCESS_POOL_MIN_SIZE", "0"))
+POOL_MAX_SIZE = int(os.getenv("ACCESS_POOL_MAX_SIZE", "5"))
+POOL_IDLE_TIMEOUT = float(os.getenv("ACCESS_POOL_IDLE_TIMEOUT", "300"))
+POOL_VALIDATE_AFTER = float(os.getenv("ACCESS_POOL_VALIDATE_AFTER", "30"))
+POOL_WAIT_TIMEOUT = float(os.getenv("ACCESS_POOL_WAIT_TIMEOUT", "10"))
+# Statements preparados mantidos por conexão (LRU)
+STATEMENT_CACHE_SIZE = int(os.getenv("ACCESS_STATEMENT_CACHE_SIZE", "32"))
+
+
+class PoolTimeoutError(TimeoutError):
+    """Nenhuma conexão ficou disponível dentro do tempo de espera"""
+
+
+def configurar_encoding(conn) -> None:
+    """
+    Configura o encoding da conexão: CP1252 (Windows-1252), que é o mais
+    compatível com o Access, e UTF-8 como alternativa
+    """
+    for encoding in ('cp1252', 'utf-8'):
+        try:
+            conn.setdecoding(pyodbc.SQL_CHAR, encoding=encoding)
+            conn.setdecoding(pyodbc.SQL_WCHAR, encoding=encoding)
+            conn.setencoding(encoding=encoding)
+            return
+        except Exception:
+            continue
+    # Se ambos falharem, mantém o padrão do driver
+
+
+def criar_conexao_access(db_path: Path):
+    """Abre uma nova conexão ODBC com o arquivo Access"""
+    if not ACCESS_AVAILABLE:
+        raise ImportError("pyodbc não está disponível. Instale com: pip install pyodbc")
+
+    conn_str = (
+        r"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};"
+        rf"DBQ={Path(db_path).absolute()};"
+        r"ExtendedAnsiSQL=1;"
+    )
+    conn = pyodbc.connect(conn_str)
+    configurar_encoding(conn)
+    return conn
+
+
+class ConnectionPool:
+    """Pool de conexões thread-safe para um único banco (arquivo Access, servidor SQL...)"""
+
+    def __init__(self, key,
+                 min_size: int = POOL_MIN_SIZE,
+                 max_size: int = POOL_MAX_SIZE,
+                 idle_timeout: float = POOL_IDLE_TIMEOUT,
+                 validate_after: float = POOL_VALIDATE_AFTER,
+                 wait_timeout: float = POOL_WAIT_TIMEOUT,
+                 connect_fn: Optional[Callable[[Any], Any]] = None,
+                 label: Optional[str] = None):
+        """
+        Args:
+            key: Identificação do banco, repassada a connect_fn (caminho do .accdb no Access)
+            min_size: Conexões ociosas preservadas mesmo após o idle_timeout
+            max_size: Máximo de conexões abertas (ociosas + em uso)
+            idle_timeout: Segundos de ociosidade antes de fechar a conexão
+            validate_after: Segundos de ociosidade a partir dos quais a conexão é testada no checkout
+            wait_timeout: Segundos de espera por uma conexão quando o pool está esgotado
+            connect_fn: Fábrica de conexões, chamada com `key` (padrão: ODBC Access)
+            label: Rótulo do pool nos logs e métricas (padrão: "Access <arquivo>"
+                   com a fábrica padrão, senão a própria chave)
+        """
+        if max_size < 1:
+            raise ValueError("max_size deve ser >= 1")
+
+        self.key = key
+        if label is None:
+            label = f"Access {Path(key).name}" if connect_fn is None else str(key)
+        self.label = label
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self.wait_timeout = wait_timeout
+        self._connect_fn = connect_fn or criar_conexao_access
+
+        self._idle = deque()  # (conexão, instante em que voltou ao pool)
+        self._total = 0       # conexões abertas (ociosas + em uso + sendo criadas)
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        # id(conexão) -> OrderedDict[sql, cursor]; cada conexão só é usada por
+        # quem a obteve no acquire(), então o cache dela não precisa de lock
+        self._statements: Dict[int, OrderedDict] = {}
+
+        self.metrics = {
+            'hits': 0,          # checkout atendido por conexão ociosa
+            'misses': 0,        # checkout que precisou abrir conexão nova
+            'waits': 0,         # checkout que esperou o pool liberar conexão
+            'timeouts': 0,      # espera que estourou wait_timeout
+            'evictions': 0,     # conexões ociosas fechadas por idle_timeout
+            'invalidations': 0, # conexões descartadas por falha na validação/erro
+            'validations': 0,   # SELECT 1 executados
+            'created': 0,
+            'closed': 0,
+            'queries': 0,       # SELECTs executados pelo executor compartilhado
+            'non_queries': 0,   # INSERT/UPDATE/DELETE executados
+            'errors': 0,        # execuções que levantaram exceção
+            'exec_time': 0.0,   # tempo total de execução (s)
+            'stmt_hits': 0,     # execuções que reaproveitaram um statement preparado
+            'stmt_misses': 0,   # statements preparados pela primeira vez na conexão
+        }
+
+    # ------------------------------------------------------------------
+    # Checkout / checkin
+    # ------------------------------------------------------------------
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Obtém uma conexão do pool, abrindo uma nova se houver espaço
+
+        Args:
+            timeout: Segundos de espera (padrão: wait_timeout do pool)
+
+        Returns:
+            Conexão exclusiva até ser devolvida com release()
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        esperou = False
+
+        while True:
+            conn = None
+            idle_since = None
+            criar = False
+
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"Pool de conexões fechado: {self.label}")
+
+                self._evict_idle_locked(time.monotonic())
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()  # LIFO: a mais recente está "quente"
+                    self.metrics['hits'] += 1
+                elif self._total < self.max_size:
+                    self._total += 1  # reserva a vaga antes de conectar fora do lock
+                    self.metrics['misses'] += 1
+                    criar = True
+                else:
+                    if not esperou:
+                        esperou = True
+                        self.metrics['waits'] += 1
+                    restante = deadline - time.monotonic()
+                    if restante <= 0:
+                        self.metrics['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Nenhuma conexão disponível para {self.label} "
+                            f"após {timeout:.1f}s (max_size={self.max_size})"
+                        )
+                    self._cond.wait(restante)
+                    continue
+
+            if criar:
+                try:
+                    conn = self._connect_fn(self.key)
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self.metrics['created'] += 1
+                logger.info(f"✅ Nova conexão criada: {self.label}")
+                return conn
+
+            # Validação preguiçosa: só testa conexões que ficaram muito tempo paradas
+            if time.monotonic() - idle_since < self.validate_after or self._validate(conn):
+                return conn
+
+            self._discard(conn)
+
+    def release(self, conn, discard: bool = False) -> None:
+        """
+        Devolve a conexão ao pool
+
+        Args:
+            conn: Conexão obtida com acquire()
+            discard: True para fechar a conexão (ex.: após erro de comunicação)
+        """
+        if conn is None:
+            return
+
+        if discard:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+
+        self._discard(conn, invalida=False)
+
+    def _validate(self, conn) -> bool:
+        """Executa um round trip mínimo para confirmar que a conexão está viva"""
+        with self._cond:
+            self.metrics['validations'] += 1
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Conexão inválida descartada ({self.label}): {e}")
+            return False
+
+    def _discard(self, conn, invalida: bool = True) -> None:
+        """Fecha a conexão e libera a vaga no pool"""
+        self._close_quietly(conn)
+        with self._cond:
+            self._total -= 1
+            if invalida:
+                self.metrics['invalidations'] += 1
+            self.metrics['closed'] += 1
+            self._cond.notify()
+
+    def _evict_idle_locked(self, now: float) -> None:
+        """Fecha conexões ociosas além do idle_timeout (chamar com o lock adquirido)"""
+        # As conexões mais antigas ficam no início da fila
+        while len(self._idle) > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._close_quietly(conn)
+            self._total -= 1
+            self.metrics['evictions'] += 1
+            self.metrics['closed'] += 1
+
+    def _close_quietly(self, conn) -> None:
+        self._statements.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def statement_cursor(self, conn, sql: str):
+        """
+        Retorna o cursor associado ao texto SQL nesta conexão
+
+        O driver ODBC mantém o último statement preparado em cada cursor e não
+        o prepara de novo quando o mesmo texto é executado outra vez. Guardando
+        um cursor por SQL distinto, cada query parametrizada é preparada uma
+        única vez por conexão e reutilizada com novos valores nos `?`.
+        """
+        cache = self._statements.setdefault(id(conn), OrderedDict())
+        cursor = cache.get(sql)
+        if cursor is not None:
+            cache.move_to_end(sql)
+            with self._cond:
+                self.metrics['stmt_hits'] += 1
+            return cursor
+
+        with self._cond:
+            self.metrics['stmt_misses'] += 1
+        cursor = conn.cursor()
+        cache[sql] = cursor
+        if len(cache) > STATEMENT_CACHE_SIZE:
+            _, antigo = cache.popitem(last=False)
+            try:
+                antigo.close()
+            except Exception:
+                pass
+        return cursor
+
+    # ------------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------------
+    def warmup(self) -> int:
+        """Abre conexões até atingir min_size. Retorna quantas foram criadas."""
+        criadas = []
+        while True:
+            with self._cond:
+                if self._total >= self.min_size:
+                    break
+                self._total += 1
+            try:
+                criadas.append(self._connect_fn(self.key))
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                raise
+        with self._cond:
+            self.metrics['created'] += len(criadas)
+        for conn in criadas:
+            self.release(conn)
+        return len(criadas)
+
+    def evict_idle(self) -> None:
+        """Força a remoção de conexões ociosas expiradas"""
+        with self._cond:
+            self._evict_idle_locked(time.monotonic())
+
+    def close(self) -> None:
+        """Fecha todas as conexões ociosas; conexões em uso são fechadas ao serem devolvidas"""
+        with self._cond:
+            self._closed = True
+            ociosas = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._total -= len(ociosas)
+            self.metrics['closed'] += len(ociosas)
+            self._cond.notify_all()
+        for conn in ociosas:
+            self._close_quietly(conn)
+
+    def record_execution(self, kind: str, elapsed: float, ok: bool = True) -> None:
+        """Registra uma execução de query nas métricas do pool"""
+        with self._cond:
+            self.metrics[kind] += 1
+            self.metrics['exec_time'] += elapsed
+            if not ok:
+                self.metrics['errors'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna um snapshot dos contadores e da ocupação do pool"""
+        with self._cond:
+            ociosas = len(self._idle)
+            return {
+                'key': str(self.key),
+                'label': self.label,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'open': self._total,
+                'idle': ociosas,
+                'in_use': self._total - ociosas,
+                **self.metrics,
+            }
+
+
+# Nome anterior, mantido para compatibilidade
+AccessConnectionPool = ConnectionPool
+
+
+# ----------------------------------------------------------------------
+# Registro global: um pool por arquivo de banco
+# ----------------------------------------------------------------------
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_path) -> str:
+    return os.path.normcase(os.path.abspath(str(db_path)))
+
+
+def get_connection_pool(db_path, **config) -> ConnectionPool:
+    """
+    Retorna o pool do banco informado, criando-o na primeira chamada
+
+    Args:
+        db_path: Caminho para o arquivo .accdb
+        **config: Parâmetros do ConnectionPool (usados apenas na criação)
+    """
+    key = _pool_key(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_path, **config)
+            _pools[key] = pool
+        return pool
+
+
+def get_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Retorna as métricas de todos os pools ativos, por caminho do banco"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {key: pool.stats() for key, pool in pools}
+
+
+def close_all_pools() -> None:
+    """Fecha todos os pools (ex.: no shutdown da aplicação)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+# ----------------------------------------------------------------------
+# Executor compartilhado
+# ----------------------------------------------------------------------
+def _is_connection_error(error: Exception) -> bool:
+    """True se o erro indica que a conexão não pode mais ser reutilizada"""
+    if not ACCESS_AVAILABLE:
+        return False
+    return isinstance(error, (pyodbc.OperationalError, pyodbc.InterfaceError))
+
+
+@contextmanager
+def pooled_connection(db_path, conn=None) -> Iterator[Any]:
+    """
+    Context manager que empresta uma conexão do pool do banco
+
+    Se `conn` for informado (conexão que o chamador já tem do pool, ex.: a
+    de uma access_session), ela é usada diretamente, sem ocupar outra vaga:
+    com todas as vagas presas por sessões, um segundo checkout esperaria
+    até o PoolTimeoutError.
+
+    Exemplo:
+        with pooled_connection(db_path) as conn:
+            conn.cursor().execute(...)
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    pool = get_connection_pool(db_path)
+    conn = pool.acquire()
+    discard = False
+    try:
+        yield conn
+    except Exception as e:
+        discard = _is_connection_error(e)
+        raise
+    finally:
+        pool.release(conn, discard=discard)
+
+
+def converter_parametros(params) -> tuple:
+    """Converte parâmetros numpy (int64, float64...) para tipos Python padrão"""
+    if not params:
+        return ()
+    return tuple(param.item() if hasattr(param, 'item') else param for param in params)
+
+
+def _cursor_para(conn, query: str, params, db_path):
+    """
+    Queries parametrizadas usam o cache de statements do pool; SQL sem
+    parâmetros (texto montado a cada chamada) recebe um cursor descartável
+    para não poluir o cache.
+    """
+    if params and db_path is not None:
+        return get_connection_pool(db_path).statement_cursor(conn, query)
+    return conn.cursor()
+
+
+def run_query(conn, query: str, params: tuple = None, db_path=None) -> pd.DataFrame:
+    """
+    Executa um SELECT em uma conexão já obtida e retorna um DataFrame
+
+    Args:
+        conn: Conexão ODBC
+        query: Query SQL
+        params: Parâmetros para os marcadores `?`
+        db_path: Banco de origem (métricas e cache de statements do pool)
+    """
+    start_time = time.perf_counter()
+    ok = False
+    try:
+        cursor = _cursor_para(conn, query, params, db_path)
+        if params:
+            cursor.execute(query, converter_parametros(params))
+        else:
+            cursor.execute(query)
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        ok = True
+        return pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        if db_path is not None:
+            get_connection_pool(db_path).record_execution('queries', time.perf_counter() - start_time, ok)
+
+
+def run_non_query(conn, query: str, params: tuple = None, db_path=None, commit: bool = True) -> int:
+    """
+    Executa INSERT/UPDATE/DELETE em uma conexão já obtida
+
+    Faz rollback em caso de erro. Retorna o número de linhas afetadas.
+    """
+    start_time = time.perf_counter()
+    ok = False
+    try:
+        cursor = _cursor_para(conn, query, params, db_path)
+        if params:
+            cursor.execute(query, converter_parametros(params))
+        else:
+            cursor.execute(query)
+        if commit:
+            conn.commit()
+        ok = True
+        return cursor.rowcount
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        if db_path is not None:
+            get_connection_pool(db_path).record_execution('non_queries', time.perf_counter() - start_time, ok)
+
+
+def execute_query(db_path, query: str, params: tuple = None) -> pd.DataFrame:
+    """Executa um SELECT usando uma conexão do pool do banco"""
+    with pooled_connection(db_path) as conn:
+        return run_query(conn, query, params, db_path=db_path)
+
+
+def execute_non_query(db_path, query: str, params: tuple = None, conn=None) -> bool:
+    """Executa INSERT/UPDATE/DELETE usando uma conexão do pool do banco (ou `conn`, se informada)"""
+    with pooled_connection(db_path, conn) as conn:
+        rowcount = run_non_query(conn, query, params, db_path=db_path)
+    logger.info(f"✅ Query executada com sucesso: {rowcount} linhas afetadas")
+    return True
@@ -0,0 +1,660 @@
+# db/access_replica.py
+"""
+Réplica local (SQLite) do banco Access do LPP
+
+O bd_gestaolpp.accdb continua sendo o banco mestre: todas as escritas vão
+para ele. A réplica usa o schema de SQLiteDatabase.create_tables() e atende
+leituras localmente (abaixo de 1 ms, contra centenas de milissegundos de
+uma leitura no share).
+
+Sincronização (thread em segundo plano, a cada REPLICA_MAX_AGE segundos)
+- Escritas desta aplicação chegam pelo ouvinte de escrita do access_cache com
+  a coluna/IDs afetados: só essas linhas são relidas do Access, na hora.
+  Escritas sem IDs conhecidos marcam a tabela para recarga no próximo ciclo.
+- Se o mtime do .accdb mudou desde a última sincronização registrada na
+  réplica, houve escrita de fora (Access, outro sistema): carga completa,
+  o que torna visíveis também as edições de linhas já existentes.
+- Sem mudança no arquivo, o ciclo não consulta o Access; a cada
+  REPLICA_FULL_INTERVAL segundos roda a sincronização por marca d'água de ID
+  (com carga completa das tabelas vencidas) como rede de segurança.
+  Uma edição externa feita entre a última sincronização e uma escrita da
+  aplicação é coberta só por essa rede (o mtime novo é atribuído à escrita).
+
+Semântica do Access
+- Colunas de texto usam a collation ACCESS (sem diferenciar maiúsculas,
+  inclusive acentuadas), então `=`, ORDER BY, GROUP BY e DISTINCT dão o mesmo
+  resultado do Access.
+- Sim/Não e Data/Hora voltam como bool e datetime (tipos lidos do
+  cursor.description do Access), pelo nome da coluna no resultado.
+
+Leitura (read-through)
+- consultar() só atende queries cujas tabelas são todas replicadas e não
+  sincroniza nada: enquanto a primeira carga não terminou, ou se alguma das
+  tabelas tem recarga pendente, devolve None e o chamador lê direto do Access.
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+
+import pandas as pd
+
+try:
+    from db.access_pool import pooled_connection, converter_parametros
+    from db.access_cache import registrar_ouvinte_escrita
+    from db.db_sqlite import SQLiteDatabase, SQLITE_SYNCHRONOUS
+except ImportError:
+    from access_pool import pooled_connection, converter_parametros
+    from access_cache import registrar_ouvinte_escrita
+    from db_sqlite import SQLiteDatabase, SQLITE_SYNCHRONOUS
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ENABLED = os.getenv("ACCESS_REPLICA_ENABLED", "0").lower() in ("1", "true", "sim")
+REPLICA_DIR = Path(os.getenv(
+    "ACCESS_REPLICA_DIR",
+    os.path.join(tempfile.gettempdir(), "access_replica"),
+))
+REPLICA_MAX_AGE = float(os.getenv("ACCESS_REPLICA_MAX_AGE", "30"))
+REPLICA_FULL_INTERVAL = float(os.getenv("ACCESS_REPLICA_FULL_INTERVAL", "3600"))
+# IDs por consulta IN na releitura das linhas escritas
+REPLICA_LOTE_IDS = 100
+
+# Tabelas replicadas (mesmas de SQLiteDatabase.create_tables)
+TABELAS_REPLICADAS = (
+    'tb_cad_limite_LPP',
+    'tb_cad_configuracao_LPP',
+    'tb_vincula_Limite_Configuracao_LPP',
+    'tb_cadCondicoes_LPP',
+    'tb_vincula_CadConfig_Condicoes_LPP',
+    'tb_DicionarioVariavel',
+    'tb_variaveisSelecionadas',
+    'tb_BaseCondicionante',
+    'tbl_Relacao_BaseCondicionante',
+    'tb_ValoresVariaveis',
+    'tbl_Resultados_LPP',
+)
+
+_TABELA_ESTADO = "replica_sync_estado"
+_TABELA_TIPOS = "replica_colunas"
+_TABELA_META = "replica_meta"
+# Versão do schema da réplica (PRAGMA user_version); mudou → tabelas recriadas
+_VERSAO_SCHEMA = 2
+_COLLATION = "ACCESS"
+# Tipos do Access restaurados na leitura (cursor.description → nome gravado)
+_TIPOS_RESTAURADOS = {bool: 'bool', datetime.datetime: 'datetime', datetime.date: 'datetime'}
+_RE_TABELAS = re.compile(r'\b(?:FROM|JOIN)\s+\[?([A-Za-z_][\w-]*)', re.IGNORECASE)
+
+
+def tabelas_da_query(query: str) -> set:
+    """Tabelas citadas em FROM/JOIN de uma query"""
+    return set(_RE_TABELAS.findall(query))
+
+
+def _valor_sqlite(valor):
+    """Converte valores do pyodbc para tipos aceitos pelo sqlite3"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(sep=' ')
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, bytearray):
+        return bytes(valor)
+    return valor
+
+
+def _comparar_access(a: str, b: str) -> int:
+    """Collation ACCESS: comparação de texto sem diferenciar maiúsculas"""
+    a, b = a.casefold(), b.casefold()
+    return (a > b) - (a < b)
+
+
+def _conectar(caminho) -> sqlite3.Connection:
+    # timeout: outro processo (worker) pode estar gravando uma carga na mesma réplica
+    conn = sqlite3.connect(str(caminho), timeout=30, check_same_thread=False)
+    conn.create_collation(_COLLATION, _comparar_access)
+    return conn
+
+
+def _ddl_replica() -> List[str]:
+    """DDL de SQLiteDatabase.create_tables() com a collation ACCESS nas colunas de texto"""
+    with SQLiteDatabase(":memory:") as modelo:
+        modelo.create_tables()
+        objetos = modelo.conn.execute(
+            "SELECT type, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY type = 'index'"
+        ).fetchall()
+    ddl = []
+    for tipo, sql in objetos:
+        if tipo == 'table':
+            sql = re.sub(r'\bTEXT\b', f'TEXT COLLATE {_COLLATION}', sql)
+        ddl.append(re.sub(r'^CREATE (TABLE|INDEX) ', r'CREATE \1 IF NOT EXISTS ', sql))
+    return ddl
+
+
+class AccessReplica:
+    """Réplica SQLite de um arquivo .accdb, sincronizada em segundo plano"""
+
+    def __init__(self, access_path, replica_path=None):
+        self.access_path = Path(access_path)
+        if replica_path is None:
+            chave = os.path.normcase(os.path.abspath(str(self.access_path)))
+            nome = hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16]
+            replica_path = REPLICA_DIR / f"{self.access_path.stem}_{nome}.db"
+        self.replica_path = Path(replica_path)
+
+        self._lock = threading.RLock()
+        self._alteradas_lock = threading.Lock()
+        self._alteradas: set = set()
+        # Tabelas com linhas que o schema local rejeitou: continuam sendo lidas do Access
+        self._incompletas: set = set()
+        self._local = threading.local()
+        self._conn_sync: Optional[sqlite3.Connection] = None
+        self._pks: Dict[str, str] = {}
+        # tabela -> {coluna: 'bool' | 'datetime'}
+        self._tipos: Dict[str, Dict[str, str]] = {}
+        self._ultima_sync = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self.metrics = {
+            'leituras': 0, 'fallbacks': 0, 'syncs': 0,
+            'cargas_completas': 0, 'cargas_incrementais': 0, 'releituras_ids': 0,
+            'linhas_copiadas': 0, 'linhas_removidas': 0, 'linhas_rejeitadas': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Preparação
+    # ------------------------------------------------------------------
+    def _criar_schema(self, conn: sqlite3.Connection) -> None:
+        """Cria as tabelas da réplica; réplicas de versão anterior são recriadas"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _VERSAO_SCHEMA:
+                for tabela in TABELAS_REPLICADAS + (_TABELA_ESTADO, _TABELA_TIPOS, _TABELA_META):
+                    conn.execute(f'DROP TABLE IF EXISTS "{tabela}"')
+                for sql in _ddl_replica():
+                    conn.execute(sql)
+                conn.execute(f"""
+                    CREATE TABLE {_TABELA_ESTADO} (
+                        tabela TEXT PRIMARY KEY,
+                        ultimo_id INTEGER,
+                        linhas INTEGER,
+                        carga_completa REAL,
+                        sincronizado_em REAL
+                    )
+                """)
+                conn.execute(f"""
+                    CREATE TABLE {_TABELA_TIPOS} (
+                        tabela TEXT,
+                        coluna TEXT,
+                        tipo TEXT,
+                        PRIMARY KEY (tabela, coluna)
+                    )
+                """)
+                conn.execute(f"CREATE TABLE {_TABELA_META} (chave TEXT PRIMARY KEY, valor)")
+                conn.execute(f"PRAGMA user_version = {_VERSAO_SCHEMA}")
+                logger.info(f"🧩 Schema da réplica criado (versão {_VERSAO_SCHEMA}): {self.replica_path}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _preparar(self) -> sqlite3.Connection:
+        """Cria o arquivo/schema da réplica e a conexão de sincronização"""
+        if self._conn_sync is not None:
+            return self._conn_sync
+
+        self.replica_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = _conectar(self.replica_path)
+        # Transações controladas aqui (BEGIN IMMEDIATE / with conn)
+        conn.isolation_level = None
+        # WAL: os leitores não esperam a sincronização (e vice-versa)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # A réplica espelha o Access como ele está (inclusive registros órfãos)
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        self._criar_schema(conn)
+        conn.isolation_level = ""
+
+        for tabela in TABELAS_REPLICADAS:
+            colunas = conn.execute(f'PRAGMA table_info("{tabela}")').fetchall()
+            self._pks[tabela] = next((c[1] for c in colunas if c[5] == 1), 'ID')
+        for tabela, coluna, tipo in conn.execute(f"SELECT tabela, coluna, tipo FROM {_TABELA_TIPOS}"):
+            self._tipos.setdefault(tabela, {})[coluna] = tipo
+
+        self._conn_sync = conn
+        return conn
+
+    def _conexao_leitura(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = _conectar(self.replica_path)
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # Escritas da aplicação
+    # ------------------------------------------------------------------
+    def marcar_alterada(self, tabela: str, coluna: Optional[str] = None,
+                        ids: Optional[Iterable] = None) -> None:
+        """
+        Atualiza a réplica após uma escrita no Access
+
+        Com coluna/ids (ex.: 'ID_espelho', [12]) as linhas são relidas do
+        Access na hora; sem eles (ou se a releitura falhar) a tabela passa a
+        ser lida do Access até o próximo ciclo de sincronização recarregá-la.
+        """
+        if tabela not in TABELAS_REPLICADAS:
+            return
+        if coluna and ids is not None and self._conn_sync is not None:
+            try:
+                self._reler_linhas(tabela, coluna, ids)
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Réplica: falha ao reler {coluna} de {tabela} ({e}); tabela marcada para recarga")
+        with self._alteradas_lock:
+            self._alteradas.add(tabela)
+        self._acordar.set()
+
+    def _reler_linhas(self, tabela: str, coluna: str, ids: Iterable) -> int:
+        """Substitui na réplica as linhas com `coluna` IN ids pelas do Access"""
+        ids = list(dict.fromkeys(i for i in ids if i is not None))
+        with self._lock:
+            conn = self._preparar()
+            existentes = {c[1] for c in conn.execute(f'PRAGMA table_info("{tabela}")')}
+            if coluna not in existentes:
+                raise ValueError(f"coluna {coluna} não existe na réplica")
+
+            colunas, linhas, tipos = [], [], {}
+            for inicio in range(0, len(ids), REPLICA_LOTE_IDS):
+                bloco = ids[inicio:inicio + REPLICA_LOTE_IDS]
+                placeholders = ', '.join('?' for _ in bloco)
+                colunas, lidas, tipos = self._ler_access(
+                    f"SELECT * FROM {tabela} WHERE {coluna} IN ({placeholders})", tuple(bloco))
+                linhas.extend(lidas)
+
+            with conn:
+                if linhas:
+                    self._alinhar_colunas(conn, tabela, colunas, tipos)
+                conn.executemany(f'DELETE FROM "{tabela}" WHERE "{coluna}" = ?', [(i,) for i in ids])
+                gravadas = self._gravar_linhas(conn, tabela, colunas, linhas)
+                # A escrita mudou o mtime do .accdb: não é uma alteração externa
+                self._gravar_mtime(conn, self._mtime_access())
+
+        self.metrics['releituras_ids'] += 1
+        self.metrics['linhas_copiadas'] += gravadas
+        return gravadas
+
+    # ------------------------------------------------------------------
+    # Sincronização
+    # ------------------------------------------------------------------
+    def _ler_access(self, query: str, params: tuple = None) -> Tuple[List[str], List[tuple], Dict[str, str]]:
+        """(colunas, linhas convertidas para o sqlite3, tipos a restaurar na leitura)"""
+        with pooled_connection(self.access_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, converter_parametros(params))
+            colunas = [d[0] for d in cursor.description]
+            tipos = {d[0]: _TIPOS_RESTAURADOS[d[1]] for d in cursor.description if d[1] in _TIPOS_RESTAURADOS}
+            linhas = [tuple(_valor_sqlite(v) for v in row) for row in cursor.fetchall()]
+        return colunas, linhas, tipos
+
+    def _alinhar_colunas(self, conn: sqlite3.Connection, tabela: str, colunas: List[str],
+                         tipos: Dict[str, str]) -> None:
+        """Acrescenta na réplica as colunas do Access que o schema local não tem
+        e registra as que voltam como bool/datetime na leitura"""
+        existentes = {c[1]: c[2] for c in conn.execute(f'PRAGMA table_info("{tabela}")')}
+        for coluna in colunas:
+            if coluna not in existentes:
+                # Sem tipo declarado (afinidade BLOB): o valor fica como veio do
+                # Access; a collation só se aplica quando o valor é texto
+                conn.execute(f'ALTER TABLE "{tabela}" ADD COLUMN "{coluna}" COLLATE {_COLLATION}')
+                logger.info(f"🧩 Réplica: coluna {coluna} adicionada em {tabela}")
+        if tipos != self._tipos.get(tabela, {}):
+            conn.execute(f"DELETE FROM {_TABELA_TIPOS} WHERE tabela = ?", (tabela,))
+            conn.executemany(f"INSERT INTO {_TABELA_TIPOS} VALUES (?, ?, ?)",
+                             [(tabela, coluna, tipo) for coluna, tipo in tipos.items()])
+            self._tipos[tabela] = dict(tipos)
+
+    def _gravar_linhas(self, conn: sqlite3.Connection, tabela: str,
+                       colunas: List[str], linhas: List[tuple]) -> int:
+        """Grava as linhas e retorna quantas foram aceitas"""
+        if not linhas:
+            return 0
+        nomes = ', '.join(f'"{c}"' for c in colunas)
+        placeholders = ', '.join('?' for _ in colunas)
+        sql = f'INSERT OR REPLACE INTO "{tabela}" ({nomes}) VALUES ({placeholders})'
+        try:
+            conn.executemany(sql, linhas)
+            return len(linhas)
+        except sqlite3.IntegrityError:
+            # Restrições do schema local (ex.: NOT NULL) que o Access não impõe:
+            # grava linha a linha e descarta só as que violam
+            gravadas = 0
+            for linha in linhas:
+                try:
+                    conn.execute(sql, linha)
+                    gravadas += 1
+                except sqlite3.IntegrityError:
+                    self.metrics['linhas_rejeitadas'] += 1
+            self._incompletas.add(tabela)
+            logger.warning(f"⚠️ Réplica: {len(linhas) - gravadas} linhas de {tabela} rejeitadas pelo "
+                           f"schema local; a tabela continua sendo lida do Access")
+            return gravadas
+
+    def _salvar_estado(self, conn: sqlite3.Connection, tabela: str, ultimo_id, completa: bool) -> None:
+        linhas = conn.execute(f'SELECT COUNT(*) FROM "{tabela}"').fetchone()[0]
+        agora = time.time()
+        anterior = conn.execute(
+            f"SELECT carga_completa FROM {_TABELA_ESTADO} WHERE tabela = ?", (tabela,)
+        ).fetchone()
+        carga_completa = agora if completa or anterior is None else anterior[0]
+        conn.execute(
+            f"INSERT OR REPLACE INTO {_TABELA_ESTADO} VALUES (?, ?, ?, ?, ?)",
+            (tabela, ultimo_id, linhas, carga_completa, agora),
+        )
+
+    def _mtime_access(self) -> Optional[int]:
+        """mtime do .accdb (None se o arquivo não está acessível)"""
+        try:
+            return os.stat(self.access_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _mtime_replicado(self, conn: sqlite3.Connection) -> Optional[int]:
+        """mtime do .accdb na última sincronização gravada na réplica (compartilhado entre processos)"""
+        linha = conn.execute(f"SELECT valor FROM {_TABELA_META} WHERE chave = 'mtime_access'").fetchone()
+        return linha[0] if linha else None
+
+    def _gravar_mtime(self, conn: sqlite3.Connection, mtime: Optional[int]) -> None:
+        if mtime is not None:
+            conn.execute(f"INSERT OR REPLACE INTO {_TABELA_META} VALUES ('mtime_access', ?)", (mtime,))
+
+    def _carga_completa(self, conn: sqlite3.Connection, tabela: str) -> int:
+        pk = self._pks[tabela]
+        colunas, linhas, tipos = self._ler_access(f"SELECT * FROM {tabela}")
+        indice_pk = colunas.index(pk) if pk in colunas else None
+        ultimo_id = max((l[indice_pk] for l in linhas if l[indice_pk] is not None), default=0) \
+            if indice_pk is not None else 0
+
+        self._incompletas.discard(tabela)
+        with conn:
+            self._alinhar_colunas(conn, tabela, colunas, tipos)
+            conn.execute(f'DELETE FROM "{tabela}"')
+            gravadas = self._gravar_linhas(conn, tabela, colunas, linhas)
+            self._salvar_estado(conn, tabela, ultimo_id, completa=True)
+
+        self.metrics['cargas_completas'] += 1
+        self.metrics['linhas_copiadas'] += gravadas
+        return gravadas
+
+    def _carga_incremental(self, conn: sqlite3.Connection, tabela: str, ultimo_id) -> int:
+        pk = self._pks[tabela]
+        colunas, novas, tipos = self._ler_access(f"SELECT * FROM {tabela} WHERE {pk} > ?", (ultimo_id,))
+        _, ids, _ = self._ler_access(f"SELECT {pk} FROM {tabela}")
+        ids_access = {row[0] for row in ids}
+        ids_replica = {row[0] for row in conn.execute(f'SELECT "{pk}" FROM "{tabela}"')}
+        removidos = [(i,) for i in ids_replica - ids_access]
+
+        if novas:
+            indice_pk = colunas.index(pk)
+            ultimo_id = max([ultimo_id] + [l[indice_pk] for l in novas if l[indice_pk] is not None])
+
+        with conn:
+            if novas:
+                self._alinhar_colunas(conn, tabela, colunas, tipos)
+            if removidos:
+                conn.executemany(f'DELETE FROM "{tabela}" WHERE "{pk}" = ?', removidos)
+            gravadas = self._gravar_linhas(conn, tabela, colunas, novas)
+            self._salvar_estado(conn, tabela, ultimo_id, completa=False)
+
+        self.metrics['cargas_incrementais'] += 1
+        self.metrics['linhas_copiadas'] += gravadas
+        self.metrics['linhas_removidas'] += len(removidos)
+        return gravadas + len(removidos)
+
+    def sincronizar(self, completa: bool = False, tabelas=None) -> Dict[str, int]:
+        """
+        Sincroniza a réplica com o Access
+
+        Args:
+            completa: Força carga completa de todas as tabelas
+            tabelas: Restringe a sincronização a estas tabelas
+
+        Returns:
+            Dicionário tabela -> linhas copiadas/removidas
+        """
+        with self._lock:
+            inicio = time.time()
+            conn = self._preparar()
+            # Lido antes da carga: escritas durante a carga aparecem no próximo ciclo
+            mtime = self._mtime_access()
+            alvo = [t for t in TABELAS_REPLICADAS if tabelas is None or t in tabelas]
+
+            with self._alteradas_lock:
+                alteradas = self._alteradas & set(alvo)
+                self._alteradas -= alteradas
+
+            resumo = {}
+            cargas_completas = self.metrics['cargas_completas']
+            try:
+                for tabela in alvo:
+                    estado = conn.execute(
+                        f"SELECT ultimo_id, carga_completa FROM {_TABELA_ESTADO} WHERE tabela = ?", (tabela,)
+                    ).fetchone()
+                    if (completa or estado is None or tabela in alteradas
+                            or time.time() - estado[1] > REPLICA_FULL_INTERVAL):
+                        resumo[tabela] = self._carga_completa(conn, tabela)
+                    else:
+                        resumo[tabela] = self._carga_incremental(conn, tabela, estado[0] or 0)
+            except Exception:
+                # O que não foi sincronizado volta para a fila
+                with self._alteradas_lock:
+                    self._alteradas |= alteradas - set(resumo)
+                raise
+
+            if self.metrics['cargas_completas'] > cargas_completas:
+                # Estatísticas do planejador após recarga de tabelas
+                conn.execute("ANALYZE")
+            if tabelas is None:
+                with conn:
+                    self._gravar_mtime(conn, mtime)
+                self._ultima_sync = time.monotonic()
+            conn.commit()
+            self.metrics['syncs'] += 1
+            logger.info(f"🔄 Réplica sincronizada em {time.time() - inicio:.3f}s: "
+                        f"{sum(resumo.values())} linhas em {len(resumo)} tabelas")
+            return resumo
+
+    def _ciclo(self) -> None:
+        """Um ciclo da thread de sincronização"""
+        with self._lock:
+            conn = self._preparar()
+            mtime = self._mtime_access()
+            replicado = self._mtime_replicado(conn)
+            with self._alteradas_lock:
+                alteradas = set(self._alteradas)
+
+            if mtime is not None and mtime != replicado:
+                # .accdb alterado por fora desta aplicação (ou réplica nova)
+                self.sincronizar(completa=True)
+            elif (mtime is None or not self._ultima_sync
+                    or time.monotonic() - self._ultima_sync > REPLICA_FULL_INTERVAL):
+                # Sem mtime confiável, primeira vez neste processo ou rede de segurança
+                self.sincronizar()
+            elif alteradas:
+                self.sincronizar(tabelas=alteradas)
+
+    def _trabalhar(self) -> None:
+        while not self._parar.is_set():
+            try:
+                self._ciclo()
+            except Exception as e:
+                # Access fora do ar: a réplica segue com os últimos dados sincronizados
+                logger.warning(f"⚠️ Falha ao sincronizar a réplica: {e}")
+            self._acordar.wait(REPLICA_MAX_AGE)
+            self._acordar.clear()
+
+    def iniciar(self) -> None:
+        """Inicia a thread de sincronização (de novo, se o processo foi bifurcado)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(
+                    target=self._trabalhar, name=f"replica-{self.access_path.stem}", daemon=True)
+                self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def _restaurar_tipos(self, df: pd.DataFrame, tabelas: set) -> pd.DataFrame:
+        """Sim/Não → bool e Data/Hora → datetime, pelo nome da coluna no resultado"""
+        tipos: Dict[str, set] = {}
+        for tabela in tabelas:
+            for coluna, tipo in self._tipos.get(tabela, {}).items():
+                tipos.setdefault(coluna, set()).add(tipo)
+        for coluna in df.columns:
+            tipo = tipos.get(coluna)
+            if tipo is None or len(tipo) != 1:
+                continue
+            if tipo == {'bool'}:
+                df[coluna] = df[coluna].map({1: True, 0: False})
+            else:
+                df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+        return df
+
+    def consultar(self, query: str, params: tuple = None) -> Optional[pd.DataFrame]:
+        """
+        Executa a query na réplica (sem sincronizar: isso é da thread)
+
+        Returns:
+            DataFrame, ou None se a query precisa ser atendida pelo Access
+        """
+        tabelas = tabelas_da_query(query)
+        if not tabelas or not tabelas <= set(TABELAS_REPLICADAS):
+            return None
+
+        self.iniciar()
+        with self._alteradas_lock:
+            pendentes = tabelas & self._alteradas
+        if not self._ultima_sync or pendentes or tabelas & self._incompletas:
+            # Primeira carga em andamento, recarga pendente ou tabela incompleta
+            self.metrics['fallbacks'] += 1
+            return None
+
+        try:
+            df = pd.read_sql_query(query, self._conexao_leitura(),
+                                   params=converter_parametros(params) if params else None)
+        except Exception as e:
+            # SQL específico do Access (ex.: LEN, IIF) é atendido pelo banco mestre
+            logger.debug(f"Réplica não atendeu a query ({e}); usando Access")
+            self.metrics['fallbacks'] += 1
+            return None
+
+        self.metrics['leituras'] += 1
+        return self._restaurar_tipos(df, tabelas)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._alteradas_lock:
+            alteradas = sorted(self._alteradas)
+        return {
+            'replica_path': str(self.replica_path),
+            'idade_s': round(time.monotonic() - self._ultima_sync, 1) if self._ultima_sync else None,
+            'sincronizando': self._thread is not None and self._thread.is_alive(),
+            'alteradas': alteradas,
+            'incompletas': sorted(self._incompletas),
+            **self.metrics,
+        }
+
+    def close(self) -> None:
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+        with self._lock:
+            if self._conn_sync is not None:
+                self._conn_sync.close()
+                self._conn_sync = None
+            self._ultima_sync = 0.0
+
+
+# ----------------------------------------------------------------------
+# Registro global: uma réplica por arquivo de banco
+# ----------------------------------------------------------------------
+_replicas: Dict[str, AccessReplica] = {}
+_replicas_lock = threading.Lock()
+
+
+def _replica_key(db_path) -> str:
+    return os.path.normcase(os.path.abspath(str(db_path)))
+
+
+def ativar_replica(db_path, replica_path=None, sincronizar: bool = True) -> AccessReplica:
+    """
+    Ativa a réplica local para o banco informado
+
+    Args:
+        db_path: Caminho para o arquivo .accdb (banco mestre)
+        replica_path: Arquivo SQLite da réplica (padrão: REPLICA_DIR)
+        sincronizar: Executa a carga/sincronização inicial imediatamente
+            (senão ela roda na thread de sincronização, e até lá as leituras
+            vão para o Access)
+    """
+    key = _replica_key(db_path)
+    with _replicas_lock:
+        replica = _replicas.get(key)
+        if replica is None:
+            replica = AccessReplica(db_path, replica_path)
+            _replicas[key] = replica
+    if sincronizar:
+        replica.sincronizar()
+    replica.iniciar()
+    return replica
+
+
+def desativar_replica(db_path) -> None:
+    """Remove a réplica do registro (as leituras voltam a ir direto para o Access)"""
+    with _replicas_lock:
+        replica = _replicas.pop(_replica_key(db_path), None)
+    if replica:
+        replica.close()
+
+
+def get_replica(db_path) -> Optional[AccessReplica]:
+    """
+    Réplica do banco, se ativa
+
+    Com ACCESS_REPLICA_ENABLED=1 a réplica é criada na primeira leitura de
+    cada banco; sem a variável, apenas bancos ativados com ativar_replica().
+    """
+    key = _replica_key(db_path)
+    with _replicas_lock:
+        replica = _replicas.get(key)
+        if replica is None and REPLICA_ENABLED:
+            replica = AccessReplica(db_path)
+            _replicas[key] = replica
+        return replica
+
+
+def _marcar_escrita(db_path, table_name: str, coluna: Optional[str] = None, ids=None) -> None:
+    with _replicas_lock:
+        replica = _replicas.get(_replica_key(db_path))
+    if replica is not None:
+        replica.marcar_alterada(table_name, coluna, ids)
+
+
+registrar_ouvinte_escrita(_marcar_escrita)
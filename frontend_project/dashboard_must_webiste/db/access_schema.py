@@ -0,0 +1,267 @@
+# db/access_schema.py
+"""
+Catálogo de schema do banco Access
+
+Lê tabelas, colunas e índices únicos via ODBC (cursor.tables / columns /
+statistics) uma vez por arquivo de banco e grava o resultado em um cache
+local (JSON), válido enquanto o mtime/tamanho do .accdb não mudar.
+
+Substitui as listas fixas espalhadas pelo código (campo ID por tabela,
+tabelas com ID_espelho, campos únicos) — as listas continuam aqui apenas
+como fallback quando a introspecção não está disponível.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import time
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+try:
+    from db.access_pool import pooled_connection
+except ImportError:
+    from access_pool import pooled_connection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_CACHE_DIR = Path(os.getenv(
+    "ACCESS_SCHEMA_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "access_schema_cache"),
+))
+SCHEMA_CACHE_VERSION = 1
+# Após uma falha de introspecção, espera antes de tentar de novo (dobra a cada
+# falha, até o máximo); nesse meio-tempo vale só o fallback fixo
+SCHEMA_RETRY_MIN = float(os.getenv("ACCESS_SCHEMA_RETRY_MIN", "5"))
+SCHEMA_RETRY_MAX = float(os.getenv("ACCESS_SCHEMA_RETRY_MAX", "300"))
+
+# ----------------------------------------------------------------------
+# Fallback: conhecimento fixo do schema LPP
+# ----------------------------------------------------------------------
+_PK_PADRAO = {
+    'tb_ValoresVariaveis': 'ID_ValorVar',
+    'tbl_Relacao_BaseCondicionante': 'ID_Relacao',
+    'tbl_Resultados_LPP': 'ID_result',
+    'tb_variaveisSelecionadas': 'ID_variavelSel',
+}
+
+_TABELAS_COM_ID_ESPELHO_PADRAO = {
+    'tb_BaseCondicionante',
+    'tb_cad_AgrupamentoCondicoes_LPP',
+    'tb_cad_configuracao_LPP',
+    'tb_cad_limite_LPP',
+    'tb_cadCondicoes_LPP',
+    'tb_DicionarioVariavel',
+    'tb_TipoLPP',
+    'tb_ValoresTesteVariaveis_LPP',
+    'tb_ValoresVariaveis',
+    'tb_variaveisSelecionadas',
+    'tb_vincula_CadConfig_Condicoes_LPP',
+    'tb_vincula_Limite_Configuracao_LPP',
+    'tbl_Relacao_BaseCondicionante',
+    'tbl_Resultados_LPP',
+}
+
+# Unicidade definida pela aplicação (não existe como índice no Access)
+_CAMPOS_UNICOS_PADRAO = {
+    'tb_variaveisSelecionadas': ['ID_Variavel', 'ID_vinculoConfigCondicao'],
+    'tb_ValoresVariaveis': ['ID_Base', 'ID_VariavelSel'],
+    'tbl_Relacao_BaseCondicionante': ['ID_Base', 'ID_Condicionante', 'ID_Result_fk'],
+    'tbl_Resultados_LPP': ['ID_Base', 'ID_vinculoConfigCondicao', 'NomeGrupo'],
+}
+
+
+class SchemaCatalog:
+    """Metadados de tabelas e colunas de um arquivo .accdb"""
+
+    def __init__(self, db_path, cache_dir: Path = SCHEMA_CACHE_DIR):
+        self.db_path = Path(db_path)
+        self.cache_dir = Path(cache_dir)
+        self._tables: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        # Backoff da introspecção que falhou: próxima tentativa e espera atual
+        self._tentar_em = 0.0
+        self._espera = 0.0
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+    def _assinatura_arquivo(self) -> Optional[Dict[str, Any]]:
+        try:
+            stat = self.db_path.stat()
+            return {'mtime': stat.st_mtime, 'size': stat.st_size}
+        except OSError:
+            return None
+
+    def _cache_file(self) -> Path:
+        chave = os.path.normcase(os.path.abspath(str(self.db_path)))
+        nome = hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{self.db_path.stem}_{nome}.json"
+
+    def _ler_cache(self, assinatura) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._cache_file(), 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if dados.get('version') != SCHEMA_CACHE_VERSION or dados.get('arquivo') != assinatura:
+            return None
+        return dados.get('tables')
+
+    def _gravar_cache(self, assinatura, tables) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            destino = self._cache_file()
+            # Temporário único: processos do servidor podem gravar o mesmo cache ao mesmo tempo
+            descritor, temporario = tempfile.mkstemp(dir=self.cache_dir, prefix=destino.name + '.',
+                                                     suffix='.tmp')
+            try:
+                with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+                    json.dump({'version': SCHEMA_CACHE_VERSION, 'db_path': str(self.db_path),
+                               'arquivo': assinatura, 'tables': tables}, f, ensure_ascii=False, indent=1)
+                os.replace(temporario, destino)
+            except BaseException:
+                try:
+                    os.remove(temporario)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível gravar o cache de schema: {e}")
+
+    def _introspectar(self, conn=None) -> Dict[str, Dict[str, Any]]:
+        """Lê o schema do banco via ODBC (na conexão `conn`, se informada)"""
+        tables: Dict[str, Dict[str, Any]] = {}
+        with pooled_connection(self.db_path, conn) as conn:
+            cursor = conn.cursor()
+            nomes = [row.table_name for row in cursor.tables(tableType='TABLE')]
+            for nome in nomes:
+                colunas = []
+                autoincremento = None
+                for col in cursor.columns(table=nome):
+                    colunas.append(col.column_name)
+                    if str(col.type_name).upper() == 'COUNTER' and autoincremento is None:
+                        autoincremento = col.column_name
+
+                indices: Dict[str, List[str]] = {}
+                try:
+                    for stat in cursor.statistics(table=nome, unique=True):
+                        if stat.index_name and stat.column_name:
+                            indices.setdefault(stat.index_name, []).append(stat.column_name)
+                except Exception:
+                    pass
+
+                pk_cols = indices.pop('PrimaryKey', None)
+                tables[nome] = {
+                    'columns': colunas,
+                    'primary_key': pk_cols[0] if pk_cols and len(pk_cols) == 1 else autoincremento,
+                    'unique_keys': [cols for cols in indices.values() if cols != pk_cols],
+                }
+        logger.info(f"📚 Schema lido via ODBC: {len(tables)} tabelas em {self.db_path.name}")
+        return tables
+
+    def load(self, force: bool = False, conn=None) -> Dict[str, Dict[str, Any]]:
+        """
+        Carrega o catálogo (memória → arquivo de cache → ODBC)
+
+        Args:
+            force: Ignora memória e cache em disco e relê o schema do banco
+            conn: Conexão do chamador para a introspecção (quem já segura uma
+                  conexão do pool não deve pedir outra)
+        """
+        with self._lock:
+            if self._tables is not None and not force:
+                return self._tables
+            if not force and time.monotonic() < self._tentar_em:
+                return {}
+
+            assinatura = self._assinatura_arquivo()
+            tables = None if force or assinatura is None else self._ler_cache(assinatura)
+            if tables is None:
+                try:
+                    tables = self._introspectar(conn)
+                    if assinatura is not None:
+                        self._gravar_cache(assinatura, tables)
+                except Exception as e:
+                    # Sem driver ou sem acesso ao banco: usa apenas o fallback fixo,
+                    # sem guardar o resultado (nova tentativa após o backoff)
+                    self._espera = min(max(self._espera * 2, SCHEMA_RETRY_MIN), SCHEMA_RETRY_MAX)
+                    self._tentar_em = time.monotonic() + self._espera
+                    logger.warning(f"⚠️ Introspecção de schema indisponível ({self.db_path.name}): {e}; "
+                                   f"nova tentativa em {self._espera:.0f}s")
+                    return {}
+            self._tables = tables
+            self._espera = 0.0
+            self._tentar_em = 0.0
+            return tables
+
+    def refresh(self) -> None:
+        """Relê o schema do banco (ex.: após criar tabelas/colunas)"""
+        self.load(force=True)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _tabela(self, table_name: str) -> Optional[Dict[str, Any]]:
+        return self.load().get(table_name)
+
+    def table_names(self) -> List[str]:
+        return list(self.load())
+
+    def columns(self, table_name: str) -> List[str]:
+        """Colunas da tabela (lista vazia se desconhecida)"""
+        tabela = self._tabela(table_name)
+        return list(tabela['columns']) if tabela else []
+
+    def has_column(self, table_name: str, column: str) -> bool:
+        tabela = self._tabela(table_name)
+        if tabela:
+            return column in tabela['columns']
+        return column == 'ID_espelho' and table_name in _TABELAS_COM_ID_ESPELHO_PADRAO
+
+    def has_id_espelho(self, table_name: str) -> bool:
+        """True se a tabela tem o campo ID_espelho"""
+        return self.has_column(table_name, 'ID_espelho')
+
+    def primary_key(self, table_name: str) -> str:
+        """Campo ID (chave primária) da tabela"""
+        tabela = self._tabela(table_name)
+        if tabela and tabela.get('primary_key'):
+            return tabela['primary_key']
+        return _PK_PADRAO.get(table_name, 'ID')
+
+    def unique_keys(self, table_name: str) -> List[str]:
+        """
+        Campos que identificam um registro para fins de UPSERT
+
+        Só as tabelas de _CAMPOS_UNICOS_PADRAO têm unicidade definida pela
+        aplicação; nas demais o UPSERT é uma inserção simples (os índices
+        únicos introspectados não transformam inserções em atualizações).
+        """
+        return list(_CAMPOS_UNICOS_PADRAO.get(table_name, []))
+
+    def first_existing_column(self, table_name: str, candidates: List[str]) -> Optional[str]:
+        """Primeira coluna de `candidates` que existe na tabela"""
+        colunas = set(self.columns(table_name))
+        return next((c for c in candidates if c in colunas), None)
+
+
+# ----------------------------------------------------------------------
+# Registro global: um catálogo por arquivo de banco
+# ----------------------------------------------------------------------
+_catalogs: Dict[str, SchemaCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_schema_catalog(db_path) -> SchemaCatalog:
+    """Retorna o catálogo do banco informado (criado na primeira chamada)"""
+    key = os.path.normcase(os.path.abspath(str(db_path)))
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = SchemaCatalog(db_path)
+            _catalogs[key] = catalog
+        return catalog
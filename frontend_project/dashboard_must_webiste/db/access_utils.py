@@ -1,167 +1,41 @@
 
 import pandas as pd
-import pyodbc
 import logging
-import time
+from itertools import groupby
 from pathlib import Path
-import threading
-from queue import Queue, Empty
 
-logger = logging.getLogger(__name__)
-
-# Pool de conexões (replicado do AccessDatabase para funções utilitárias)
-_connection_pool = Queue(maxsize=5)
-_pool_lock = threading.Lock()
-
-def _get_connection_from_pool(db_path: Path) -> pyodbc.Connection:
-    """Tenta obter conexão do pool ou cria uma nova."""
-    try:
-        return _connection_pool.get(timeout=0.1)
-    except Empty:
-        conn_str = (
-            r"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};"
-            rf"DBQ={db_path.absolute()};"
-            r"ExtendedAnsiSQL=1;"
-        )
-        conn = pyodbc.connect(conn_str)
-        # Configura encoding para CP1252 (Windows-1252) que é mais compatível
-        try:
-            conn.setdecoding(pyodbc.SQL_CHAR, encoding='cp1252')
-            conn.setdecoding(pyodbc.SQL_WCHAR, encoding='cp1252')
-            conn.setencoding(encoding='cp1252')
-        except:
-            # Se falhar, tenta UTF-8
-            try:
-                conn.setdecoding(pyodbc.SQL_CHAR, encoding='utf-8')
-                conn.setdecoding(pyodbc.SQL_WCHAR, encoding='utf-8')
-                conn.setencoding(encoding='utf-8')
-            except:
-                pass
-        logger.info(f"✅ Nova conexão Access criada (util): {db_path.name}")
-        return conn
-
-def _return_connection_to_pool(connection: pyodbc.Connection) -> None:
-    """Retorna conexão ao pool se não estiver cheio ou a fecha."""
-    try:
-        if not _connection_pool.full():
-            _connection_pool.put(connection, timeout=0.1)
-        else:
-            connection.close()
-    except:
-        try:
-            connection.close()
-        except:
-            pass
+# Pool e executor compartilhados com AccessDatabase (um pool por banco, mesmo encoding)
+try:
+    from db.access_pool import (
+        pooled_connection, converter_parametros, execute_non_query,
+    )
+    from db.access_cache import invalidate_lookup
+    from db.access_schema import get_schema_catalog
+except ImportError:
+    from access_pool import (
+        pooled_connection, converter_parametros, execute_non_query,
+    )
+    from access_cache import invalidate_lookup
+    from access_schema import get_schema_catalog
 
-def _execute_query(db_path: Path, query: str, params: tuple = None) -> pd.DataFrame:
-    """
-    Executa uma query SQL no Access e retorna um DataFrame.
-    Gerencia a conexão via pool.
-    """
-    conn = None
-    try:
-        conn = _get_connection_from_pool(db_path)
-        cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-
-        columns = [column[0] for column in cursor.description]
-        rows = cursor.fetchall()
-        df = pd.DataFrame.from_records(rows, columns=columns)
-        return df
-    except Exception as e:
-        logger.error(f"❌ Erro em _execute_query (util): {e}")
-        raise
-    finally:
-        if conn:
-            _return_connection_to_pool(conn)
+logger = logging.getLogger(__name__)
 
-def _execute_non_query(db_path: Path, query: str, params: tuple = None) -> bool:
-    """
-    Executa uma query SQL que não retorna dados (INSERT, UPDATE, DELETE).
-    Gerencia a conexão via pool.
-    """
-    conn = None
-    try:
-        conn = _get_connection_from_pool(db_path)
-        cursor = conn.cursor()
-        if params:
-            # Converte parâmetros para tipos Python padrão
-            params_convertidos = []
-            for param in params:
-                if hasattr(param, 'item'):  # numpy.int64, numpy.float64, etc.
-                    params_convertidos.append(param.item())
-                else:
-                    params_convertidos.append(param)
-            cursor.execute(query, tuple(params_convertidos))
-        else:
-            cursor.execute(query)
-        conn.commit()
-        logger.info(f"✅ Query executada com sucesso (util): {cursor.rowcount} linhas afetadas")
-        return True
-    except Exception as e:
-        logger.error(f"❌ Erro em _execute_non_query (util): {e}")
-        if conn: # Tenta rollback em caso de erro
-            try:
-                conn.rollback()
-            except:
-                pass
-        raise
-    finally:
-        if conn:
-            _return_connection_to_pool(conn)
+# Valores por cláusula IN ao buscar registros existentes de um lote
+UPSERT_LOTE_IN_CHUNK = 200
 
 def _tabela_tem_campo_id_espelho(db_path: Path, table_name: str) -> bool:
     """
-    Verifica se uma tabela tem o campo ID_espelho.
-    """
-    tabelas_com_id_espelho = [
-        'tb_BaseCondicionante',
-        'tb_cad_AgrupamentoCondicoes_LPP',
-        'tb_cad_configuracao_LPP',
-        'tb_cad_limite_LPP',
-        'tb_cadCondicoes_LPP',
-        'tb_DicionarioVariavel',
-        'tb_TipoLPP',
-        'tb_ValoresTesteVariaveis_LPP',
-        'tb_ValoresVariaveis',
-        'tb_variaveisSelecionadas',
-        'tb_vincul-CadConfig_Condicoes_LPP',
-        'tb_vincula_Limite_Configuracao_LPP',
-        'tbl_Relacao_BaseCondicionante',
-        'tbl_Resultados_LPP'
-    ]
-    return table_name in tabelas_com_id_espelho
-
-def _atualizar_id_espelho(db_path: Path, table_name: str, id_field: str, novo_id: int) -> bool:
-    """
-    Atualiza o campo ID_espelho após inserção.
+    Verifica se uma tabela tem o campo ID_espelho (catálogo de schema).
     """
-    if not _tabela_tem_campo_id_espelho(db_path, table_name):
-        logger.info(f"ℹ️ Tabela {table_name} não tem campo ID_espelho (util)")
-        return True
+    return get_schema_catalog(db_path).has_id_espelho(table_name)
 
-    query_update = f"UPDATE {table_name} SET ID_espelho = ? WHERE {id_field} = ?"
-    return _execute_non_query(db_path, query_update, (novo_id, novo_id))
-
-def _obter_id_field(table_name: str) -> str:
+def _obter_id_field(db_path: Path, table_name: str) -> str:
     """
-    Retorna o nome do campo ID primário para uma dada tabela.
+    Retorna o nome do campo ID primário para uma dada tabela (catálogo de schema).
     """
-    if table_name == 'tb_ValoresVariaveis':
-        return 'ID_ValorVar'
-    elif table_name == 'tbl_Relacao_BaseCondicionante':
-        return 'ID_Relacao'
-    elif table_name == 'tbl_Resultados_LPP':
-        return 'ID_result'
-    elif table_name == 'tb_variaveisSelecionadas':
-        return 'ID_variavelSel'
-    else:
-        return 'ID'
+    return get_schema_catalog(db_path).primary_key(table_name)
 
-def _verificar_registro_existente(db_path: Path, table_name: str, campos_unicos: dict) -> tuple:
+def _verificar_registro_existente(db_path: Path, table_name: str, campos_unicos: dict, conn=None) -> tuple:
     """
     Verifica se já existe um registro com os valores especificados.
     Retorna (existe, id_existente) onde existe é bool e id_existente é o ID se existir.
@@ -176,15 +50,14 @@ def _verificar_registro_existente(db_path: Path, table_name: str, campos_unicos:
         valores.append(valor)
 
     where_clause = " AND ".join(condicoes)
-    id_field = _obter_id_field(table_name)
+    id_field = _obter_id_field(db_path, table_name)
     query = f"SELECT {id_field} FROM {table_name} WHERE {where_clause}"
 
-    conn = None
     try:
-        conn = _get_connection_from_pool(db_path)
-        cursor = conn.cursor()
-        cursor.execute(query, valores)
-        row = cursor.fetchone()
+        with pooled_connection(db_path, conn) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, converter_parametros(valores))
+            row = cursor.fetchone()
         if row:
             return True, row[0]
         else:
@@ -192,51 +65,46 @@ def _verificar_registro_existente(db_path: Path, table_name: str, campos_unicos:
     except Exception as e:
         logger.error(f"❌ Erro ao verificar registro existente (util) em {table_name}: {e}")
         return False, None
-    finally:
-        if conn:
-            _return_connection_to_pool(conn)
 
-def _obter_campos_unicos_tabela(table_name: str) -> list:
+def _obter_campos_unicos_tabela(db_path: Path, table_name: str) -> list:
     """
     Retorna os campos que devem ser verificados para unicidade em cada tabela.
     """
-    campos_unicos_por_tabela = {
-        'tb_variaveisSelecionadas': ['ID_Variavel', 'ID_vinculoConfigCondicao'],
-        'tb_ValoresVariaveis': ['ID_Base', 'ID_VariavelSel'],
-        'tbl_Relacao_BaseCondicionante': ['ID_Base', 'ID_Condicionante', 'ID_Result_fk'],
-        'tbl_Resultados_LPP': ['ID_Base', 'ID_vinculoConfigCondicao', 'NomeGrupo']
-    }
-    return campos_unicos_por_tabela.get(table_name, [])
+    return get_schema_catalog(db_path).unique_keys(table_name)
 
-def upsert_with_mirror_id(table_name: str, item_data: dict, db_path: str) -> int:
+def upsert_with_mirror_id(table_name: str, item_data: dict, db_path: str, conn=None) -> int:
     """
     Realiza um UPSERT (INSERT ou UPDATE) em uma tabela e gerencia o ID_espelho.
+
+    `conn` é a conexão que o chamador já tem do pool (ex.: AccessDatabase
+    dentro de access_session); sem ela, cada etapa empresta uma do pool.
     """
     db_path_obj = Path(db_path)
     if not db_path_obj.exists():
         raise FileNotFoundError(f"Banco Access não encontrado: {db_path}")
 
-    id_field = _obter_id_field(table_name)
-    campos_unicos = {k: v for k, v in item_data.items() if k in _obter_campos_unicos_tabela(table_name)}
+    # Introspecção do schema (se ainda não carregado) na mesma conexão
+    get_schema_catalog(db_path_obj).load(conn=conn)
+    id_field = _obter_id_field(db_path_obj, table_name)
+    campos_unicos = {k: v for k, v in item_data.items() if k in _obter_campos_unicos_tabela(db_path_obj, table_name)}
     
     # Tenta encontrar registro existente pelos campos únicos
-    existe, id_existente = _verificar_registro_existente(db_path_obj, table_name, campos_unicos)
+    existe, id_existente = _verificar_registro_existente(db_path_obj, table_name, campos_unicos, conn)
 
     if existe:
         # Atualização
         logger.info(f"✏️ Atualizando item existente em {table_name} com ID: {id_existente}")
         # Remove campos únicos dos dados a serem atualizados para evitar conflito
         data_to_update = {k: v for k, v in item_data.items() if k not in campos_unicos}
-        if atualizar_item_with_mirror(table_name, id_existente, data_to_update, db_path):
+        if atualizar_item_with_mirror(table_name, id_existente, data_to_update, db_path, conn):
             # Após atualização, precisamos obter o ID_espelho se for uma tabela que o usa
             if _tabela_tem_campo_id_espelho(db_path_obj, table_name):
-                conn = None
                 try:
-                    conn = _get_connection_from_pool(db_path_obj)
-                    cursor = conn.cursor()
-                    query_get_mirror_id = f"SELECT ID_espelho FROM {table_name} WHERE {id_field} = ?"
-                    cursor.execute(query_get_mirror_id, (id_existente,))
-                    result = cursor.fetchone()
+                    with pooled_connection(db_path_obj, conn) as conexao:
+                        cursor = conexao.cursor()
+                        query_get_mirror_id = f"SELECT ID_espelho FROM {table_name} WHERE {id_field} = ?"
+                        cursor.execute(query_get_mirror_id, converter_parametros((id_existente,)))
+                        result = cursor.fetchone()
                     if result:
                         logger.info(f"✅ Item atualizado em {table_name} com ID_espelho: {result[0]}")
                         return result[0]
@@ -246,52 +114,268 @@ def upsert_with_mirror_id(table_name: str, item_data: dict, db_path: str) -> int
                 except Exception as e:
                     logger.error(f"❌ Erro ao obter ID_espelho após atualização: {e}")
                     return id_existente # Retorna o ID normal como fallback
-                finally:
-                    if conn:
-                        _return_connection_to_pool(conn)
             else:
                 return id_existente
         else:
             raise Exception(f"Falha ao atualizar item em {table_name} com ID: {id_existente}")
     else:
-        # Inserção
+        # Inserção (INSERT + ID_espelho atômicos)
         logger.info(f"➕ Inserindo novo item em {table_name}")
-        columns = ', '.join(item_data.keys())
-        placeholders = ', '.join(['?' for _ in item_data.values()])
-        insert_query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-        
-        conn = None
-        try:
-            conn = _get_connection_from_pool(db_path_obj)
+        return insert_with_mirror_id(table_name, item_data, db_path_obj, conn)
+
+def _ultimo_id_inserido(cursor) -> int:
+    """
+    ID gerado pelo último INSERT do cursor (@@IDENTITY no Access; drivers
+    DB-API que expõem lastrowid, como o SQLite, usam o atributo).
+    """
+    novo_id = getattr(cursor, 'lastrowid', None)
+    if novo_id is None:
+        novo_id = cursor.execute("SELECT @@IDENTITY").fetchone()[0]
+    return novo_id
+
+def inserir_com_espelho(cursor, table_name: str, item_data: dict, id_field: str, tem_espelho: bool) -> int:
+    """
+    INSERT seguido do UPDATE de ID_espelho no mesmo cursor, sem commit.
+    Quem chama é responsável pelo commit/rollback da transação.
+    """
+    columns = ', '.join(item_data.keys())
+    placeholders = ', '.join(['?' for _ in item_data.values()])
+    cursor.execute(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
+                   converter_parametros(item_data.values()))
+    novo_id = _ultimo_id_inserido(cursor)
+    if tem_espelho:
+        cursor.execute(f"UPDATE {table_name} SET ID_espelho = ? WHERE {id_field} = ?", (novo_id, novo_id))
+    return novo_id
+
+def insert_with_mirror_id(table_name: str, item_data: dict, db_path: str, conn=None) -> int:
+    """
+    Insere um registro e preenche o ID_espelho em uma única transação.
+
+    INSERT, leitura do ID gerado e UPDATE do ID_espelho rodam na mesma
+    conexão com um único commit: nenhum leitor enxerga a linha nova com
+    ID_espelho vazio. É o caminho usado por upsert_with_mirror_id para
+    todas as tabelas espelhadas. Com `conn`, usa a conexão do chamador.
+    """
+    db_path_obj = Path(db_path)
+    get_schema_catalog(db_path_obj).load(conn=conn)
+    id_field = _obter_id_field(db_path_obj, table_name)
+    tem_espelho = _tabela_tem_campo_id_espelho(db_path_obj, table_name)
+
+    try:
+        with pooled_connection(db_path_obj, conn) as conn:
             cursor = conn.cursor()
-            
-            params_convertidos = []
-            for param in item_data.values():
-                if hasattr(param, 'item'):
-                    params_convertidos.append(param.item())
-                else:
-                    params_convertidos.append(param)
-            
-            cursor.execute(insert_query, tuple(params_convertidos))
-            novo_id = cursor.execute("SELECT @@IDENTITY").fetchone()[0]
-            conn.commit()
-            
-            if _atualizar_id_espelho(db_path_obj, table_name, id_field, novo_id):
-                logger.info(f"✅ Novo item inserido em {table_name} com ID: {novo_id}, ID_espelho: {novo_id}")
-                return novo_id
-            else:
-                raise Exception(f"Falha ao atualizar ID_espelho para {table_name} com ID: {novo_id}")
-        except Exception as e:
-            logger.error(f"❌ Erro na inserção com ID_espelho (util): {e}")
-            if conn: # Tenta rollback em caso de erro
+            try:
+                novo_id = inserir_com_espelho(cursor, table_name, item_data, id_field, tem_espelho)
+                conn.commit()
+            except Exception:
                 try:
                     conn.rollback()
                 except:
                     pass
+                raise
+    except Exception as e:
+        logger.error(f"❌ Erro na inserção com ID_espelho (util): {e}")
+        raise
+
+    invalidate_lookup(db_path_obj, table_name, id_field, [novo_id])
+    logger.info(f"✅ Novo item inserido em {table_name} com ID: {novo_id}, ID_espelho: {novo_id}")
+    return novo_id
+
+def _normalizar_valor(valor):
+    """Converte tipos numpy para Python e NaN para None"""
+    if valor is pd.NA or valor is pd.NaT:
+        return None
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    if isinstance(valor, float) and valor != valor:
+        return None
+    return valor
+
+def _registros_para_lista(registros) -> list:
+    """Aceita DataFrame ou lista de dicionários e devolve dicionários com tipos Python"""
+    if isinstance(registros, pd.DataFrame):
+        registros = registros.to_dict('records')
+    return [{k: _normalizar_valor(v) for k, v in registro.items()} for registro in registros]
+
+def _valor_chave(valor):
+    """Valor normalizado para comparar chaves: texto sem diferença de caixa, como o `=` do Access"""
+    valor = _normalizar_valor(valor)
+    return valor.casefold() if isinstance(valor, str) else valor
+
+def _buscar_registros_existentes(cursor, table_name: str, id_field: str, tem_espelho: bool,
+                                 campos_unicos: list, valores: list) -> dict:
+    """
+    Resolve os registros já existentes de um lote com consultas pelo primeiro
+    campo único (IN em blocos de UPSERT_LOTE_IN_CHUNK valores desse campo).
+    Retorna {chave: (id, id_espelho)}, com a chave montada por _valor_chave.
+    """
+    colunas = [id_field] + (['ID_espelho'] if tem_espelho else []) + campos_unicos
+    valores = list(dict.fromkeys(valor for valor in valores if valor is not None))
+    existentes = {}
+    for inicio in range(0, len(valores), UPSERT_LOTE_IN_CHUNK):
+        bloco = valores[inicio:inicio + UPSERT_LOTE_IN_CHUNK]
+        placeholders = ', '.join('?' for _ in bloco)
+        cursor.execute(
+            f"SELECT {', '.join(colunas)} FROM {table_name} WHERE {campos_unicos[0]} IN ({placeholders})",
+            converter_parametros(bloco),
+        )
+        for row in cursor.fetchall():
+            chave = tuple(_valor_chave(v) for v in row[-len(campos_unicos):])
+            espelho = row[1] if tem_espelho and row[1] is not None else row[0]
+            existentes.setdefault(chave, (row[0], espelho))
+    return existentes
+
+def upsert_many_with_mirror_id(table_name: str, registros, db_path: str, conn=None) -> dict:
+    """
+    UPSERT em lote com gerenciamento do ID_espelho, em uma única transação.
+
+    - Registros existentes são identificados pelos campos únicos que cada
+      registro traz (texto sem diferença de caixa, como no Access), com uma
+      consulta por bloco de chaves (não uma por registro).
+    - Atualizações e inserções usam executemany.
+    - O ID_espelho de todas as linhas novas é preenchido com um único UPDATE.
+    - Registros repetidos no lote são mesclados (o último valor prevalece),
+      como aconteceria com chamadas sequenciais de upsert_with_mirror_id.
+
+    Args:
+        table_name: Nome da tabela Access
+        registros: DataFrame ou lista de dicionários
+        db_path: Caminho para o banco Access
+        conn: Conexão do chamador (opcional; sem ela, empresta uma do pool)
+
+    Returns:
+        {'inseridos': n, 'atualizados': n, 'ids_espelho': [...]}, com
+        ids_espelho na ordem dos registros recebidos (None se não identificado)
+    """
+    db_path_obj = Path(db_path)
+    if not db_path_obj.exists():
+        raise FileNotFoundError(f"Banco Access não encontrado: {db_path}")
+
+    linhas = _registros_para_lista(registros)
+    if not linhas:
+        return {'inseridos': 0, 'atualizados': 0, 'ids_espelho': []}
+
+    get_schema_catalog(db_path_obj).load(conn=conn)
+    id_field = _obter_id_field(db_path_obj, table_name)
+    tem_espelho = _tabela_tem_campo_id_espelho(db_path_obj, table_name)
+    campos_unicos = _obter_campos_unicos_tabela(db_path_obj, table_name)
+    campos_protegidos = set(campos_unicos) | {id_field, 'ID', 'ID_result', 'ID_espelho'}
+
+    # Como em upsert_with_mirror_id, cada registro é identificado pelos campos
+    # únicos que ele traz: a chave é (campos presentes, valores); registros sem
+    # nenhum campo único são apenas inseridos
+    chaves = []
+    for linha in linhas:
+        presentes = tuple(c for c in campos_unicos if c in linha)
+        chaves.append((presentes, tuple(_valor_chave(linha[c]) for c in presentes)) if presentes else None)
+    grupos_chave = {}
+    for linha, chave in zip(linhas, chaves):
+        if chave is not None:
+            grupos_chave.setdefault(chave[0], []).append(linha[chave[0][0]])
+
+    with pooled_connection(db_path_obj, conn) as conn:
+        cursor = conn.cursor()
+        try:
+            existentes = {}
+            for presentes, valores in grupos_chave.items():
+                encontrados = _buscar_registros_existentes(cursor, table_name, id_field, tem_espelho,
+                                                           list(presentes), valores)
+                existentes.update(((presentes, valores_chave), ids)
+                                  for valores_chave, ids in encontrados.items())
+
+            atualizacoes = {}
+            novos = {}
+            sem_chave = []
+            for linha, chave in zip(linhas, chaves):
+                if chave is None:
+                    sem_chave.append(linha)
+                elif chave in existentes:
+                    atualizacoes.setdefault(chave, {}).update(linha)
+                else:
+                    novos.setdefault(chave, {}).update(linha)
+
+            # Atualizações: um executemany por conjunto de colunas
+            grupos_update = {}
+            for chave, dados in atualizacoes.items():
+                dados = {k: v for k, v in dados.items() if k not in campos_protegidos}
+                if dados:
+                    grupos_update.setdefault(tuple(dados), []).append(
+                        converter_parametros(list(dados.values()) + [existentes[chave][0]])
+                    )
+            for colunas, params in grupos_update.items():
+                set_clause = ', '.join(f"{coluna} = ?" for coluna in colunas)
+                cursor.executemany(f"UPDATE {table_name} SET {set_clause} WHERE {id_field} = ?", params)
+
+            # Inserções: executemany por sequência de registros com as mesmas colunas
+            # (a ordem de inserção é preservada para mapear os IDs gerados)
+            inserir = list(novos.values()) + sem_chave
+            ids_novos = []
+            if inserir:
+                ultimo_id = cursor.execute(f"SELECT MAX({id_field}) FROM {table_name}").fetchone()[0] or 0
+                for colunas, grupo in groupby(inserir, key=lambda dados: tuple(dados)):
+                    placeholders = ', '.join('?' for _ in colunas)
+                    cursor.executemany(
+                        f"INSERT INTO {table_name} ({', '.join(colunas)}) VALUES ({placeholders})",
+                        [converter_parametros(dados.values()) for dados in grupo],
+                    )
+
+                # ID_espelho = ID de todas as linhas novas em um único UPDATE
+                if tem_espelho:
+                    cursor.execute(
+                        f"UPDATE {table_name} SET ID_espelho = {id_field} "
+                        f"WHERE {id_field} > ? AND ID_espelho IS NULL",
+                        (ultimo_id,),
+                    )
+
+                colunas_retorno = ', '.join([id_field] + campos_unicos)
+                cursor.execute(
+                    f"SELECT {colunas_retorno} FROM {table_name} WHERE {id_field} > ? ORDER BY {id_field}",
+                    (ultimo_id,),
+                )
+                ids_novos = cursor.fetchall()
+
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except:
+                pass
             raise
-        finally:
-            if conn:
-                _return_connection_to_pool(conn)
+
+    ids_escritos = [existentes[chave][0] for chave in atualizacoes] + [row[0] for row in ids_novos]
+    invalidate_lookup(db_path_obj, table_name, id_field, ids_escritos)
+
+    # IDs na ordem dos registros recebidos: as linhas novas saem na ordem de
+    # inserção (primeiro as com chave, depois as sem chave)
+    if len(ids_novos) == len(inserir):
+        ids_inseridos = dict(zip(novos, (row[0] for row in ids_novos)))
+        ids_sem_chave = iter(row[0] for row in ids_novos[len(novos):])
+        ids_espelho = [existentes[chave][1] if chave in existentes
+                       else ids_inseridos[chave] if chave is not None else next(ids_sem_chave)
+                       for chave in chaves]
+    else:
+        # Outro processo inseriu na mesma tabela durante o lote: só as linhas
+        # com chave são identificadas, pelos valores dos campos únicos
+        mapa_novos = {}
+        for row in ids_novos:
+            valores = dict(zip(campos_unicos, (_valor_chave(v) for v in row[1:])))
+            for presentes in grupos_chave:
+                mapa_novos.setdefault((presentes, tuple(valores[c] for c in presentes)), row[0])
+        ids_espelho = [existentes[chave][1] if chave in existentes else mapa_novos.get(chave)
+                       for chave in chaves]
+
+    resultado = {'inseridos': len(inserir), 'atualizados': len(atualizacoes), 'ids_espelho': ids_espelho}
+    logger.info(f"✅ Lote em {table_name}: {resultado['inseridos']} inseridos, {resultado['atualizados']} atualizados (util)")
+    return resultado
+
+def salvar_itens_with_mirror(table_name: str, registros, db_path: str) -> dict:
+    """
+    Função wrapper para salvar vários itens, retornando um dicionário com sucesso e contagens.
+    """
+    try:
+        return {"success": True, **upsert_many_with_mirror_id(table_name, registros, db_path)}
+    except Exception as e:
+        return {"success": False, "inseridos": 0, "atualizados": 0, "ids_espelho": [], "error": str(e)}
 
 def salvar_item_with_mirror(table_name: str, item_data: dict, db_path: str) -> dict:
     """
@@ -311,17 +395,19 @@ def deletar_item_with_mirror(table_name: str, item_id: int, db_path: str) -> boo
     if not db_path_obj.exists():
         raise FileNotFoundError(f"Banco Access não encontrado: {db_path}")
 
-    id_field = _obter_id_field(table_name)
+    id_field = _obter_id_field(db_path_obj, table_name)
     query = f"DELETE FROM {table_name} WHERE {id_field} = ?"
     
     try:
         item_id_convertido = int(item_id) if hasattr(item_id, 'item') else item_id
-        return _execute_non_query(db_path_obj, query, (item_id_convertido,))
+        sucesso = execute_non_query(db_path_obj, query, (item_id_convertido,))
+        invalidate_lookup(db_path_obj, table_name, id_field, [item_id_convertido])
+        return sucesso
     except Exception as e:
         logger.error(f"❌ Erro ao deletar item {item_id} de {table_name} (util): {e}")
         return False
 
-def atualizar_item_with_mirror(table_name: str, item_id: int, item_data: dict, db_path: str) -> bool:
+def atualizar_item_with_mirror(table_name: str, item_id: int, item_data: dict, db_path: str, conn=None) -> bool:
     """
     Atualiza um item específico em uma tabela, considerando o ID_espelho.
     """
@@ -333,7 +419,8 @@ def atualizar_item_with_mirror(table_name: str, item_id: int, item_data: dict, d
         logger.warning("⚠️ Nenhum dado para atualização (util)")
         return False
 
-    id_field = _obter_id_field(table_name)
+    get_schema_catalog(db_path_obj).load(conn=conn)
+    id_field = _obter_id_field(db_path_obj, table_name)
     # Remove o campo de ID dos dados a serem atualizados, se presente
     item_data_filtered = {k: v for k, v in item_data.items() if k != id_field and k != 'ID' and k != 'ID_result' and k != 'ID_espelho'}
 
@@ -346,7 +433,9 @@ def atualizar_item_with_mirror(table_name: str, item_id: int, item_data: dict, d
     params = tuple(item_data_filtered.values()) + (item_id,)
 
     try:
-        return _execute_non_query(db_path_obj, query, params)
+        sucesso = execute_non_query(db_path_obj, query, params, conn=conn)
+        invalidate_lookup(db_path_obj, table_name, id_field, [item_id])
+        return sucesso
     except Exception as e:
         logger.error(f"❌ Erro ao atualizar item {item_id} em {table_name} (util): {e}")
         return False
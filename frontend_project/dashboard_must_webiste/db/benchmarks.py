@@ -0,0 +1,637 @@
+# db/benchmarks.py
+"""
+Micro-benchmarks da camada de acesso a dados
+
+Usam um arquivo SQLite local como stand-in do bd_gestaolpp.accdb, com o
+mesmo pool/executor de access_pool.py. Os números absolutos não representam
+o share de rede, mas a diferença relativa entre as abordagens sim.
+
+Uso (a partir de dashboard_must_webiste/):
+    python -m db.benchmarks
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from db import access_pool
+    from db import access_utils
+    from db import must_api
+    from db import get_db_access_connection
+    from db.db_sqlite import SQLiteDatabase
+except ImportError:
+    import access_pool
+    import access_utils
+    import must_api
+    import get_db_access_connection
+    from db_sqlite import SQLiteDatabase
+
+
+def _conectar_sqlite(db_path: Path):
+    return sqlite3.connect(str(db_path), check_same_thread=False)
+
+
+def _registrar_pool_sqlite(db_path: Path, **config) -> access_pool.ConnectionPool:
+    """Cria (ou substitui) o pool do arquivo usando conexões SQLite"""
+    key = access_pool._pool_key(db_path)
+    with access_pool._pools_lock:
+        antigo = access_pool._pools.pop(key, None)
+    if antigo:
+        antigo.close()
+    return access_pool.get_connection_pool(db_path, connect_fn=_conectar_sqlite, **config)
+
+
+def _cronometrar(fn, repeticoes: int) -> float:
+    """Executa fn() `repeticoes` vezes e retorna o tempo médio por chamada em ms"""
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        fn(i)
+    return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def _criar_hierarquia_sqlite(db_path: Path, n_limites: int = 200, configs_por_limite: int = 5) -> None:
+    """Popula um banco SQLite com as tabelas de limite/configuração do LPP"""
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        CREATE TABLE tb_cad_limite_LPP (
+            ID INTEGER PRIMARY KEY, ID_espelho INTEGER, NomeLimite TEXT, Ativo INTEGER, Status TEXT
+        );
+        CREATE TABLE tb_cad_configuracao_LPP (
+            ID INTEGER PRIMARY KEY, ID_espelho INTEGER, NomeConfiguracao TEXT, Status TEXT
+        );
+        CREATE TABLE tb_vincula_Limite_Configuracao_LPP (
+            ID INTEGER PRIMARY KEY, ID_Limite INTEGER, ID_Configuracao INTEGER
+        );
+    """)
+    limites = []
+    configs = []
+    vinculos = []
+    for limite in range(1, n_limites + 1):
+        limites.append((limite, limite, f"Limite {limite}", 1, "Ativo"))
+        for c in range(configs_por_limite):
+            config_id = limite * 100 + c
+            configs.append((config_id, config_id, f"Config {config_id}", "Ativo"))
+            vinculos.append((limite, config_id))
+    conn.executemany("INSERT INTO tb_cad_limite_LPP VALUES (?, ?, ?, ?, ?)", limites)
+    conn.executemany("INSERT INTO tb_cad_configuracao_LPP VALUES (?, ?, ?, ?)", configs)
+    conn.executemany(
+        "INSERT INTO tb_vincula_Limite_Configuracao_LPP (ID_Limite, ID_Configuracao) VALUES (?, ?)",
+        vinculos,
+    )
+    conn.commit()
+    conn.close()
+
+
+def benchmark_queries_parametrizadas(n_chamadas: int = 5000, n_limites: int = 200) -> dict:
+    """
+    Compara a query de listar_configuracoes montada com f-string (um texto SQL
+    por limite, reparseado a cada chamada) com a versão parametrizada que usa
+    o cache de statements do pool.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "lpp_benchmark.db"
+        _criar_hierarquia_sqlite(db_path, n_limites=n_limites)
+        pool = _registrar_pool_sqlite(db_path)
+
+        ids = [random.randint(1, n_limites) for _ in range(n_chamadas)]
+        sql_base = """
+        SELECT tc.ID_espelho as ID, tc.ID_espelho, tc.NomeConfiguracao, tc.Status, tv.ID_Limite
+        FROM tb_cad_configuracao_LPP tc
+        INNER JOIN tb_vincula_Limite_Configuracao_LPP tv
+        ON tc.ID_espelho = tv.ID_Configuracao
+        WHERE tv.ID_Limite = {}
+        ORDER BY tc.NomeConfiguracao
+        """
+
+        with access_pool.pooled_connection(db_path) as conn:
+            ms_fstring = _cronometrar(
+                lambda i: access_pool.run_query(conn, sql_base.format(ids[i]), db_path=db_path),
+                n_chamadas,
+            )
+            ms_param = _cronometrar(
+                lambda i: access_pool.run_query(conn, sql_base.format("?"), (ids[i],), db_path=db_path),
+                n_chamadas,
+            )
+
+        stats = pool.stats()
+        pool.close()
+
+    resultado = {
+        'chamadas': n_chamadas,
+        'ms_por_chamada_fstring': round(ms_fstring, 4),
+        'ms_por_chamada_parametrizada': round(ms_param, 4),
+        'reducao_pct': round((1 - ms_param / ms_fstring) * 100, 1),
+        'stmt_hits': stats['stmt_hits'],
+        'stmt_misses': stats['stmt_misses'],
+    }
+    print(f"📊 Queries parametrizadas: {resultado}")
+    return resultado
+
+
+def benchmark_sessoes_access(n_chamadas: int = 1000, n_limites: int = 200) -> dict:
+    """
+    Compara chamadas sequenciais de listar_configuracoes_access no padrão
+    antigo (AccessDatabase novo, conexão nova e connection.close() a cada
+    chamada) com a sessão compartilhada por banco (access_session).
+
+    Abrir um arquivo SQLite local é muito mais barato que abrir um .accdb no
+    share via ODBC, então a diferença real em produção é maior que a medida.
+    """
+    try:
+        from db import access_db
+    except ImportError:
+        import access_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "lpp_benchmark.db"
+        _criar_hierarquia_sqlite(db_path, n_limites=n_limites)
+        pool = _registrar_pool_sqlite(db_path)
+        ids = [random.randint(1, n_limites) for _ in range(n_chamadas)]
+
+        # O stand-in SQLite não depende do pyodbc
+        disponivel = access_db.ACCESS_AVAILABLE
+        access_db.ACCESS_AVAILABLE = True
+        try:
+            def padrao_antigo(i):
+                db = access_db.AccessDatabase(db_path)
+                db.connection = _conectar_sqlite(db_path)
+                try:
+                    return db.listar_configuracoes(ids[i])
+                finally:
+                    db.connection.close()
+
+            ms_antes = _cronometrar(padrao_antigo, n_chamadas)
+            ms_depois = _cronometrar(
+                lambda i: access_db.listar_configuracoes_access(ids[i], db_path=db_path),
+                n_chamadas,
+            )
+        finally:
+            access_db.ACCESS_AVAILABLE = disponivel
+
+        stats = pool.stats()
+        pool.close()
+
+    resultado = {
+        'chamadas': n_chamadas,
+        'ms_por_chamada_antes': round(ms_antes, 4),
+        'ms_por_chamada_sessao': round(ms_depois, 4),
+        'reducao_pct': round((1 - ms_depois / ms_antes) * 100, 1),
+        'conexoes_criadas_pool': stats['created'],
+    }
+    print(f"📊 Sessões *_access: {resultado}")
+    return resultado
+
+
+def _amostra_valores_escala(n: int, seed: int = 42) -> list:
+    """Valores no formato lido de tb_ValoresVariaveis, cobrindo todas as regras de escala"""
+    rng = random.Random(seed)
+    geradores = [
+        lambda: rng.choice([-1, 1]) * rng.randint(1, 999) * 1000,   # múltiplos de 1000
+        lambda: rng.choice([-1, 1]) * rng.randint(1, 9999) * 10,    # múltiplos de 10
+        lambda: rng.uniform(-999.9, 999.9),                          # decimais pequenos
+        lambda: float(rng.randint(-1200, 1200)),                     # inteiros
+        lambda: rng.uniform(-1e6, 1e6),
+        lambda: rng.choice([None, float('nan'), 0, 0.0, 1000, -1000, 5000, 50, "12", "1,5", "abc"]),
+    ]
+    return [rng.choice(geradores)() for _ in range(n)]
+
+
+def benchmark_correcao_escala(n_valores: int = 200_000) -> dict:
+    """
+    Compara _corrigir_escala_valor aplicado valor a valor com a versão
+    vetorizada _corrigir_escala_valores e confere que os resultados são
+    idênticos para a amostra.
+    """
+    try:
+        from db import access_db
+    except ImportError:
+        import access_db
+
+    valores = _amostra_valores_escala(n_valores)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "lpp_benchmark.db"
+        sqlite3.connect(str(db_path)).close()
+        disponivel = access_db.ACCESS_AVAILABLE
+        access_db.ACCESS_AVAILABLE = True
+        try:
+            db = access_db.AccessDatabase(db_path)
+        finally:
+            access_db.ACCESS_AVAILABLE = disponivel
+
+        inicio = time.perf_counter()
+        escalar = [db._corrigir_escala_valor(v) for v in valores]
+        ms_escalar = (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        vetorizado, mascara = db._corrigir_escala_valores(valores)
+        ms_vetorizado = (time.perf_counter() - inicio) * 1000
+
+    divergencias = sum(
+        1 for a, b in zip(escalar, vetorizado.tolist())
+        if not (a == b or (a != a and b != b))
+    )
+    resultado = {
+        'valores': n_valores,
+        'ms_escalar': round(ms_escalar, 2),
+        'ms_vetorizado': round(ms_vetorizado, 2),
+        'speedup': round(ms_escalar / ms_vetorizado, 1),
+        'corrigidos': int(mascara.sum()),
+        'divergencias': divergencias,
+    }
+    print(f"📊 Correção de escala: {resultado}")
+    # A versão vetorizada só vale se reproduzir a escalar valor a valor
+    assert divergencias == 0, f"{divergencias} valores divergentes entre escalar e vetorizado"
+    return resultado
+
+
+def _criar_valores_sqlite(db_path: Path) -> None:
+    """Cria tb_ValoresVariaveis (espelhada) em modo WAL, com leitores concorrentes"""
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE tb_ValoresVariaveis (
+            ID_ValorVar INTEGER PRIMARY KEY AUTOINCREMENT, ID_Base INTEGER,
+            ID_VariavelSel INTEGER, Valor REAL, ID_espelho INTEGER
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def _observar_linhas_sem_espelho(db_path: Path, parar: threading.Event, observacoes: list) -> None:
+    """Leitor: conta quantas vezes enxergou linhas com ID_espelho vazio"""
+    conn = sqlite3.connect(str(db_path))
+    vistas = 0
+    while not parar.is_set():
+        if conn.execute("SELECT COUNT(*) FROM tb_ValoresVariaveis WHERE ID_espelho IS NULL").fetchone()[0]:
+            vistas += 1
+    conn.close()
+    observacoes.append(vistas)
+
+
+def _com_leitores(db_path: Path, n_leitores: int, escrever) -> tuple:
+    """Executa escrever() com leitores concorrentes; retorna (ms, leituras com linha sem espelho)"""
+    parar = threading.Event()
+    observacoes = []
+    leitores = [
+        threading.Thread(target=_observar_linhas_sem_espelho, args=(db_path, parar, observacoes))
+        for _ in range(n_leitores)
+    ]
+    for leitor in leitores:
+        leitor.start()
+    inicio = time.perf_counter()
+    try:
+        escrever()
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        parar.set()
+        for leitor in leitores:
+            leitor.join()
+    return ms, sum(observacoes)
+
+
+def benchmark_escrita_com_espelho(n_registros: int = 1000, n_leitores: int = 3) -> dict:
+    """
+    Escrita em tabela espelhada (tb_ValoresVariaveis) com leitores concorrentes:
+
+    - duas_transacoes: padrão antigo (INSERT + commit, depois UPDATE do
+      ID_espelho + commit), que deixa a linha visível sem ID_espelho
+    - atomico: insert_with_mirror_id (INSERT + UPDATE com um único commit)
+    - lote: upsert_many_with_mirror_id com todos os registros
+
+    Os leitores nunca devem ver linhas sem ID_espelho nos dois últimos casos.
+    """
+    registros = [
+        {'ID_Base': i // 50, 'ID_VariavelSel': i % 50, 'Valor': float(i)}
+        for i in range(n_registros)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "lpp_benchmark.db"
+        _criar_valores_sqlite(db_path)
+        pool = _registrar_pool_sqlite(db_path)
+
+        def duas_transacoes():
+            with access_pool.pooled_connection(db_path) as conn:
+                for registro in registros:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "INSERT INTO tb_ValoresVariaveis (ID_Base, ID_VariavelSel, Valor) VALUES (?, ?, ?)",
+                        tuple(registro.values()),
+                    )
+                    novo_id = cursor.lastrowid
+                    conn.commit()
+                    cursor.execute("UPDATE tb_ValoresVariaveis SET ID_espelho = ? WHERE ID_ValorVar = ?",
+                                   (novo_id, novo_id))
+                    conn.commit()
+
+        def atomico():
+            for registro in registros:
+                access_utils.insert_with_mirror_id("tb_ValoresVariaveis", registro, db_path)
+
+        def lote():
+            access_utils.upsert_many_with_mirror_id("tb_ValoresVariaveis", registros, db_path)
+
+        resultado = {'registros': n_registros, 'leitores': n_leitores}
+        for nome, escrever in (('duas_transacoes', duas_transacoes), ('atomico', atomico), ('lote', lote)):
+            with sqlite3.connect(str(db_path)) as conn:
+                conn.execute("DELETE FROM tb_ValoresVariaveis")
+            ms, sem_espelho = _com_leitores(db_path, n_leitores, escrever)
+            resultado[f'ms_{nome}'] = round(ms, 1)
+            resultado[f'leituras_sem_espelho_{nome}'] = sem_espelho
+
+        pool.close()
+
+    print(f"📊 Escrita com ID_espelho: {resultado}")
+    # Os caminhos atômico e em lote não podem expor linha nova sem ID_espelho
+    assert resultado['leituras_sem_espelho_atomico'] == 0, resultado
+    assert resultado['leituras_sem_espelho_lote'] == 0, resultado
+    return resultado
+
+
+def _popular_lpp_sintetico(conn: sqlite3.Connection, n_linhas: int, seed: int = 7) -> dict:
+    """
+    Preenche o schema de SQLiteDatabase com uma hierarquia LPP sintética de
+    aproximadamente `n_linhas` linhas (60% delas em tb_ValoresVariaveis)
+    """
+    rng = random.Random(seed)
+    n_valores = int(n_linhas * 0.60)
+    n_var_sel = int(n_linhas * 0.15)
+    n_bases = int(n_linhas * 0.15)
+    n_relacoes = int(n_linhas * 0.05)
+    n_vinculos = max(int(n_linhas * 0.04), 10)
+    n_configs = max(n_vinculos // 8, 5)
+    n_limites = max(n_configs // 5, 2)
+    n_resultados = int(n_linhas * 0.01)
+
+    conn.executemany("INSERT INTO tb_cad_limite_LPP (ID_espelho, NomeLimite, Ativo, Status) VALUES (?, ?, 1, 'Ativo')",
+                     ((i, f"Limite {i}") for i in range(1, n_limites + 1)))
+    conn.executemany("INSERT INTO tb_cad_configuracao_LPP (ID_espelho, NomeConfiguracao, Status) VALUES (?, ?, 'Ativo')",
+                     ((i, f"Config {i}") for i in range(1, n_configs + 1)))
+    conn.executemany("INSERT INTO tb_vincula_Limite_Configuracao_LPP (ID_Limite, ID_Configuracao) VALUES (?, ?)",
+                     ((rng.randint(1, n_limites), i) for i in range(1, n_configs + 1)))
+    conn.executemany("INSERT INTO tb_cadCondicoes_LPP (ID_espelho, Title) VALUES (?, ?)",
+                     ((i, f"Condição {i}") for i in range(1, n_vinculos + 1)))
+    conn.executemany("INSERT INTO tb_vincula_CadConfig_Condicoes_LPP (ID_espelho, NomeCondicoes, NomeConfiguracao) VALUES (?, ?, ?)",
+                     ((i, i, rng.randint(1, n_configs)) for i in range(1, n_vinculos + 1)))
+    conn.executemany("INSERT INTO tb_DicionarioVariavel (ID_espelho, NomeEletrico) VALUES (?, ?)",
+                     ((i, f"VAR_{i}") for i in range(1, 2001)))
+    conn.executemany("INSERT INTO tb_variaveisSelecionadas (ID_espelho, ID_Variavel, ID_vinculoConfigCondicao, Ativo) VALUES (?, ?, ?, 1)",
+                     ((i, rng.randint(1, 2000), rng.randint(1, n_vinculos)) for i in range(1, n_var_sel + 1)))
+    conn.executemany("INSERT INTO tb_BaseCondicionante (ID_espelho, NomeBaseCondicionante, ID_TipoLPP, ID_vinculoConfigCondicao) VALUES (?, ?, ?, ?)",
+                     ((i, f"Base {i}", rng.randint(1, 2), rng.randint(1, n_vinculos)) for i in range(1, n_bases + 1)))
+    conn.executemany("INSERT INTO tbl_Relacao_BaseCondicionante (ID_Base, ID_Condicionante) VALUES (?, ?)",
+                     ((rng.randint(1, n_bases), rng.randint(1, n_bases)) for _ in range(n_relacoes)))
+    conn.executemany("INSERT INTO tb_ValoresVariaveis (ID_espelho, ID_Base, ID_VariavelSel, Valor) VALUES (?, ?, ?, ?)",
+                     ((i, rng.randint(1, n_bases), rng.randint(1, n_var_sel), rng.random()) for i in range(1, n_valores + 1)))
+    conn.executemany("INSERT INTO tbl_Resultados_LPP (ID_espelho, NomeGrupo, ID_Base, ID_vinculoConfigCondicao) VALUES (?, ?, ?, ?)",
+                     ((i, f"Grupo {i % 50}", rng.randint(1, n_bases), rng.randint(1, n_vinculos)) for i in range(1, n_resultados + 1)))
+    conn.commit()
+    return {'limites': n_limites, 'configs': n_configs, 'vinculos': n_vinculos, 'bases': n_bases}
+
+
+# Consultas da navegação limite → configuração → condição → variáveis/bases/valores
+_CONSULTAS_HIERARQUIA = {
+    'configuracoes': ("""
+        SELECT tc.ID_espelho, tc.NomeConfiguracao, tc.Status, tv.ID_Limite
+        FROM tb_cad_configuracao_LPP tc
+        INNER JOIN tb_vincula_Limite_Configuracao_LPP tv ON tc.ID_espelho = tv.ID_Configuracao
+        WHERE tv.ID_Limite = ? ORDER BY tc.NomeConfiguracao""", 'limites'),
+    'condicoes': ("""
+        SELECT tvcc.ID, tvcc.NomeCondicoes as ID_espelho, tcc.Title, tvcc.NomeConfiguracao
+        FROM tb_cadCondicoes_LPP tcc
+        RIGHT JOIN tb_vincula_CadConfig_Condicoes_LPP tvcc ON tcc.ID_espelho = tvcc.NomeCondicoes
+        WHERE tvcc.NomeConfiguracao = ? ORDER BY tcc.Title""", 'configs'),
+    'variaveis': ("""
+        SELECT ID_espelho, ID_Variavel, ID_vinculoConfigCondicao, Ativo, ValorTeste
+        FROM tb_variaveisSelecionadas WHERE ID_vinculoConfigCondicao = ? ORDER BY ID_Variavel""", 'vinculos'),
+    'bases': ("""
+        SELECT ID_BaseCondicionante, NomeBaseCondicionante, ID_TipoLPP, ID_espelho
+        FROM tb_BaseCondicionante WHERE ID_vinculoConfigCondicao = ? ORDER BY NomeBaseCondicionante""", 'vinculos'),
+    'relacoes': ("""
+        SELECT r.ID_Base, r.ID_Condicionante FROM tbl_Relacao_BaseCondicionante r
+        WHERE r.ID_Base IN (SELECT tb.ID_espelho FROM tb_BaseCondicionante tb WHERE tb.ID_vinculoConfigCondicao = ?)""", 'vinculos'),
+    'valores': ("SELECT * FROM tb_ValoresVariaveis WHERE ID_Base = ?", 'bases'),
+}
+
+
+def benchmark_indices_sqlite(n_linhas: int = 300_000, consultas_por_tipo: int = 10) -> dict:
+    """
+    Tempo médio das consultas da hierarquia LPP num banco SQLite sintético de
+    ~n_linhas linhas, antes e depois de create_indexes() + analyze()
+
+    Sem índice o RIGHT JOIN de condições é quadrático (cada vínculo varre
+    tb_cadCondicoes_LPP), por isso o tamanho padrão fica abaixo de 1M linhas
+    """
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "lpp_indices.db"
+        with SQLiteDatabase(str(db_path)) as db:
+            db.create_tables(create_indexes=False)
+            inicio = time.perf_counter()
+            tamanhos = _popular_lpp_sintetico(db.conn, n_linhas)
+            s_carga = time.perf_counter() - inicio
+
+            def medir() -> dict:
+                tempos = {}
+                for nome, (sql, dominio) in _CONSULTAS_HIERARQUIA.items():
+                    ids = [rng.randint(1, tamanhos[dominio]) for _ in range(consultas_por_tipo)]
+                    tempos[nome] = round(
+                        _cronometrar(lambda i: db.conn.execute(sql, (ids[i],)).fetchall(), consultas_por_tipo), 3)
+                return tempos
+
+            sem_indices = medir()
+            inicio = time.perf_counter()
+            db.create_indexes()
+            db.analyze()
+            s_indices = time.perf_counter() - inicio
+            com_indices = medir()
+
+    resultado = {
+        'linhas': n_linhas,
+        's_carga': round(s_carga, 1),
+        's_criar_indices': round(s_indices, 1),
+        'ms_sem_indices': sem_indices,
+        'ms_com_indices': com_indices,
+        'speedup': {k: round(sem_indices[k] / max(com_indices[k], 1e-6), 1) for k in sem_indices},
+    }
+    print(f"📊 Índices SQLite: {resultado}")
+    return resultado
+
+
+def _snapshot_valores(n_linhas: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ID_espelho': np.arange(1, n_linhas + 1),
+        'ID_Base': rng.integers(1, max(n_linhas // 4, 2), n_linhas),
+        'ID_VariavelSel': rng.integers(1, max(n_linhas // 4, 2), n_linhas),
+        'Valor': rng.random(n_linhas),
+        'Title': pd.Series(rng.integers(0, 500, n_linhas)).map(lambda i: f"Var {i}"),
+    })
+
+
+def benchmark_carga_sqlite(n_linhas: int = 600_000) -> dict:
+    """
+    Carga de um snapshot de tb_ValoresVariaveis (com índices já criados):
+    df.to_sql (caminho antigo) x insert_dataframe em lotes, com e sem
+    reconstrução dos índices
+    """
+    df = _snapshot_valores(n_linhas)
+    resultado = {'linhas': n_linhas}
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome in ('to_sql', 'lotes', 'lotes_rebuild'):
+            with SQLiteDatabase(str(Path(tmp) / f"{nome}.db")) as db:
+                db.create_tables()
+                # Snapshot de uma tabela só: as tabelas pai não são carregadas
+                db.conn.execute("PRAGMA foreign_keys = OFF;")
+                inicio = time.perf_counter()
+                if nome == 'to_sql':
+                    df.to_sql("tb_ValoresVariaveis", db.conn, if_exists='append', index=False)
+                else:
+                    db.insert_dataframe("tb_ValoresVariaveis", df, rebuild_indexes=(nome == 'lotes_rebuild'))
+                segundos = time.perf_counter() - inicio
+                contagem = db.conn.execute("SELECT COUNT(*) FROM tb_ValoresVariaveis").fetchone()[0]
+                assert contagem == n_linhas, (nome, contagem)
+                resultado[nome] = {'s': round(segundos, 2), 'linhas_por_segundo': round(n_linhas / segundos)}
+
+    print(f"📊 Carga SQLite: {resultado}")
+    return resultado
+
+
+def benchmark_stream_json(n_linhas: int = 200_000) -> dict:
+    """
+    /api/data: fetchall + lista de dicts + json.dumps (caminho antigo) x
+    must_api.codificar_stream com fetchmany. Mede pico de memória
+    (tracemalloc), tempo até o primeiro bloco e tempo total.
+    """
+    import json
+    import tracemalloc
+
+    colunas = ["id", "EMPRESA", "Cód_ONS", "Tensão_(kV)"] + [f"Ponta_{a}_Valor" for a in range(2025, 2029)] + ["Anotacao"]
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = _conectar_sqlite(Path(tmp) / "must.db")
+        conn.execute(f"CREATE TABLE MustTablesPdfNotes ({', '.join(f'[{c}]' for c in colunas)})")
+        conn.executemany(
+            f"INSERT INTO MustTablesPdfNotes VALUES ({', '.join('?' for _ in colunas)})",
+            ((i, f"EMPRESA {i % 40}", f"PONTO-{i}", 138, "3,000", "3,500", "4,000", "4,500",
+              "Atendimento condicionado à manutenção do fator de potência") for i in range(1, n_linhas + 1)))
+        conn.commit()
+        sql = "SELECT * FROM MustTablesPdfNotes ORDER BY id"
+
+        def materializado():
+            cursor = conn.execute(sql)
+            nomes = [c[0] for c in cursor.description]
+            linhas = [dict(zip(nomes, row)) for row in cursor.fetchall()]
+            corpo = json.dumps(linhas).encode('utf-8')
+            yield corpo
+
+        def streaming():
+            cursor = conn.execute(sql)
+            return must_api.codificar_stream(must_api.iterar_blocos(cursor), json.dumps)
+
+        resultado = {'linhas': n_linhas}
+        for nome, gerar in (('materializado', materializado), ('streaming', streaming)):
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            primeiro = None
+            for _ in gerar():
+                if primeiro is None:
+                    primeiro = time.perf_counter() - inicio
+            total = time.perf_counter() - inicio
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            resultado[nome] = {'ms_primeiro_bloco': round(primeiro * 1000, 1), 's_total': round(total, 2),
+                               'mb_pico': round(pico / 2**20, 1)}
+        # Fora da medição: os dois caminhos produzem o mesmo JSON
+        assert json.loads(b"".join(materializado())) == json.loads(b"".join(streaming()))
+        conn.close()
+
+    print(f"📊 Streaming JSON: {resultado}")
+    return resultado
+
+
+def benchmark_pool_sql_server(n_requisicoes: int = 200, latencia_login: float = 0.02, threads: int = 8) -> dict:
+    """
+    /api/data com conexão nova por requisição x pool do SQL Server
+    (get_db_access_connection.criar_pool, pre-ping em todo checkout)
+
+    O SQL Server é simulado por SQLite; `latencia_login` imita o custo de
+    TLS + login de uma conexão nova (o SQLite em si conecta em microssegundos).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "must.db"
+        conn = _conectar_sqlite(db_path)
+        conn.execute("CREATE TABLE MustTablesPdfNotes (id INTEGER PRIMARY KEY, EMPRESA TEXT)")
+        conn.executemany("INSERT INTO MustTablesPdfNotes (EMPRESA) VALUES (?)", ((f"EMP {i % 40}",) for i in range(5000)))
+        conn.commit()
+        conn.close()
+
+        def conectar(_nome=None):
+            time.sleep(latencia_login)
+            return _conectar_sqlite(db_path)
+
+        def consultar(c):
+            cursor = c.cursor()
+            cursor.execute("SELECT * FROM MustTablesPdfNotes WHERE id > ? ORDER BY id LIMIT 100", (random.randint(0, 4900),))
+            linhas = cursor.fetchall()
+            cursor.close()
+            return linhas
+
+        def sem_pool(_):
+            c = conectar()
+            try:
+                consultar(c)
+            finally:
+                c.close()
+
+        pool = get_db_access_connection.criar_pool(connect_fn=conectar, nome="benchmark", max_size=threads, min_size=1)
+
+        def com_pool(_):
+            get_db_access_connection.executar_com_reconexao(consultar, pool)
+
+        resultado = {'requisicoes': n_requisicoes, 'latencia_login_ms': latencia_login * 1000}
+        for nome, fn in (('conexao_nova', sem_pool), ('pool', com_pool)):
+            latencias = []
+
+            def medir(i, fn=fn):
+                inicio = time.perf_counter()
+                fn(i)
+                latencias.append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(medir, range(n_requisicoes)))
+            total = time.perf_counter() - inicio
+            latencias.sort()
+            resultado[nome] = {
+                'p50_ms': round(latencias[len(latencias) // 2] * 1000, 2),
+                'p95_ms': round(latencias[int(len(latencias) * 0.95)] * 1000, 2),
+                'req_s': round(n_requisicoes / total),
+            }
+        stats = pool.stats()
+        resultado['pool'].update({'conexoes_criadas': stats['created'], 'pre_pings': stats['validations']})
+        pool.close()
+
+    print(f"📊 Pool SQL Server: {resultado}")
+    return resultado
+
+
+if __name__ == "__main__":
+    benchmark_queries_parametrizadas()
+    benchmark_sessoes_access()
+    benchmark_correcao_escala()
+    benchmark_escrita_com_espelho()
+    benchmark_indices_sqlite()
+    benchmark_carga_sqlite()
+    benchmark_stream_json()
+    benchmark_pool_sql_server()
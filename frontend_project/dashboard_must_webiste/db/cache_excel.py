@@ -0,0 +1,173 @@
+# db/cache_excel.py
+"""
+Cache colunar das planilhas Excel do MUST (read-through)
+
+pd.read_excel (openpyxl) é de longe a etapa mais lenta do import_data.py,
+do excel_to_database.py e do scripts/automate_MUST_extracted_files.py. Aqui
+cada par arquivo/aba é convertido uma vez para Parquet (ou pickle, sem
+pyarrow) e as leituras seguintes carregam a cópia em milissegundos.
+
+A chave do cache é caminho + aba + opções de leitura; o nome do arquivo leva
+o mtime e o tamanho do Excel, então qualquer alteração na planilha (inclusive
+uma aba regravada pelo próprio script) faz a próxima leitura voltar ao Excel.
+
+Uso:
+    df = ler_excel(caminho, sheet_name="Tabelas Consolidada")
+
+    python -m db.cache_excel arquivo.xlsx [...]   # aquece o cache (primeira aba)
+    python -m db.cache_excel --limpar             # apaga o cache
+"""
+
+import os
+import glob
+import time
+import hashlib
+import logging
+import tempfile
+from typing import Optional, Union
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 — engine do to_parquet/read_parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXCEL_CACHE_DIR = os.getenv(
+    "MUST_EXCEL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_excel"),
+)
+# Desliga o cache sem mexer nos scripts (MUST_EXCEL_CACHE=0)
+EXCEL_CACHE_ENABLED = os.getenv("MUST_EXCEL_CACHE", "1") != "0"
+
+EXTENSOES = ('.parquet', '.pkl')
+
+
+def _prefixo(caminho: str, sheet_name: Union[str, int], opcoes: dict) -> str:
+    """Parte fixa do nome: arquivo + aba + opções (o mtime/tamanho vêm depois)"""
+    identidade = "\x1f".join([os.path.normcase(os.path.abspath(caminho)), repr(sheet_name),
+                              repr(sorted(opcoes.items()))])
+    base = os.path.splitext(os.path.basename(caminho))[0]
+    return f"{base}__{hashlib.sha1(identidade.encode('utf-8')).hexdigest()[:16]}"
+
+
+def caminho_cache(caminho: str, sheet_name: Union[str, int] = 0, **opcoes) -> str:
+    """Arquivo de cache (sem extensão) válido para o estado atual do Excel"""
+    stat = os.stat(caminho)
+    nome = f"{_prefixo(caminho, sheet_name, opcoes)}__{stat.st_mtime_ns}_{stat.st_size}"
+    return os.path.join(EXCEL_CACHE_DIR, nome)
+
+
+def _ler_cache(base: str) -> Optional[pd.DataFrame]:
+    for extensao in EXTENSOES:
+        arquivo = base + extensao
+        if not os.path.exists(arquivo):
+            continue
+        try:
+            if extensao == '.parquet':
+                return pd.read_parquet(arquivo)
+            return pd.read_pickle(arquivo)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache corrompido ignorado ({arquivo}): {e}")
+            os.remove(arquivo)
+    return None
+
+
+def _temporario(destino: str) -> str:
+    """Temporário único na pasta do cache (processos lendo a mesma planilha em paralelo)"""
+    descritor, caminho = tempfile.mkstemp(dir=EXCEL_CACHE_DIR, prefix=os.path.basename(destino) + '.',
+                                          suffix='.tmp')
+    os.close(descritor)
+    return caminho
+
+
+def _gravar_cache(base: str, df: pd.DataFrame) -> str:
+    """Grava Parquet quando possível; colunas com tipos mistos (comuns nas
+    planilhas extraídas de PDF) não cabem em Parquet e vão para pickle"""
+    os.makedirs(EXCEL_CACHE_DIR, exist_ok=True)
+    for extensao in EXTENSOES if PARQUET_AVAILABLE else EXTENSOES[1:]:
+        destino = base + extensao
+        temporario = _temporario(destino)
+        try:
+            if extensao == '.parquet':
+                df.to_parquet(temporario, index=True)
+            else:
+                df.to_pickle(temporario)
+            os.replace(temporario, destino)
+            return destino
+        except Exception as e:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            if extensao != '.parquet':
+                raise
+            logger.info(f"ℹ️ Parquet indisponível para {os.path.basename(base)} ({e}); usando pickle")
+
+
+def _remover_versoes_antigas(base: str) -> None:
+    prefixo = os.path.basename(base).rsplit('__', 1)[0]
+    for arquivo in glob.glob(os.path.join(EXCEL_CACHE_DIR, glob.escape(prefixo) + '__*')):
+        if not arquivo.startswith(base + '.'):
+            try:
+                os.remove(arquivo)
+            except OSError:
+                pass
+
+
+def ler_excel(caminho: str, sheet_name: Union[str, int] = 0, **opcoes) -> pd.DataFrame:
+    """
+    pd.read_excel com cache colunar
+
+    Args:
+        caminho: Planilha .xlsx
+        sheet_name: Nome ou índice da aba (uma aba por chamada)
+        **opcoes: Demais argumentos do pd.read_excel (fazem parte da chave)
+
+    Returns:
+        DataFrame da aba (cópia nova a cada chamada)
+    """
+    if not EXCEL_CACHE_ENABLED or not isinstance(sheet_name, (str, int)):
+        # sheet_name=None/lista devolve um dict de abas: lê direto do Excel
+        return pd.read_excel(caminho, sheet_name=sheet_name, **opcoes)
+
+    base = caminho_cache(caminho, sheet_name, **opcoes)
+    inicio = time.perf_counter()
+    df = _ler_cache(base)
+    if df is not None:
+        logger.info(f"⚡ {os.path.basename(caminho)} [{sheet_name}] lido do cache "
+                    f"em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return df
+
+    df = pd.read_excel(caminho, sheet_name=sheet_name, **opcoes)
+    segundos = time.perf_counter() - inicio
+    try:
+        arquivo = _gravar_cache(base, df)
+        _remover_versoes_antigas(base)
+        logger.info(f"🔄 {os.path.basename(caminho)} [{sheet_name}] lido do Excel em {segundos:.2f}s "
+                    f"e gravado em {os.path.basename(arquivo)}")
+    except OSError as e:
+        logger.warning(f"⚠️ Não foi possível gravar o cache de {caminho}: {e}")
+    return df
+
+
+def limpar_cache() -> int:
+    """Apaga todos os arquivos do cache; retorna quantos foram removidos"""
+    removidos = 0
+    for extensao in EXTENSOES:
+        for arquivo in glob.glob(os.path.join(EXCEL_CACHE_DIR, '*' + extensao)):
+            os.remove(arquivo)
+            removidos += 1
+    return removidos
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if sys.argv[1:] == ['--limpar']:
+        print(f"{limpar_cache()} arquivos removidos de {EXCEL_CACHE_DIR}")
+    else:
+        # Aquece a primeira aba de cada planilha (a lida pelo import_data.py)
+        for caminho in sys.argv[1:]:
+            ler_excel(caminho)
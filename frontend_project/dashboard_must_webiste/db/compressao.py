@@ -0,0 +1,286 @@
+# db/compressao.py
+"""
+Compressão das respostas do PikachuServer (gzip / brotli)
+
+- Arquivos estáticos (.json/.js/.css/.html/.svg) são pré-comprimidos uma vez
+  (irmãos .gz/.br ao lado do original) — servir não custa CPU
+- Respostas dinâmicas (/api/data) passam por um after_request com limite de
+  tamanho e lista de content-types; corpos com ETag (vindos do cache de
+  respostas) são comprimidos uma vez e reaproveitados
+- Respostas em streaming são comprimidas bloco a bloco (gzip)
+- Contadores de bytes originais x enviados por rota
+
+Uso no build:  python -m db.compressao static
+"""
+
+import os
+import gzip
+import zlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL_GZIP = 6          # respostas dinâmicas
+PRECOMPRESS_LEVEL_GZIP = 9       # arquivos estáticos (comprimidos uma vez)
+PRECOMPRESS_QUALITY_BR = 11
+COMPRESS_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+    'image/svg+xml',
+}
+PRECOMPRESS_EXTENSOES = ('.json', '.js', '.css', '.html', '.svg')
+# Sufixo do arquivo pré-comprimido por Content-Encoding (ordem = preferência)
+SUFIXOS = {'br': '.br', 'gzip': '.gz'}
+
+
+def codificacoes_disponiveis() -> Tuple[str, ...]:
+    return ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+
+
+def escolher_codificacao(accept_encodings, opcoes: Iterable[str]) -> Optional[str]:
+    """
+    Melhor Content-Encoding aceito pelo cliente entre `opcoes`
+
+    Args:
+        accept_encodings: request.accept_encodings (werkzeug)
+    """
+    opcoes = list(opcoes)
+    if not opcoes:
+        return None
+    escolhida = accept_encodings.best_match(opcoes)
+    return escolhida if escolhida and accept_encodings[escolhida] > 0 else None
+
+
+def comprimir(corpo: bytes, codificacao: str, nivel: Optional[int] = None) -> bytes:
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=nivel if nivel is not None else 5)
+    # mtime=0: mesma entrada → mesmos bytes (útil para ETag e builds reprodutíveis)
+    return gzip.compress(corpo, compresslevel=nivel if nivel is not None else COMPRESS_LEVEL_GZIP, mtime=0)
+
+
+# ----------------------------------------------------------------------
+# Pré-compressão dos arquivos estáticos
+# ----------------------------------------------------------------------
+def _gravar_atomico(destino: Path, dados: bytes, modo: int) -> None:
+    """
+    Grava em um temporário único na mesma pasta e troca com os.replace: vários
+    workers do gunicorn pré-comprimindo o mesmo arquivo não escrevem no mesmo
+    temporário nem deixam o destino pela metade
+    """
+    with tempfile.NamedTemporaryFile(dir=destino.parent, prefix=destino.name + '.',
+                                     suffix='.tmp', delete=False) as temporario:
+        temporario.write(dados)
+    try:
+        # NamedTemporaryFile cria com 0600: mantém as permissões do original
+        os.chmod(temporario.name, modo)
+        os.replace(temporario.name, destino)
+    except OSError:
+        os.remove(temporario.name)
+        raise
+
+
+def precomprimir_arquivo(caminho: Path) -> Dict[str, int]:
+    """
+    Gera os irmãos .gz/.br do arquivo quando faltam ou estão desatualizados
+
+    Returns:
+        {'original': bytes, 'gzip': bytes, 'br': bytes} (apenas os gerados/existentes)
+    """
+    caminho = Path(caminho)
+    stat = caminho.stat()
+    tamanhos = {'original': stat.st_size}
+    conteudo = None
+    for codificacao in codificacoes_disponiveis():
+        destino = caminho.with_name(caminho.name + SUFIXOS[codificacao])
+        try:
+            atual = destino.stat()
+            if atual.st_mtime_ns >= stat.st_mtime_ns:
+                tamanhos[codificacao] = atual.st_size
+                continue
+        except OSError:
+            pass
+
+        if conteudo is None:
+            conteudo = caminho.read_bytes()
+        nivel = PRECOMPRESS_QUALITY_BR if codificacao == 'br' else PRECOMPRESS_LEVEL_GZIP
+        comprimido = comprimir(conteudo, codificacao, nivel)
+        _gravar_atomico(destino, comprimido, stat.st_mode & 0o777)
+        tamanhos[codificacao] = len(comprimido)
+    return tamanhos
+
+
+def precomprimir_diretorio(pasta) -> Dict[str, Dict[str, int]]:
+    """Pré-comprime todos os arquivos de PRECOMPRESS_EXTENSOES acima do limite de tamanho"""
+    resultado = {}
+    pasta = Path(pasta)
+    if not pasta.is_dir():
+        return resultado
+    for caminho in sorted(pasta.rglob('*')):
+        if not caminho.is_file() or caminho.suffix.lower() not in PRECOMPRESS_EXTENSOES:
+            continue
+        try:
+            if caminho.stat().st_size < COMPRESS_MIN_BYTES:
+                continue
+            resultado[str(caminho.relative_to(pasta))] = precomprimir_arquivo(caminho)
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível pré-comprimir {caminho}: {e}")
+
+    if resultado:
+        original = sum(t['original'] for t in resultado.values())
+        gz = sum(t.get('gzip', t['original']) for t in resultado.values())
+        logger.info(f"🗜️ {len(resultado)} arquivos estáticos pré-comprimidos: "
+                    f"{original / 1024:.0f} KB → {gz / 1024:.0f} KB (gzip)")
+    return resultado
+
+
+def arquivo_precomprimido(caminho: str, codificacao: str) -> Optional[str]:
+    """Caminho do irmão .gz/.br se existir e não for mais antigo que o original"""
+    irmao = caminho + SUFIXOS[codificacao]
+    try:
+        if os.stat(irmao).st_mtime_ns >= os.stat(caminho).st_mtime_ns:
+            return irmao
+    except OSError:
+        pass
+    return None
+
+
+# ----------------------------------------------------------------------
+# Middleware
+# ----------------------------------------------------------------------
+def _gzip_stream(partes: Iterable[bytes], contar) -> Iterator[bytes]:
+    """Comprime um corpo em streaming; cada bloco de entrada gera um bloco de saída"""
+    compressor = zlib.compressobj(COMPRESS_LEVEL_GZIP, zlib.DEFLATED, 31)
+    original = enviado = 0
+    try:
+        for parte in partes:
+            original += len(parte)
+            saida = compressor.compress(parte) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            enviado += len(saida)
+            if saida:
+                yield saida
+        final = compressor.flush()
+        enviado += len(final)
+        yield final
+    finally:
+        contar(original, enviado)
+
+
+class Compressao:
+    """
+    after_request que comprime respostas dinâmicas e contabiliza bytes por rota
+
+    As respostas de arquivo (send_file) não são tocadas: os estáticos já saem
+    pré-comprimidos pela rota, que chama registrar() com os tamanhos.
+    """
+
+    def __init__(self, app=None, min_bytes: int = COMPRESS_MIN_BYTES,
+                 mimetypes=COMPRESS_MIMETYPES, max_cache: int = 256):
+        self.min_bytes = min_bytes
+        self.mimetypes = set(mimetypes)
+        self.max_cache = max_cache
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        app.after_request(self.after_request)
+
+    # ------------------------------------------------------------------
+    def registrar(self, rota: str, original: int, enviado: int) -> None:
+        """Soma os bytes de uma resposta às estatísticas da rota"""
+        with self._lock:
+            stats = self._stats.setdefault(rota, {'respostas': 0, 'comprimidas': 0,
+                                                  'bytes_originais': 0, 'bytes_enviados': 0})
+            stats['respostas'] += 1
+            stats['comprimidas'] += int(enviado < original)
+            stats['bytes_originais'] += original
+            stats['bytes_enviados'] += enviado
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Bytes originais, enviados e economizados por rota"""
+        with self._lock:
+            return {rota: {**s, 'bytes_economizados': s['bytes_originais'] - s['bytes_enviados']}
+                    for rota, s in self._stats.items()}
+
+    def _comprimir_cacheado(self, etag: Optional[str], corpo: bytes, codificacao: str) -> bytes:
+        if not etag:
+            return comprimir(corpo, codificacao)
+        chave = (etag, codificacao)
+        with self._lock:
+            comprimido = self._cache.get(chave)
+            if comprimido is not None:
+                self._cache.move_to_end(chave)
+                return comprimido
+        comprimido = comprimir(corpo, codificacao)
+        with self._lock:
+            self._cache[chave] = comprimido
+            while len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+        return comprimido
+
+    def after_request(self, response):
+        from flask import request
+
+        rota = request.url_rule.rule if request.url_rule else request.path
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        if response.is_streamed:
+            if escolher_codificacao(request.accept_encodings, ['gzip']) is None:
+                return response
+            corpo = response.response
+            response.response = _gzip_stream(corpo, lambda o, e: self.registrar(rota, o, e))
+            if hasattr(corpo, 'close'):
+                response.call_on_close(corpo.close)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers.pop('Content-Length', None)
+            return response
+
+        corpo = response.get_data()
+        codificacao = escolher_codificacao(request.accept_encodings, codificacoes_disponiveis())
+        if codificacao is None or len(corpo) < self.min_bytes:
+            self.registrar(rota, len(corpo), len(corpo))
+            return response
+
+        etag, fraco = response.get_etag()
+        comprimido = self._comprimir_cacheado(etag, corpo, codificacao)
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = codificacao
+        if etag:
+            # Outra representação do mesmo conteúdo: ETag fraco (o If-None-Match
+            # usa comparação fraca, então o 304 continua funcionando)
+            response.set_etag(etag, weak=True)
+        self.registrar(rota, len(corpo), len(comprimido))
+        return response
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for pasta in sys.argv[1:] or ['static']:
+        for nome, tamanhos in precomprimir_diretorio(pasta).items():
+            print(f"{nome}: {tamanhos}")
@@ -1,11 +1,36 @@
 
 import sqlite3
+import time
 import pandas as pd
 import logging
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Pragmas aplicados a cada conexão
+SQLITE_SYNCHRONOUS = "NORMAL"   # seguro com WAL e bem mais rápido que FULL
+SQLITE_CACHE_SIZE_KB = 65536     # cache de páginas por conexão (64 MB)
+SQLITE_INSERT_CHUNK = 5000       # linhas por executemany nas cargas em lote
+
+# Índices secundários nas colunas de junção usadas pelas consultas da hierarquia
+# (ID_espelho já é UNIQUE e portanto indexado)
+INDICES = (
+    ("ix_vinc_limite_config_limite", "tb_vincula_Limite_Configuracao_LPP", "ID_Limite"),
+    ("ix_vinc_limite_config_config", "tb_vincula_Limite_Configuracao_LPP", "ID_Configuracao"),
+    ("ix_vinc_config_cond_config", "tb_vincula_CadConfig_Condicoes_LPP", "NomeConfiguracao"),
+    ("ix_vinc_config_cond_condicoes", "tb_vincula_CadConfig_Condicoes_LPP", "NomeCondicoes"),
+    ("ix_var_sel_vinculo", "tb_variaveisSelecionadas", "ID_vinculoConfigCondicao"),
+    ("ix_var_sel_variavel", "tb_variaveisSelecionadas", "ID_Variavel"),
+    ("ix_base_cond_vinculo", "tb_BaseCondicionante", "ID_vinculoConfigCondicao"),
+    ("ix_relacao_base", "tbl_Relacao_BaseCondicionante", "ID_Base"),
+    ("ix_relacao_condicionante", "tbl_Relacao_BaseCondicionante", "ID_Condicionante"),
+    ("ix_valores_base_varsel", "tb_ValoresVariaveis", "ID_Base, ID_VariavelSel"),
+    ("ix_valores_varsel", "tb_ValoresVariaveis", "ID_VariavelSel"),
+    ("ix_resultados_vinculo", "tbl_Resultados_LPP", "ID_vinculoConfigCondicao"),
+    ("ix_resultados_base", "tbl_Resultados_LPP", "ID_Base"),
+)
+
 class SQLiteDatabase:
     """
     Classe para gerenciamento de banco de dados SQLite, com foco na replicação
@@ -21,6 +46,10 @@ class SQLiteDatabase:
         try:
             self.conn = sqlite3.connect(self.db_path)
             self.conn.execute("PRAGMA foreign_keys = ON;") # Habilita chaves estrangeiras
+            # WAL: leitores não bloqueiam o escritor (e vice-versa); persiste no arquivo
+            self.conn.execute("PRAGMA journal_mode = WAL;")
+            self.conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS};")
+            self.conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB};")
             logger.info(f"✅ Conectado ao banco SQLite: {self.db_path}")
         except sqlite3.Error as e:
             logger.error(f"❌ Erro ao conectar ao banco SQLite {self.db_path}: {e}")
@@ -40,8 +69,14 @@ class SQLiteDatabase:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-    def create_tables(self):
-        """Cria as tabelas no banco de dados SQLite com base no schema do Access."""
+    def create_tables(self, create_indexes: bool = True):
+        """
+        Cria as tabelas no banco de dados SQLite com base no schema do Access.
+
+        Args:
+            create_indexes: Cria também os índices das colunas de junção
+                (e atualiza as estatísticas do planejador com analyze)
+        """
         if not self.conn:
             self.connect()
 
@@ -91,9 +126,9 @@ class SQLiteDatabase:
             );
         """)
 
-        # Tabela tb_vincul-CadConfig_Condicoes_LPP
+        # Tabela tb_vincula_CadConfig_Condicoes_LPP
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tb_vincul-CadConfig_Condicoes_LPP (
+            CREATE TABLE IF NOT EXISTS tb_vincula_CadConfig_Condicoes_LPP (
                 ID INTEGER PRIMARY KEY AUTOINCREMENT,
                 ID_espelho INTEGER UNIQUE,
                 NomeCondicoes INTEGER NOT NULL, -- Refere-se ao ID_espelho de tb_cadCondicoes_LPP
@@ -119,13 +154,13 @@ class SQLiteDatabase:
                 ID_espelho INTEGER UNIQUE,
                 ID_Variavel INTEGER NOT NULL, -- Refere-se ao ID_espelho de tb_DicionarioVariavel
                 ID_Usuario INTEGER,
-                ID_vinculoConfigCondicao INTEGER NOT NULL, -- Refere-se ao ID_espelho de tb_vincul-CadConfig_Condicoes_LPP
+                ID_vinculoConfigCondicao INTEGER NOT NULL, -- Refere-se ao ID_espelho de tb_vincula_CadConfig_Condicoes_LPP
                 Ativo BOOLEAN,
                 ValorTeste REAL,
                 Title TEXT,
                 NomeVariavel TEXT,
                 FOREIGN KEY (ID_Variavel) REFERENCES tb_DicionarioVariavel(ID_espelho),
-                FOREIGN KEY (ID_vinculoConfigCondicao) REFERENCES tb_vincul-CadConfig_Condicoes_LPP(ID_espelho)
+                FOREIGN KEY (ID_vinculoConfigCondicao) REFERENCES tb_vincula_CadConfig_Condicoes_LPP(ID_espelho)
             );
         """)
 
@@ -137,9 +172,9 @@ class SQLiteDatabase:
                 NomeBaseCondicionante TEXT NOT NULL,
                 ID_TipoLPP INTEGER,
                 ValorIDBaseCondicionante TEXT,
-                ID_vinculoConfigCondicao INTEGER, -- Refere-se ao ID_espelho de tb_vincul-CadConfig_Condicoes_LPP
+                ID_vinculoConfigCondicao INTEGER, -- Refere-se ao ID_espelho de tb_vincula_CadConfig_Condicoes_LPP
                 Title TEXT,
-                FOREIGN KEY (ID_vinculoConfigCondicao) REFERENCES tb_vincul-CadConfig_Condicoes_LPP(ID_espelho)
+                FOREIGN KEY (ID_vinculoConfigCondicao) REFERENCES tb_vincula_CadConfig_Condicoes_LPP(ID_espelho)
             );
         """)
 
@@ -178,26 +213,173 @@ class SQLiteDatabase:
                 ID_espelho INTEGER UNIQUE,
                 NomeGrupo TEXT NOT NULL,
                 ID_Base INTEGER,
-                ID_vinculoConfigCondicao INTEGER, -- Refere-se ao ID_espelho de tb_vincul-CadConfig_Condicoes_LPP
+                ID_vinculoConfigCondicao INTEGER, -- Refere-se ao ID_espelho de tb_vincula_CadConfig_Condicoes_LPP
                 Title TEXT,
                 FOREIGN KEY (ID_Base) REFERENCES tb_BaseCondicionante(ID_espelho),
-                FOREIGN KEY (ID_vinculoConfigCondicao) REFERENCES tb_vincul-CadConfig_Condicoes_LPP(ID_espelho)
+                FOREIGN KEY (ID_vinculoConfigCondicao) REFERENCES tb_vincula_CadConfig_Condicoes_LPP(ID_espelho)
             );
         """)
 
         self.conn.commit()
         logger.info("✅ Tabelas SQLite criadas/verificadas com sucesso.")
 
-    def insert_dataframe(self, table_name: str, df: pd.DataFrame):
+        if create_indexes:
+            self.create_indexes()
+            self.analyze()
+
+    def create_indexes(self):
+        """Cria os índices secundários das colunas de junção (INDICES)."""
+        if not self.conn:
+            self.connect()
+
+        for nome, tabela, colunas in INDICES:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas});")
+        self.conn.commit()
+        logger.info(f"✅ {len(INDICES)} índices SQLite criados/verificados.")
+
+    def analyze(self):
+        """Atualiza as estatísticas usadas pelo planejador de consultas (após cargas)."""
+        if not self.conn:
+            self.connect()
+
+        self.conn.execute("ANALYZE;")
+        self.conn.execute("PRAGMA optimize;")
+        self.conn.commit()
+        logger.info("📈 Estatísticas SQLite atualizadas (ANALYZE).")
+
+    def drop_indexes(self, table_name: Optional[str] = None):
+        """Remove os índices de INDICES (de uma tabela ou de todas) antes de cargas grandes."""
+        if not self.conn:
+            self.connect()
+
+        for nome, tabela, _ in INDICES:
+            if table_name is None or tabela == table_name:
+                self.conn.execute(f"DROP INDEX IF EXISTS {nome};")
+        self.conn.commit()
+
+    def _table_columns(self, table_name: str) -> List[str]:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table_name});")]
+
+    @staticmethod
+    def _dataframe_rows(df: pd.DataFrame) -> Iterator[tuple]:
+        """Linhas do DataFrame com tipos nativos do Python (NaN/NaT → None)."""
+        colunas = []
+        for _, serie in df.items():
+            if pd.api.types.is_datetime64_any_dtype(serie):
+                serie = serie.dt.strftime('%Y-%m-%d %H:%M:%S')
+            nulos = serie.isna()
+            # tolist() já devolve int/float/bool nativos, aceitos pelo sqlite3
+            valores = serie.tolist()
+            if nulos.any():
+                for posicao in nulos.to_numpy().nonzero()[0]:
+                    valores[posicao] = None
+            colunas.append(valores)
+        return zip(*colunas)
+
+    def insert_rows(self, table_name: str, columns: Sequence[str], rows: Iterable[Sequence],
+                    chunk_size: int = SQLITE_INSERT_CHUNK, rebuild_indexes: bool = False) -> dict:
         """
-        Insere dados de um DataFrame em uma tabela SQLite.
-        Assume que as colunas do DataFrame correspondem aos campos da tabela.
+        Insere linhas (tuplas na ordem de `columns`) em lotes de `chunk_size`
+        via executemany, numa única transação explícita.
+
+        Args:
+            rebuild_indexes: Remove os índices da tabela antes da carga e os
+                recria no final, seguido de analyze (compensa a partir de
+                dezenas de milhares de linhas)
+
+        Returns:
+            Dicionário com linhas, chunks, segundos e linhas_por_segundo
         """
         if not self.conn:
             self.connect()
 
-        df.to_sql(table_name, self.conn, if_exists='append', index=False)
-        logger.info(f"✅ {len(df)} linhas inseridas na tabela {table_name}.")
+        colunas = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT INTO {table_name} ({colunas}) VALUES ({placeholders})"
+
+        if rebuild_indexes:
+            self.drop_indexes(table_name)
+
+        inicio = time.perf_counter()
+        linhas = chunks = 0
+        iterador = iter(rows)
+        if self.conn.in_transaction:
+            self.conn.commit()
+        try:
+            self.conn.execute("BEGIN;")
+            while True:
+                lote = list(islice(iterador, chunk_size))
+                if not lote:
+                    break
+                self.conn.executemany(sql, lote)
+                linhas += len(lote)
+                chunks += 1
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            logger.error(f"❌ Carga em {table_name} desfeita após {linhas} linhas")
+            raise
+        finally:
+            if rebuild_indexes:
+                self.create_indexes()
+                self.analyze()
+
+        segundos = time.perf_counter() - inicio
+        stats = {
+            'linhas': linhas,
+            'chunks': chunks,
+            'segundos': round(segundos, 3),
+            'linhas_por_segundo': round(linhas / segundos) if segundos > 0 else linhas,
+        }
+        logger.info(f"⚡ {linhas} linhas inseridas em {table_name} "
+                    f"({stats['linhas_por_segundo']} linhas/s, {chunks} lotes).")
+        return stats
+
+    def insert_dataframe(self, table_name: str, df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                         chunk_size: int = SQLITE_INSERT_CHUNK, rebuild_indexes: bool = False,
+                         ignorar_colunas_extras: bool = False) -> dict:
+        """
+        Insere dados de um DataFrame (ou de uma sequência de DataFrames, ex.:
+        pd.read_csv(..., chunksize=...)) em uma tabela SQLite existente
+        (criada por create_tables).
+
+        As colunas são gravadas com tipos nativos (NaN → NULL) em lotes via
+        insert_rows. Colunas que não existem na tabela geram ValueError, a
+        menos que ignorar_colunas_extras=True (aí são descartadas com aviso).
+        """
+        if not self.conn:
+            self.connect()
+
+        frames = iter([df]) if isinstance(df, pd.DataFrame) else iter(df)
+        primeiro = next(frames, None)
+        if primeiro is None:
+            return {'linhas': 0, 'chunks': 0, 'segundos': 0.0, 'linhas_por_segundo': 0}
+
+        colunas_tabela = set(self._table_columns(table_name))
+        if not colunas_tabela:
+            raise ValueError(f"Tabela {table_name} não existe no banco SQLite (execute create_tables antes)")
+
+        def validar(frame: pd.DataFrame) -> None:
+            extras = [c for c in frame.columns if c not in colunas_tabela]
+            if extras and not ignorar_colunas_extras:
+                raise ValueError(f"Colunas inexistentes em {table_name}: {extras}")
+
+        validar(primeiro)
+        colunas = [c for c in primeiro.columns if c in colunas_tabela]
+        if not colunas:
+            raise ValueError(f"Nenhuma coluna do DataFrame existe em {table_name}: {list(primeiro.columns)}")
+        ignoradas = [c for c in primeiro.columns if c not in colunas_tabela]
+        if ignoradas:
+            logger.warning(f"⚠️ Colunas ignoradas em {table_name}: {ignoradas}")
+
+        def linhas():
+            yield from self._dataframe_rows(primeiro[colunas])
+            for frame in frames:
+                validar(frame)
+                yield from self._dataframe_rows(frame[colunas])
+
+        return self.insert_rows(table_name, colunas, linhas(),
+                                chunk_size=chunk_size, rebuild_indexes=rebuild_indexes)
 
     def execute_query(self, query: str) -> pd.DataFrame:
         """Executa uma query SQL e retorna os resultados como DataFrame."""
@@ -207,6 +389,7 @@ class SQLiteDatabase:
 
 # Exemplo de uso (para demonstração)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     sqlite_db_path = "lpp_dashboard.db"
     with SQLiteDatabase(sqlite_db_path) as db:
         db.create_tables()
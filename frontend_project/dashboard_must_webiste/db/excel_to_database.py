@@ -2,6 +2,11 @@ import pandas as pd
 import sqlite3
 import os
 
+try:
+    from db.cache_excel import ler_excel
+except ImportError:
+    from cache_excel import ler_excel
+
 # Caminho do arquivo Excel consolidado
 excel_path = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\GitHub\dashboard-website-template\dashboard_must_webiste\static\must_tables_PDF_notes_merged.xlsx"
 
@@ -13,8 +18,8 @@ db_path = os.path.join(
 # Nome da tabela no banco de dados
 table_name = "must_tables_pdf_notes"
 
-# Lê o arquivo Excel
-must_df = pd.read_excel(excel_path)
+# Lê o arquivo Excel (via cache colunar: só reabre o .xlsx quando ele muda)
+must_df = ler_excel(excel_path)
 
 print("Primeiras linhas do DataFrame:")
 print(must_df.head())
@@ -1,15 +1,40 @@
-import pyodbc
 import os
-from dotenv import load_dotenv
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    # Sem python-dotenv as credenciais vêm só das variáveis de ambiente
+    load_dotenv = None
+
+try:
+    from db.access_pool import ConnectionPool, _is_connection_error
+except ImportError:
+    from access_pool import ConnectionPool, _is_connection_error
+
+logger = logging.getLogger(__name__)
 
 # Carrega as variáveis de ambiente do arquivo .env
-load_dotenv()
+if load_dotenv:
+    load_dotenv()
 
-def get_db_connection():
-    """
-    Cria e retorna uma conexão com o banco de dados SQL Server.
-    As credenciais são lidas de forma segura a partir de variáveis de ambiente.
-    """
+# Pool do SQL Server (sobrescreva por variáveis de ambiente)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "600"))
+# Segundos de ociosidade a partir dos quais o checkout faz o pre-ping (0 = sempre)
+DB_POOL_PRE_PING_AFTER = float(os.getenv("DB_POOL_PRE_PING_AFTER", "0"))
+DB_POOL_WAIT_TIMEOUT = float(os.getenv("DB_POOL_WAIT_TIMEOUT", "10"))
+
+
+def _connection_string():
     server = os.getenv('DB_SERVER')
     database = os.getenv('DB_DATABASE')
     username = os.getenv('DB_USERNAME')
@@ -19,7 +44,7 @@ def get_db_connection():
     if not all([server, database, username, password, driver]):
         raise ValueError("Uma ou mais variáveis de ambiente do banco de dados não foram definidas.")
 
-    connection_string = (
+    return (
         f"DRIVER={driver};"
         f"SERVER={server};"
         f"DATABASE={database};"
@@ -30,6 +55,26 @@ def get_db_connection():
         f"Connection Timeout=30;"
     )
 
+
+def _connect_sql_server(_nome=None):
+    """Abre uma conexão nova (TLS + login) — usada pelo pool"""
+    if pyodbc is None:
+        raise ImportError("pyodbc não está disponível. Instale com: pip install pyodbc")
+    return pyodbc.connect(_connection_string())
+
+
+def get_db_connection():
+    """
+    Cria e retorna uma conexão com o banco de dados SQL Server.
+    As credenciais são lidas de forma segura a partir de variáveis de ambiente.
+
+    Abre uma conexão nova a cada chamada: use em scripts (import_data.py).
+    No servidor web use get_db_pool() / pooled_db_connection().
+    """
+    if pyodbc is None:
+        raise ImportError("pyodbc não está disponível. Instale com: pip install pyodbc")
+    connection_string = _connection_string()
+
     try:
         conn = pyodbc.connect(connection_string)
         return conn
@@ -38,3 +83,83 @@ def get_db_connection():
         print(f"Erro de conexão com o banco de dados. SQLSTATE: {sqlstate}")
         print(ex)
         return None
+
+
+# ----------------------------------------------------------------------
+# Pool de conexões (reaproveita o ConnectionPool do access_pool.py)
+# ----------------------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def criar_pool(connect_fn=None, nome=None, **config):
+    """
+    Cria um pool de conexões SQL Server
+
+    Args:
+        connect_fn: Fábrica de conexões (padrão: pyodbc com as variáveis DB_*)
+        nome: Identificação do pool nos logs/métricas (padrão: servidor/banco)
+        **config: min_size, max_size, idle_timeout, validate_after, wait_timeout
+    """
+    parametros = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'idle_timeout': DB_POOL_IDLE_TIMEOUT,
+        'validate_after': DB_POOL_PRE_PING_AFTER,
+        'wait_timeout': DB_POOL_WAIT_TIMEOUT,
+    }
+    parametros.update(config)
+    nome = nome or f"{os.getenv('DB_SERVER', 'sqlserver')}/{os.getenv('DB_DATABASE', '')}"
+    return ConnectionPool(nome, connect_fn=connect_fn or _connect_sql_server,
+                          label=f"SQL Server {nome}", **parametros)
+
+
+def get_db_pool():
+    """Pool global do SQL Server, criado na primeira chamada"""
+    global _pool
+    pool = _pool
+    if pool is not None and not pool._closed:
+        return pool
+    # Lock: duas requisições simultâneas criariam dois pools e as conexões
+    # do que fosse sobrescrito nunca seriam fechadas
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = criar_pool()
+        return _pool
+
+
+@contextmanager
+def pooled_db_connection(pool=None):
+    """
+    Empresta uma conexão do pool (pre-ping no checkout)
+
+    Se o bloco levantar um erro de comunicação, a conexão é descartada em vez
+    de voltar ao pool; a próxima requisição abre uma nova.
+    """
+    pool = pool or get_db_pool()
+    conn = pool.acquire()
+    descartar = False
+    try:
+        yield conn
+    except Exception as e:
+        descartar = _is_connection_error(e)
+        raise
+    finally:
+        pool.release(conn, discard=descartar)
+
+
+def executar_com_reconexao(fn, pool=None, tentativas=2):
+    """
+    Executa fn(conn) com uma conexão do pool; se a conexão cair no meio
+    (erro de comunicação), descarta, reconecta e tenta de novo
+    """
+    pool = pool or get_db_pool()
+    for tentativa in range(1, tentativas + 1):
+        try:
+            with pooled_db_connection(pool) as conn:
+                return fn(conn)
+        except Exception as e:
+            if tentativa < tentativas and _is_connection_error(e):
+                logger.warning(f"⚠️ Conexão SQL Server perdida, reconectando ({tentativa}/{tentativas}): {e}")
+                continue
+            raise
@@ -1,6 +1,10 @@
 import pandas as pd
 import os
+import hashlib
 from get_db_access_connection import get_db_connection
+from must_api import marcar_nova_versao, normalizar_nome_coluna, FILTROS
+from inferencia_tipos import tipar_dataframe, ddl_colunas, linhas_sql
+from cache_excel import ler_excel
 import pyodbc
 
 # --- CONFIGURAÇÕES ---
@@ -11,10 +15,186 @@ EXCEL_PATH = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistem
 # Nome da tabela no banco de dados SQL Server
 TABLE_NAME = "MustTablesPdfNotes"
 
-def import_data_to_sql_server():
+# Chave de negócio de cada linha (nomes já limpos). Não é única na planilha
+# (o mesmo ponto aparece em vários períodos De/Até), então a ocorrência da
+# chave na ordem do arquivo entra no hash para diferenciar as repetições.
+CHAVE_NEGOCIO = ["EMPRESA", "Cód_ONS", "num_tabela"]
+COLUNA_HASH_CHAVE = "hash_chave"
+COLUNA_HASH_LINHA = "hash_linha"
+# Colunas filtradas pela rota /api/data: ganham índice quando o tipo permite
+COLUNAS_INDEXADAS = [normalizar_nome_coluna(coluna) for coluna in FILTROS.values()]
+
+
+def limpar_nomes_colunas(df):
+    """Limpeza dos nomes das colunas para serem compatíveis com SQL"""
+    df.columns = [col.replace(' ', '_').replace('/', '_').replace('-', '_') for col in df.columns]
+    return df
+
+
+def calcular_hashes(df):
+    """
+    Retorna (hashes_chave, hashes_linha), um de cada por linha do DataFrame
+
+    hash_chave: chave de negócio + ocorrência; hash_linha: todos os valores
+    """
+    faltando = [c for c in CHAVE_NEGOCIO if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas da chave de negócio ausentes na planilha: {faltando}")
+
+    ocorrencia = df.groupby(CHAVE_NEGOCIO, sort=False, dropna=False).cumcount()
+    hashes_chave = []
+    hashes_linha = []
+    for chave, n, linha in zip(df[CHAVE_NEGOCIO].itertuples(index=False, name=None), ocorrencia, linhas_sql(df)):
+        texto_chave = "\x1f".join(map(str, (*chave, n)))
+        hashes_chave.append(hashlib.sha1(texto_chave.encode('utf-8')).hexdigest())
+        hashes_linha.append(hashlib.sha1("\x1f".join(map(repr, linha)).encode('utf-8')).hexdigest())
+    return hashes_chave, hashes_linha
+
+
+def calcular_diff(existentes, hashes_chave, hashes_linha):
+    """
+    Compara a tabela atual ({hash_chave: hash_linha}) com a planilha
+
+    Returns:
+        (posições a inserir, posições a atualizar, hash_chave a remover, nº de inalteradas)
+    """
+    inserir, atualizar = [], []
+    vistos = set()
+    for posicao, (chave, linha) in enumerate(zip(hashes_chave, hashes_linha)):
+        vistos.add(chave)
+        atual = existentes.get(chave)
+        if atual is None:
+            inserir.append(posicao)
+        elif atual != linha:
+            atualizar.append(posicao)
+    remover = [chave for chave in existentes if chave not in vistos]
+    inalteradas = len(hashes_chave) - len(inserir) - len(atualizar)
+    return inserir, atualizar, remover, inalteradas
+
+
+def _colunas_tabela(cursor, tabela):
+    """[(coluna, tipo SQL)] da tabela, no formato de inferencia_tipos ('DECIMAL(8,3)', 'VARCHAR(16)')"""
+    cursor.execute(
+        "SELECT c.name, UPPER(t.name), c.max_length, c.precision, c.scale FROM sys.columns c "
+        "JOIN sys.types t ON t.user_type_id = c.user_type_id "
+        "WHERE c.object_id = OBJECT_ID(?) ORDER BY c.column_id", tabela)
+    colunas = []
+    for nome, tipo, tamanho, precisao, escala in cursor.fetchall():
+        if tipo in ('VARCHAR', 'NVARCHAR', 'CHAR', 'NCHAR'):
+            # max_length em bytes (NVARCHAR usa 2 por caractere); -1 = MAX
+            caracteres = tamanho // 2 if tipo.startswith('N') and tamanho > 0 else tamanho
+            tipo = f"{tipo}({'MAX' if tamanho == -1 else caracteres})"
+        elif tipo in ('DECIMAL', 'NUMERIC'):
+            tipo = f"DECIMAL({precisao},{escala})"
+        colunas.append((nome, tipo))
+    return colunas
+
+
+def _schema_esperado(schema):
+    return [('id', 'INT'), *[(tipo.nome, tipo.sql) for tipo in schema],
+            (COLUNA_HASH_CHAVE, 'CHAR(40)'), (COLUNA_HASH_LINHA, 'CHAR(40)')]
+
+
+def _criar_tabela(cursor, tabela, schema):
+    # [id] é a chave da paginação por keyset da rota /api/data; os hashes guiam a importação incremental
+    cursor.execute(
+        f"CREATE TABLE {tabela} ([id] INT IDENTITY(1,1) PRIMARY KEY, {ddl_colunas(schema)}, "
+        f"[{COLUNA_HASH_CHAVE}] CHAR(40) NOT NULL, [{COLUNA_HASH_LINHA}] CHAR(40) NOT NULL);"
+    )
+    cursor.execute(f"CREATE UNIQUE INDEX ix_{tabela}_{COLUNA_HASH_CHAVE} ON {tabela} ([{COLUNA_HASH_CHAVE}]);")
+    # Colunas tipadas (sem MAX) podem ser chave de índice: filtros e faixas da API viram seek
+    for tipo in schema:
+        if tipo.nome in COLUNAS_INDEXADAS and not tipo.sql.endswith("(MAX)"):
+            cursor.execute(f"CREATE INDEX [ix_{tabela}_{tipo.nome}] ON {tabela} ([{tipo.nome}]);")
+
+
+def _inserir(cursor, tabela, colunas, linhas):
+    todas = [*colunas, COLUNA_HASH_CHAVE, COLUNA_HASH_LINHA]
+    insert_sql = f"INSERT INTO {tabela} ([{'], ['.join(todas)}]) VALUES ({', '.join(['?'] * len(todas))})"
+    # Utiliza executemany para uma inserção em massa eficiente
+    cursor.fast_executemany = True
+    cursor.executemany(insert_sql, linhas)
+
+
+def _recriar_com_swap(conn, cursor, df, schema, hashes_chave, hashes_linha):
+    """
+    Carga completa sem janela vazia: monta a tabela nova ao lado e troca os
+    nomes numa transação (a rota /api/data continua lendo a antiga até o commit)
+    """
+    nova = f"{TABLE_NAME}_novo"
+    antiga = f"{TABLE_NAME}_antigo"
+    cursor.execute(f"IF OBJECT_ID('{nova}', 'U') IS NOT NULL DROP TABLE {nova}")
+    _criar_tabela(cursor, nova, schema)
+    linhas = [(*x, hc, hl) for x, hc, hl in zip(linhas_sql(df), hashes_chave, hashes_linha)]
+    _inserir(cursor, nova, list(df.columns), linhas)
+    conn.commit()
+
+    cursor.execute(f"IF OBJECT_ID('{antiga}', 'U') IS NOT NULL DROP TABLE {antiga}")
+    cursor.execute(f"IF OBJECT_ID('{TABLE_NAME}', 'U') IS NOT NULL EXEC sp_rename '{TABLE_NAME}', '{antiga}'")
+    cursor.execute(f"EXEC sp_rename '{nova}', '{TABLE_NAME}'")
+    cursor.execute(f"IF OBJECT_ID('{antiga}', 'U') IS NOT NULL DROP TABLE {antiga}")
+    cursor.execute(f"SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('{TABLE_NAME}') "
+                   f"AND name LIKE 'ix[_]{nova}[_]%'")
+    for (indice,) in cursor.fetchall():
+        # Nomes como parâmetro: as colunas indexadas têm acento e parênteses ("Tensão_(kV)")
+        cursor.execute("EXEC sp_rename ?, ?, 'INDEX'",
+                       f"{TABLE_NAME}.[{indice}]", f"ix_{TABLE_NAME}_{indice[len(f'ix_{nova}_'):]}")
+    conn.commit()
+    return {'modo': 'completo', 'inseridas': len(df), 'atualizadas': 0, 'removidas': 0, 'inalteradas': 0}
+
+
+def _aplicar_diff(conn, cursor, df, schema, hashes_chave, hashes_linha):
+    """
+    Importação incremental: grava só as linhas novas/alteradas (e as chaves
+    removidas) numa tabela de staging e aplica DELETE/UPDATE/INSERT numa
+    única transação
+    """
+    cursor.execute(f"SELECT [{COLUNA_HASH_CHAVE}], [{COLUNA_HASH_LINHA}] FROM {TABLE_NAME}")
+    existentes = {chave: linha for chave, linha in cursor.fetchall()}
+    inserir, atualizar, remover, inalteradas = calcular_diff(existentes, hashes_chave, hashes_linha)
+    contagens = {'modo': 'incremental', 'inseridas': len(inserir), 'atualizadas': len(atualizar),
+                 'removidas': len(remover), 'inalteradas': inalteradas}
+    if not (inserir or atualizar or remover):
+        return contagens
+
+    colunas = list(df.columns)
+    valores = linhas_sql(df)
+    stage = f"#{TABLE_NAME}_stage"
+    cursor.execute(f"IF OBJECT_ID('tempdb..{stage}') IS NOT NULL DROP TABLE {stage}")
+    cursor.execute(f"CREATE TABLE {stage} ([acao] CHAR(1) NOT NULL, [ordem] INT NOT NULL, {ddl_colunas(schema)}, "
+                   f"[{COLUNA_HASH_CHAVE}] CHAR(40) NOT NULL, [{COLUNA_HASH_LINHA}] CHAR(40) NULL);")
+
+    vazios = (None,) * len(colunas)
+    linhas = [('I', p, *valores[p], hashes_chave[p], hashes_linha[p]) for p in inserir]
+    linhas += [('U', p, *valores[p], hashes_chave[p], hashes_linha[p]) for p in atualizar]
+    linhas += [('D', 0, *vazios, chave, None) for chave in remover]
+    todas = ['acao', 'ordem', *colunas, COLUNA_HASH_CHAVE, COLUNA_HASH_LINHA]
+    cursor.fast_executemany = True
+    cursor.executemany(
+        f"INSERT INTO {stage} ([{'], ['.join(todas)}]) VALUES ({', '.join(['?'] * len(todas))})", linhas)
+
+    lista_cols = ", ".join(f"[{c}]" for c in [*colunas, COLUNA_HASH_CHAVE, COLUNA_HASH_LINHA])
+    atribuicoes = ", ".join(f"t.[{c}] = s.[{c}]" for c in [*colunas, COLUNA_HASH_LINHA])
+    chave_igual = f"s.[{COLUNA_HASH_CHAVE}] = t.[{COLUNA_HASH_CHAVE}]"
+    cursor.execute(f"DELETE t FROM {TABLE_NAME} t JOIN {stage} s ON {chave_igual} WHERE s.[acao] = 'D'")
+    cursor.execute(f"UPDATE t SET {atribuicoes} FROM {TABLE_NAME} t JOIN {stage} s ON {chave_igual} WHERE s.[acao] = 'U'")
+    cursor.execute(f"INSERT INTO {TABLE_NAME} ({lista_cols}) SELECT {lista_cols} FROM {stage} "
+                   f"WHERE [acao] = 'I' ORDER BY [ordem]")
+    cursor.execute(f"DROP TABLE {stage}")
+    conn.commit()
+    return contagens
+
+
+def import_data_to_sql_server(modo="incremental"):
     """
-    Lê dados de um arquivo Excel e os insere em uma tabela no SQL Server.
-    A tabela é recriada a cada execução para garantir dados atualizados.
+    Lê dados de um arquivo Excel e os grava na tabela do SQL Server.
+
+    Args:
+        modo: 'incremental' aplica só a diferença (inserções, atualizações e
+              remoções pela chave de negócio) numa transação; 'completo'
+              recria a tabela ao lado e troca os nomes. O incremental vira
+              completo quando a tabela não existe ou as colunas (nomes ou
+              tipos inferidos) mudaram.
     """
     if not os.path.exists(EXCEL_PATH):
         print(f"Erro: O arquivo Excel não foi encontrado em '{EXCEL_PATH}'")
@@ -22,13 +202,17 @@ def import_data_to_sql_server():
 
     print(f"Lendo dados do arquivo: {EXCEL_PATH}...")
     try:
-        df = pd.read_excel(EXCEL_PATH)
+        # Cópia colunar da planilha; o Excel só é relido quando muda (mtime/tamanho)
+        df = ler_excel(EXCEL_PATH)
     except Exception as e:
         print(f"Ocorreu um erro ao ler o arquivo Excel: {e}")
         return
 
-    # Limpeza dos nomes das colunas para serem compatíveis com SQL
-    df.columns = [col.replace(' ', '_').replace('/', '_').replace('-', '_') for col in df.columns]
+    limpar_nomes_colunas(df)
+    # Tipos por coluna (INT, DECIMAL pt-BR, VARCHAR com tamanho) em vez de NVARCHAR(MAX)
+    df, schema = tipar_dataframe(df)
+    print(f"Schema inferido: {ddl_colunas(schema)}")
+    hashes_chave, hashes_linha = calcular_hashes(df)
 
     conn = None
     cursor = None
@@ -41,34 +225,21 @@ def import_data_to_sql_server():
         cursor = conn.cursor()
         print("Conexão com o banco de dados estabelecida com sucesso.")
 
-        # 1. Apaga a tabela se ela já existir
-        print(f"Verificando se a tabela '{TABLE_NAME}' já existe...")
-        cursor.execute(f"IF OBJECT_ID('{TABLE_NAME}', 'U') IS NOT NULL DROP TABLE {TABLE_NAME}")
-        print(f"Tabela '{TABLE_NAME}' antiga (se existiu) foi removida.")
-
-        # 2. Cria a nova tabela (usando tipos de dados genéricos)
-        # Para um ambiente de produção, defina os tipos e tamanhos de coluna com mais precisão.
-        cols_with_types = ", ".join([f"[{col}] NVARCHAR(MAX)" for col in df.columns])
-        create_table_sql = f"CREATE TABLE {TABLE_NAME} ({cols_with_types});"
-        
-        print("Criando nova tabela...")
-        cursor.execute(create_table_sql)
-        print(f"Tabela '{TABLE_NAME}' criada com sucesso.")
-
-        # 3. Insere os dados do DataFrame na tabela
-        print(f"Iniciando a inserção de {len(df)} registros. Isso pode levar um momento...")
-        
-        # Converte o DataFrame em uma lista de tuplas para inserção em massa
-        data_to_insert = [tuple(x) for x in df.to_numpy()]
-        
-        insert_sql = f"INSERT INTO {TABLE_NAME} ([{'], ['.join(df.columns)}]) VALUES ({', '.join(['?'] * len(df.columns))})"
-        
-        # Utiliza executemany para uma inserção em massa eficiente
-        cursor.fast_executemany = True
-        cursor.executemany(insert_sql, data_to_insert)
-        
-        conn.commit()
-        print(f"{len(df)} registros foram inseridos com sucesso na tabela '{TABLE_NAME}'.")
+        if modo == "incremental" and _colunas_tabela(cursor, TABLE_NAME) == _schema_esperado(schema):
+            print(f"Calculando a diferença entre a planilha ({len(df)} linhas) e a tabela '{TABLE_NAME}'...")
+            contagens = _aplicar_diff(conn, cursor, df, schema, hashes_chave, hashes_linha)
+        else:
+            print(f"Recriando a tabela '{TABLE_NAME}' com {len(df)} registros (tabela nova + troca de nomes)...")
+            contagens = _recriar_com_swap(conn, cursor, df, schema, hashes_chave, hashes_linha)
+
+        print(f"Importação {contagens['modo']} concluída: {contagens['inseridas']} inseridas, "
+              f"{contagens['atualizadas']} atualizadas, {contagens['removidas']} removidas, "
+              f"{contagens['inalteradas']} inalteradas.")
+
+        # Invalida o cache de respostas e os ETags de /api/data (só se algo mudou)
+        if contagens['inseridas'] or contagens['atualizadas'] or contagens['removidas']:
+            marcar_nova_versao()
+        return contagens
 
     except pyodbc.Error as e:
         print(f"Ocorreu um erro de banco de dados: {e}")
@@ -76,6 +247,8 @@ def import_data_to_sql_server():
             conn.rollback()
     except Exception as e:
         print(f"Ocorreu um erro inesperado: {e}")
+        if conn:
+            conn.rollback()
     finally:
         if cursor:
             cursor.close()
@@ -85,6 +258,6 @@ def import_data_to_sql_server():
             print("Conexão com o banco de dados fechada.")
 
 
-
-
-import_data_to_sql_server()
+if __name__ == "__main__":
+    import sys
+    import_data_to_sql_server(modo=sys.argv[1] if len(sys.argv) > 1 else "incremental")
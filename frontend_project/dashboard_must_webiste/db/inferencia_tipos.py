@@ -0,0 +1,217 @@
+# db/inferencia_tipos.py
+"""
+Inferência de tipos das colunas importadas do Excel (tabelas MUST)
+
+Em vez de gravar tudo como NVARCHAR(MAX), cada coluna é classificada como
+inteiro, decimal (inclusive no formato pt-BR "3,000" / "1.234,5") ou texto
+curto com tamanho, e os valores são convertidos de forma vetorizada (pandas).
+
+Colunas numéricas toleram alguns valores "sujos" vindos da extração do PDF
+(ex.: "417,000(B) \\n(C)"): o número inicial é aproveitado e o texto original
+vai para uma coluna irmã `<coluna>_original`, para não perder informação.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Textos tratados como "sem valor"
+VALORES_NULOS = {"", "-", "--", "—", "nan", "NaN", "None", "null", "NULL"}
+# Coluna numérica: quase todos os valores começam com um número e a maioria é
+# só o número (evita tratar "1/Jan" como número)
+FRACAO_NUMERICA_MINIMA = 0.95
+FRACAO_ESTRITA_MINIMA = 0.5
+# Tamanhos de VARCHAR usados (folga para cargas futuras sem trocar o schema)
+TAMANHOS_VARCHAR = (8, 16, 32, 64, 128, 256, 512, 1024, 2000, 4000)
+SUFIXO_ORIGINAL = "_original"
+
+_RE_PT_BR = r"-?(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?"
+_RE_PADRAO = r"-?\d+(?:\.\d+)?"
+# Número no início de um valor "sujo", em cada convenção
+_RE_INICIAL_PT_BR = rf"^\s*({_RE_PT_BR})"
+_RE_INICIAL_PADRAO = rf"^\s*({_RE_PADRAO})"
+_RE_NUMERO_INICIAL = r"^\s*-?\d"
+_INT32 = 2**31 - 1
+
+
+@dataclass
+class TipoColuna:
+    """Tipo inferido de uma coluna"""
+    nome: str
+    tipo: str                  # 'int', 'decimal' ou 'texto'
+    sql: str                   # tipo SQL Server (ex.: 'DECIMAL(9,3)', 'VARCHAR(16)')
+    pt_br: bool = False        # decimal com vírgula
+    coluna_original: Optional[str] = None  # irmã com os textos não numéricos
+
+    @property
+    def numerica(self) -> bool:
+        return self.tipo in ('int', 'decimal')
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    """Série como texto sem espaços nas pontas, com os nulos normalizados para NA"""
+    texto = serie.astype("string").str.strip()
+    return texto.mask(texto.isin(VALORES_NULOS))
+
+
+def _tamanho_varchar(comprimento: int) -> str:
+    for tamanho in TAMANHOS_VARCHAR:
+        if comprimento <= tamanho:
+            return str(tamanho)
+    return "MAX"
+
+
+def _tipo_texto(nome: str, texto: pd.Series) -> TipoColuna:
+    validos = texto.dropna()
+    comprimento = int(validos.str.len().max()) if len(validos) else 1
+    # Só ASCII cabe em VARCHAR sem depender da collation; acentos → NVARCHAR
+    ascii_ = bool(validos.map(str.isascii).all()) if len(validos) else True
+    return TipoColuna(nome, 'texto', f"{'VARCHAR' if ascii_ else 'NVARCHAR'}({_tamanho_varchar(comprimento)})")
+
+
+def _normalizar(texto: pd.Series, pt_br: bool) -> pd.Series:
+    """'1.234,5' → '1234.5' (pt-BR); no padrão o texto já está normalizado"""
+    if pt_br:
+        return texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return texto
+
+
+def _numeros(texto: pd.Series, pt_br: bool) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """
+    Converte o texto de uma coluna numérica (vetorizado)
+
+    Valores que não seguem estritamente a convenção da coluna são "sujos":
+    se seguem a outra convenção ("13.8" numa coluna pt-BR) são lidos nela;
+    senão vale o número inicial ("417,000(B) \\n(C)" → 417). O texto original
+    dos sujos é preservado pelo chamador.
+
+    Returns:
+        (números, texto normalizado '1234.5', máscara dos sujos)
+    """
+    estritos = texto.str.fullmatch(_RE_PT_BR if pt_br else _RE_PADRAO).fillna(False).astype(bool)
+    sujos = texto.notna() & ~estritos
+    normal = _normalizar(texto.where(estritos), pt_br)
+    if sujos.any():
+        valores = texto[sujos]
+        outra = valores.str.fullmatch(_RE_PADRAO if pt_br else _RE_PT_BR).fillna(False).astype(bool)
+        inicial = valores.str.extract(_RE_INICIAL_PT_BR if pt_br else _RE_INICIAL_PADRAO, expand=False)
+        normal[sujos] = _normalizar(valores, not pt_br).where(outra, _normalizar(inicial, pt_br))
+    return pd.to_numeric(normal, errors="coerce"), normal, sujos
+
+
+def _tipo_numerico(nome: str, numeros: pd.Series, normal: pd.Series, pt_br: bool) -> TipoColuna:
+    """Tipo SQL que comporta todos os números da coluna (inclusive os lidos de valores sujos)"""
+    validos = numeros.dropna()
+    inteiros = bool(np.all(np.mod(validos.to_numpy(dtype=float), 1) == 0)) if len(validos) else True
+    # Casas decimais do texto (em pt-BR "3,000" tem 3 casas, mesmo sendo inteiro)
+    decimais = normal.str.extract(r"\.(\d+)$", expand=False).str.len()
+    escala = int(decimais.max()) if decimais.notna().any() else 0
+
+    if inteiros and escala == 0:
+        maior = float(validos.abs().max()) if len(validos) else 0.0
+        return TipoColuna(nome, 'int', "INT" if maior <= _INT32 else "BIGINT", pt_br=pt_br)
+
+    digitos_inteiros = len(str(int(validos.abs().max()))) if len(validos) else 1
+    # Folga de 2 dígitos para valores maiores em cargas futuras
+    precisao = min(digitos_inteiros + escala + 2, 38)
+    return TipoColuna(nome, 'decimal', f"DECIMAL({precisao},{escala})", pt_br=pt_br)
+
+
+def inferir_coluna(serie: pd.Series, nome: Optional[str] = None) -> TipoColuna:
+    """Classifica uma coluna como int, decimal ou texto"""
+    nome = nome if nome is not None else str(serie.name)
+    if pd.api.types.is_bool_dtype(serie):
+        return TipoColuna(nome, 'int', "BIT")
+    if pd.api.types.is_integer_dtype(serie):
+        maior = int(serie.abs().max()) if serie.notna().any() else 0
+        return TipoColuna(nome, 'int', "INT" if maior <= _INT32 else "BIGINT")
+
+    texto = _texto(serie)
+    validos = texto.dropna()
+    if validos.empty:
+        return TipoColuna(nome, 'texto', "NVARCHAR(255)")
+
+    # Convenção decimal por maioria: pt-BR ("1.234,5") só quando mais valores
+    # seguem o formato pt-BR do que o padrão ("13.8"); empate (inteiros) = padrão
+    em_pt_br = validos.str.fullmatch(_RE_PT_BR)
+    em_padrao = validos.str.fullmatch(_RE_PADRAO)
+    pt_br = bool(em_pt_br.sum() > em_padrao.sum())
+    estritos = em_pt_br if pt_br else em_padrao
+    iniciais = validos.str.match(_RE_NUMERO_INICIAL)
+    if iniciais.mean() < FRACAO_NUMERICA_MINIMA or estritos.mean() < FRACAO_ESTRITA_MINIMA:
+        return _tipo_texto(nome, texto)
+
+    numeros, normal, sujos = _numeros(validos, pt_br)
+    tipo = _tipo_numerico(nome, numeros, normal, pt_br)
+    if sujos.any():
+        tipo.coluna_original = f"{nome}{SUFIXO_ORIGINAL}"
+    return tipo
+
+
+def inferir_schema(df: pd.DataFrame) -> List[TipoColuna]:
+    """Tipo de cada coluna do DataFrame, na ordem das colunas"""
+    return [inferir_coluna(df[coluna], coluna) for coluna in df.columns]
+
+
+def converter_dataframe(df: pd.DataFrame, schema: List[TipoColuna]) -> Tuple[pd.DataFrame, List[TipoColuna]]:
+    """
+    Converte os valores para os tipos inferidos (vetorizado)
+
+    Returns:
+        (DataFrame convertido, schema final) — o schema final inclui as
+        colunas `<coluna>_original` (NVARCHAR) logo após cada coluna numérica
+        que tinha valores não numéricos
+    """
+    colunas = {}
+    schema_final: List[TipoColuna] = []
+    for tipo in schema:
+        serie = df[tipo.nome]
+        if not tipo.numerica or pd.api.types.is_numeric_dtype(serie):
+            if tipo.numerica:
+                colunas[tipo.nome] = serie.astype("Int64") if tipo.tipo == 'int' and tipo.sql != "BIT" else serie
+            else:
+                colunas[tipo.nome] = _texto(serie)
+            schema_final.append(tipo)
+            continue
+
+        texto = _texto(serie)
+        numeros, _, sujos = _numeros(texto, tipo.pt_br)
+        colunas[tipo.nome] = numeros
+        schema_final.append(tipo)
+        if sujos.any() and not tipo.coluna_original:
+            # schema inferido de outra amostra: ainda assim não perde o texto original
+            tipo.coluna_original = f"{tipo.nome}{SUFIXO_ORIGINAL}"
+        if tipo.coluna_original:
+            # Valores "sujos" (fora da convenção da coluna): o número aproveitado
+            # vai na coluna tipada e o texto original na coluna irmã
+            colunas[tipo.coluna_original] = texto.where(sujos)
+            validos = texto[sujos].dropna()
+            comprimento = int(validos.str.len().max()) if len(validos) else 1
+            schema_final.append(TipoColuna(tipo.coluna_original, 'texto', f"NVARCHAR({_tamanho_varchar(comprimento)})"))
+            logger.info(f"⚠️ {int(sujos.sum())} valores fora do formato numérico em {tipo.nome} "
+                        f"(número aproveitado, texto em {tipo.coluna_original})")
+
+        if tipo.tipo == 'int':
+            colunas[tipo.nome] = colunas[tipo.nome].round().astype("Int64")
+
+    return pd.DataFrame(colunas, index=df.index), schema_final
+
+
+def tipar_dataframe(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[TipoColuna]]:
+    """Inferência + conversão em uma chamada"""
+    return converter_dataframe(df, inferir_schema(df))
+
+
+def ddl_colunas(schema: List[TipoColuna]) -> str:
+    """'[col] TIPO, ...' para CREATE TABLE"""
+    return ", ".join(f"[{tipo.nome}] {tipo.sql}" for tipo in schema)
+
+
+def linhas_sql(df: pd.DataFrame) -> List[tuple]:
+    """Linhas com tipos nativos do Python e NULL no lugar de NA/NaN (para executemany)"""
+    return [tuple(linha) for linha in df.astype(object).where(df.notna(), None).to_numpy()]
@@ -0,0 +1,512 @@
+# db/must_api.py
+"""
+Consultas da rota /api/data sobre a tabela MustTablesPdfNotes (SQL Server)
+
+Monta o SELECT a partir dos parâmetros da requisição — projeção de colunas,
+filtros (EMPRESA, Cód ONS, Tensão (kV)) e paginação por chave (keyset) na
+coluna `id` — tudo parametrizado e resolvido no banco, em vez de trazer a
+tabela inteira para o Python.
+
+Os dados só mudam quando o import_data.py roda de novo; ele grava um marcador
+de versão (arquivo) que invalida o cache de respostas e os ETags.
+"""
+
+import os
+import uuid
+import hashlib
+import logging
+import decimal
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Collection, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# O nome da tabela deve ser o mesmo definido no script de importação
+TABLE_NAME = "MustTablesPdfNotes"
+ID_COLUMN = "id"
+
+# Colunas de controle da importação incremental, fora da resposta da API
+COLUNAS_INTERNAS = {"hash_chave", "hash_linha"}
+
+LIMIT_PADRAO = 500
+LIMIT_MAXIMO = 5000
+LIMIT_TODOS = "all"          # limit=all: tabela inteira (filtrada), sempre em streaming
+
+# Streaming: linhas lidas por fetchmany / por bloco enviado ao cliente
+FETCHMANY_TAMANHO = 500
+MIMETYPE_NDJSON = "application/x-ndjson"
+
+# Parâmetro da query string → coluna original da planilha
+FILTROS = {
+    'empresa': 'EMPRESA',
+    'cod_ons': 'Cód ONS',
+    'tensao': 'Tensão (kV)',
+}
+# Filtros comparados numericamente; aceitam também <filtro>_min / <filtro>_max.
+# Em tabelas antigas (colunas NVARCHAR) a comparação passa por TRY_CAST.
+FILTROS_NUMERICOS = {'tensao'}
+# type_code do cursor.description para colunas numéricas
+TIPOS_NUMERICOS = (int, float, decimal.Decimal)
+
+
+class ParametroInvalido(ValueError):
+    """Parâmetro da requisição inválido (a rota responde 400)"""
+
+
+def normalizar_nome_coluna(nome: str) -> str:
+    """Mesma limpeza de nomes aplicada pelo import_data.py ('Cód ONS' → 'Cód_ONS')"""
+    return nome.replace(' ', '_').replace('/', '_').replace('-', '_')
+
+
+def _quote(coluna: str) -> str:
+    return f"[{coluna.replace(']', ']]')}]"
+
+
+def _lista(valor: Optional[str]) -> List[str]:
+    """'a,b, c' → ['a', 'b', 'c'] (vazio → [])"""
+    if not valor:
+        return []
+    return [v.strip() for v in valor.split(',') if v.strip()]
+
+
+def _inteiro(args: Mapping[str, str], nome: str, padrao: Optional[int], minimo: int) -> Optional[int]:
+    valor = args.get(nome)
+    if valor in (None, ''):
+        return padrao
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ParametroInvalido(f"Parâmetro '{nome}' deve ser inteiro: {valor!r}")
+    if numero < minimo:
+        raise ParametroInvalido(f"Parâmetro '{nome}' deve ser >= {minimo}")
+    return numero
+
+
+# ----------------------------------------------------------------------
+# Versão dos dados (marcador gravado pela importação)
+# ----------------------------------------------------------------------
+DATA_VERSION_FILE = os.getenv(
+    "MUST_DATA_VERSION_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "must_data_version.txt"),
+)
+
+_versao_lida: Tuple[Optional[Tuple[int, int]], str] = (None, "")
+_versao_lock = threading.Lock()
+
+
+def versao_dados() -> str:
+    """
+    Versão atual dos dados da tabela MUST
+
+    Só relê o arquivo quando o mtime/tamanho muda (um stat por chamada).
+    Sem marcador, retorna '0' — o cache vale até a primeira importação.
+    """
+    global _versao_lida
+    try:
+        stat = os.stat(DATA_VERSION_FILE)
+        assinatura = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return "0"
+
+    with _versao_lock:
+        if _versao_lida[0] != assinatura:
+            try:
+                with open(DATA_VERSION_FILE, 'r', encoding='utf-8') as f:
+                    _versao_lida = (assinatura, f.read().strip() or "0")
+            except OSError:
+                return "0"
+        return _versao_lida[1]
+
+
+def marcar_nova_versao() -> str:
+    """Grava um novo marcador de versão (chamado pelo import_data.py após o commit)"""
+    versao = uuid.uuid4().hex
+    temporario = f"{DATA_VERSION_FILE}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(versao)
+    os.replace(temporario, DATA_VERSION_FILE)
+    logger.info(f"🔄 Nova versão dos dados MUST: {versao}")
+    return versao
+
+
+# ----------------------------------------------------------------------
+# Colunas da tabela (lidas uma vez por versão dos dados)
+# ----------------------------------------------------------------------
+_colunas: Optional[Tuple[str, List[str], Set[str]]] = None
+_colunas_lock = threading.Lock()
+
+
+def _descrever_tabela(conn) -> Tuple[str, List[str], Set[str]]:
+    global _colunas
+    versao = versao_dados()
+    with _colunas_lock:
+        if _colunas is None or _colunas[0] != versao:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"SELECT TOP 0 * FROM {TABLE_NAME}")
+                descricao = [col for col in cursor.description if col[0] not in COLUNAS_INTERNAS]
+                _colunas = (versao, [col[0] for col in descricao],
+                            {col[0] for col in descricao if col[1] in TIPOS_NUMERICOS})
+            finally:
+                cursor.close()
+        return _colunas
+
+
+def colunas_tabela(conn) -> List[str]:
+    """Colunas de MustTablesPdfNotes, lidas via cursor.description na primeira chamada"""
+    return list(_descrever_tabela(conn)[1])
+
+
+def colunas_numericas(conn) -> Set[str]:
+    """Colunas gravadas com tipo numérico (INT/DECIMAL) pela importação tipada"""
+    return set(_descrever_tabela(conn)[2])
+
+
+def limpar_cache_colunas() -> None:
+    """Esquece as colunas em cache (ex.: após recriar a tabela)"""
+    global _colunas
+    with _colunas_lock:
+        _colunas = None
+
+
+# ----------------------------------------------------------------------
+# Montagem da consulta
+# ----------------------------------------------------------------------
+@dataclass
+class ConsultaMust:
+    """SELECT paginado + COUNT(*) com os mesmos filtros"""
+    sql: str
+    params: List[Any]
+    count_sql: str
+    count_params: List[Any]
+    colunas: List[str]
+    limit: Optional[int]
+    keyset: bool
+    filtros: Dict[str, List[str]] = field(default_factory=dict)
+
+    def proximo_cursor(self, linhas: List[Dict[str, Any]]) -> Optional[Any]:
+        """Valor de `after` para a próxima página (None na última)"""
+        if not self.keyset or self.limit is None or len(linhas) < self.limit:
+            return None
+        return linhas[-1].get(ID_COLUMN)
+
+
+def _resolver_coluna(nome: str, colunas: List[str]) -> str:
+    """Aceita o nome original ('Cód ONS') ou o gravado no banco ('Cód_ONS')"""
+    if nome in colunas:
+        return nome
+    normalizado = normalizar_nome_coluna(nome)
+    if normalizado in colunas:
+        return normalizado
+    raise ParametroInvalido(f"Coluna desconhecida: {nome!r}")
+
+
+def _numeros(parametro: str, valores: List[str]) -> List[float]:
+    try:
+        return [float(v.replace(',', '.')) for v in valores]
+    except ValueError:
+        raise ParametroInvalido(f"Parâmetro '{parametro}' deve ser numérico: {valores}")
+
+
+def montar_consulta(args: Mapping[str, str], colunas: List[str],
+                    numericas: Optional[Collection[str]] = None) -> ConsultaMust:
+    """
+    Traduz os parâmetros da requisição em SQL parametrizado
+
+    Parâmetros aceitos:
+        fields   colunas a retornar, separadas por vírgula (padrão: todas)
+        empresa, cod_ons, tensao   filtros; vários valores separados por vírgula
+        tensao_min, tensao_max     faixa (inclusiva) para os filtros numéricos
+        limit    linhas por página (padrão 500, máximo 5000; 'all' = sem limite)
+        after    `id` da última linha da página anterior (keyset)
+        page     página numerada (OFFSET) — só quando `after` não é informado
+
+    Args:
+        numericas: colunas com tipo numérico no banco (colunas_numericas());
+                   nelas os filtros comparam a coluna direto, aproveitando índices
+
+    Raises:
+        ParametroInvalido: parâmetro inválido ou coluna inexistente
+    """
+    numericas = set(numericas or ())
+    if args.get('limit') == LIMIT_TODOS:
+        limit = None
+    else:
+        limit = min(_inteiro(args, 'limit', LIMIT_PADRAO, 1), LIMIT_MAXIMO)
+    after = _inteiro(args, 'after', None, 0)
+    page = _inteiro(args, 'page', None, 1)
+    if limit is None and page is not None:
+        raise ParametroInvalido("Parâmetro 'page' não combina com limit=all")
+    tem_id = ID_COLUMN in colunas
+
+    campos = _lista(args.get('fields'))
+    selecionadas = [_resolver_coluna(c, colunas) for c in campos] if campos else list(colunas)
+    if tem_id and ID_COLUMN not in selecionadas:
+        # o cursor da próxima página depende do id
+        selecionadas.insert(0, ID_COLUMN)
+
+    where: List[str] = []
+    params: List[Any] = []
+    filtros: Dict[str, List[str]] = {}
+    for parametro, coluna_original in FILTROS.items():
+        valores = _lista(args.get(parametro))
+        faixa = []
+        if parametro in FILTROS_NUMERICOS:
+            for sufixo, operador in (('min', '>='), ('max', '<=')):
+                limite = args.get(f"{parametro}_{sufixo}")
+                if limite not in (None, ''):
+                    faixa.append((operador, _numeros(f"{parametro}_{sufixo}", [limite])[0]))
+        if not valores and not faixa:
+            continue
+        nome = _resolver_coluna(coluna_original, colunas)
+        coluna = _quote(nome)
+        placeholders = ", ".join("?" for _ in valores)
+        if parametro in FILTROS_NUMERICOS:
+            # Coluna tipada: comparação direta (usa o índice); texto: TRY_CAST
+            expressao = coluna if nome in numericas else f"TRY_CAST({coluna} AS FLOAT)"
+            if valores:
+                where.append(f"{expressao} IN ({placeholders})")
+                params.extend(_numeros(parametro, valores))
+            for operador, limite in faixa:
+                where.append(f"{expressao} {operador} ?")
+                params.append(limite)
+        else:
+            where.append(f"{coluna} IN ({placeholders})")
+            params.extend(valores)
+        filtros[parametro] = valores + [f"{operador}{limite:g}" for operador, limite in faixa]
+
+    filtro_sql = f" WHERE {' AND '.join(where)}" if where else ""
+    count_sql = f"SELECT COUNT(*) FROM {TABLE_NAME}{filtro_sql}"
+    count_params = list(params)
+
+    projecao = ", ".join(_quote(c) for c in selecionadas)
+    keyset = tem_id and page is None
+    if keyset:
+        pagina_where = list(where)
+        pagina_params = list(params)
+        if after is not None:
+            pagina_where.append(f"{_quote(ID_COLUMN)} > ?")
+            pagina_params.append(after)
+        pagina_filtro = f" WHERE {' AND '.join(pagina_where)}" if pagina_where else ""
+        top = f"TOP ({limit}) " if limit is not None else ""
+        sql = (f"SELECT {top}{projecao} FROM {TABLE_NAME}{pagina_filtro} "
+               f"ORDER BY {_quote(ID_COLUMN)}")
+        params = pagina_params
+    else:
+        if after is not None:
+            raise ParametroInvalido("Parâmetro 'after' requer a coluna id (reimporte a tabela)")
+        ordem = _quote(ID_COLUMN) if tem_id else "(SELECT NULL)"
+        sql = f"SELECT {projecao} FROM {TABLE_NAME}{filtro_sql}"
+        if limit is not None:
+            offset = ((page or 1) - 1) * limit
+            sql += f" ORDER BY {ordem} OFFSET {offset} ROWS FETCH NEXT {limit} ROWS ONLY"
+
+    return ConsultaMust(sql=sql, params=params, count_sql=count_sql, count_params=count_params,
+                        colunas=selecionadas, limit=limit, keyset=keyset, filtros=filtros)
+
+
+def executar_consulta(conn, consulta: ConsultaMust) -> Dict[str, Any]:
+    """
+    Executa a página e a contagem na mesma conexão
+
+    Returns:
+        {'linhas': [dict, ...], 'total': int, 'proximo': cursor ou None}
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(consulta.count_sql, consulta.count_params)
+        total = cursor.fetchone()[0]
+
+        cursor.execute(consulta.sql, consulta.params)
+        colunas = [col[0] for col in cursor.description]
+        linhas = [dict(zip(colunas, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+    return {'linhas': linhas, 'total': total, 'proximo': consulta.proximo_cursor(linhas)}
+
+
+# ----------------------------------------------------------------------
+# Cache de respostas e ETags
+# ----------------------------------------------------------------------
+def etag_conteudo(conteudo: bytes) -> str:
+    """ETag forte (hash do conteúdo), sem as aspas"""
+    return hashlib.sha256(conteudo).hexdigest()[:32]
+
+
+def chave_requisicao(args: Mapping[str, str]) -> Tuple[Tuple[str, str], ...]:
+    """Query string normalizada (ordem dos parâmetros não importa)"""
+    itens = args.items(multi=True) if hasattr(args, 'getlist') else args.items()
+    return tuple(sorted((str(k), str(v)) for k, v in itens))
+
+
+@dataclass
+class RespostaCacheada:
+    corpo: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+class CacheRespostas:
+    """
+    Cache LRU em memória das respostas de /api/data, por versão dos dados
+
+    A chave inclui a versão do marcador: quando o import_data.py grava uma
+    nova versão, as entradas antigas deixam de ser encontradas (e são
+    descartadas na próxima gravação).
+    """
+
+    def __init__(self, max_itens: int = 256):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[Tuple, RespostaCacheada]" = OrderedDict()
+        self._versao = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, versao: str, chave) -> Optional[RespostaCacheada]:
+        with self._lock:
+            item = self._itens.get((versao, chave))
+            if item is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end((versao, chave))
+            self.hits += 1
+            return item
+
+    def put(self, versao: str, chave, corpo: bytes, headers: Dict[str, str]) -> RespostaCacheada:
+        # X-Total-Count / X-Next-Cursor fazem parte da resposta: entram no ETag
+        assinatura = corpo + repr(sorted(headers.items())).encode('utf-8')
+        item = RespostaCacheada(corpo=corpo, etag=etag_conteudo(assinatura), headers=dict(headers))
+        with self._lock:
+            if versao != self._versao:
+                self._itens.clear()
+                self._versao = versao
+            self._itens[(versao, chave)] = item
+            self._itens.move_to_end((versao, chave))
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'itens': len(self._itens), 'hits': self.hits, 'misses': self.misses}
+
+
+_etags_arquivos: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_etags_lock = threading.Lock()
+
+
+def etag_arquivo(caminho: str) -> Optional[str]:
+    """ETag forte do arquivo (hash do conteúdo), recalculado só quando mtime/tamanho mudam"""
+    try:
+        stat = os.stat(caminho)
+    except OSError:
+        return None
+    assinatura = (stat.st_mtime_ns, stat.st_size)
+    with _etags_lock:
+        atual = _etags_arquivos.get(caminho)
+        if atual and atual[0] == assinatura:
+            return atual[1]
+
+    digest = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            digest.update(bloco)
+    etag = digest.hexdigest()[:32]
+    with _etags_lock:
+        _etags_arquivos[caminho] = (assinatura, etag)
+    return etag
+
+
+# ----------------------------------------------------------------------
+# Streaming (fetchmany → JSON array ou NDJSON, bloco a bloco)
+# ----------------------------------------------------------------------
+def iterar_blocos(cursor, tamanho: int = FETCHMANY_TAMANHO) -> Iterator[List[Dict[str, Any]]]:
+    """Blocos de até `tamanho` linhas (dicts) lidos com fetchmany"""
+    colunas = [col[0] for col in cursor.description]
+    while True:
+        rows = cursor.fetchmany(tamanho)
+        if not rows:
+            return
+        yield [dict(zip(colunas, row)) for row in rows]
+
+
+def codificar_stream(blocos: Iterator[List[Dict[str, Any]]], dumps: Callable[[Any], str],
+                     ndjson: bool = False) -> Iterator[bytes]:
+    """
+    Codifica os blocos incrementalmente: um pedaço de bytes por bloco
+
+    JSON: '[' + linhas separadas por ',' + ']' (um array válido, mesmo vazio)
+    NDJSON: uma linha JSON por registro, terminada em '\\n'
+    """
+    if ndjson:
+        for bloco in blocos:
+            yield "".join(f"{dumps(linha)}\n" for linha in bloco).encode('utf-8')
+        return
+
+    yield b"["
+    primeiro = True
+    for bloco in blocos:
+        pedaco = ",".join(dumps(linha) for linha in bloco)
+        yield (pedaco if primeiro else "," + pedaco).encode('utf-8')
+        primeiro = False
+    yield b"]"
+
+
+class StreamConsulta:
+    """
+    Corpo da resposta em streaming: itera os bytes e libera cursor e conexão
+    em close() — que o servidor WSGI sempre chama, inclusive quando o
+    cliente desconecta antes do primeiro bloco.
+    """
+
+    def __init__(self, conn, cursor, dumps: Callable[[Any], str], ndjson: bool, tamanho: int,
+                 liberar: Optional[Callable[[], None]] = None):
+        self._conn = conn
+        self._cursor = cursor
+        self._liberar = liberar or conn.close
+        self._dumps = dumps
+        self._ndjson = ndjson
+        self._tamanho = tamanho
+
+    def __iter__(self) -> Iterator[bytes]:
+        return codificar_stream(iterar_blocos(self._cursor, self._tamanho), self._dumps, self._ndjson)
+
+    def close(self) -> None:
+        if self._cursor is not None:
+            try:
+                self._cursor.close()
+            finally:
+                self._cursor = None
+                self._liberar()
+
+
+def abrir_stream(conn, consulta: ConsultaMust, dumps: Callable[[Any], str], ndjson: bool = False,
+                 tamanho: int = FETCHMANY_TAMANHO,
+                 liberar: Optional[Callable[[], None]] = None) -> Tuple[int, StreamConsulta]:
+    """
+    Executa a contagem e abre o cursor da consulta principal
+
+    Args:
+        liberar: Chamado no fim do stream no lugar de conn.close()
+            (ex.: devolver a conexão ao pool)
+
+    Returns:
+        (total, StreamConsulta). A partir daqui a conexão pertence ao stream.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(consulta.count_sql, consulta.count_params)
+        total = cursor.fetchone()[0]
+        cursor.execute(consulta.sql, consulta.params)
+    except Exception:
+        cursor.close()
+        raise
+    return total, StreamConsulta(conn, cursor, dumps, ndjson, tamanho, liberar)
@@ -1,7 +1,16 @@
 import re
+import sys
+import time
+import unicodedata
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Cache colunar das planilhas (db/cache_excel.py): evita reabrir os .xlsx com openpyxl a cada execução
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'db'))
+from cache_excel import ler_excel
 
 def substituir_aba_excel(df_novo, caminho_arquivo, nome_aba, engine='openpyxl'):
     """
@@ -74,104 +83,195 @@ def extrair_empresa(nome_arquivo: str) -> str:
     empresa_limpa = re.sub(r"[_\s]+", " ", empresa_limpa).strip()
     return empresa_limpa.upper() if empresa_limpa else "DESCONHECIDA"
 
-def consolidar_anotacoes(diretorio: str):
-    """
-    Consolida os arquivos de anotações exportados em um único Excel.
-    - Só concatena arquivos com colunas iguais.
-    - Filtra num_tabela = 1 (quando existir).
-    - Extrai nome da empresa do arquivo.
-    """
-    arquivos = [f for f in os.listdir(diretorio) if f.endswith(".xlsx") and f.startswith("saida_anotacoes")]
-    
-    if not arquivos:
-        print("⚠️ Nenhum arquivo encontrado para consolidar.")
-        return
-    
-    dataframes = []
-    empresas = set()
-    colunas_padrao = None
+# Leitura em paralelo: processos (o parse do openpyxl é CPU) com teto de workers
+MAX_WORKERS_PADRAO = 8
 
-    for arq in arquivos:
-        caminho = os.path.join(diretorio, arq)
-        try:
-            df = pd.read_excel(caminho)
+# Schema canônico das anotações (ordem de saída). Colunas fora dele são
+# mantidas depois das canônicas, na ordem em que aparecem pela primeira vez.
+COLUNAS_CANONICAS = ["Num_Tabela", "Cód ONS", "Anotacao"]
 
-            # Filtra apenas num_tabela = 1
-            if "num_tabela" in df.columns:
-                df = df[df["num_tabela"] == 1]
+# Apelidos conhecidos → nome canônico. Variações só de caixa, acento ou
+# separador (num_tabela, NUM TABELA, Cod_ONS, Anotação...) já são resolvidas
+# por _chave_coluna; aqui ficam os nomes realmente diferentes.
+ALIASES_COLUNAS = {
+    "Tabela": "Num_Tabela",
+    "N Tabela": "Num_Tabela",
+    "Codigo ONS": "Cód ONS",
+    "Código ONS": "Cód ONS",
+    "Cod. ONS": "Cód ONS",
+    "Anotacoes": "Anotacao",
+    "Observacao": "Anotacao",
+}
 
-            # Garante colunas iguais
-            if colunas_padrao is None:
-                colunas_padrao = list(df.columns)
-                print(f"📊 Colunas padrão definidas a partir de {arq}: {colunas_padrao}")
-            elif list(df.columns) != colunas_padrao:
-                print(f"⏭️ Ignorando {arq} pois as colunas não batem com o padrão.")
-                continue
+# Colunas da aba "Relatorio" (uma linha por arquivo lido)
+COLUNAS_RELATORIO = ["Arquivo", "Empresa", "Status", "Linhas", "Segundos", "Ajustes de colunas", "Erro"]
 
-            # Extrai empresa
-            empresa = extrair_empresa(arq)
-            df.insert(0, "EMPRESA", empresa)  # força ser a primeira coluna
-            df["Arquivo_Origem"] = arq
-            empresas.add(empresa)
 
-            dataframes.append(df)
+def _chave_coluna(nome) -> str:
+    """'Num_Tabela', 'num tabela', 'NUM-TABELA' → 'numtabela' (sem acento, caixa ou separador)"""
+    texto = unicodedata.normalize("NFKD", str(nome))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"[\s_\-.]+", "", texto).casefold()
 
-        except Exception as e:
-            print(f"❌ Erro ao ler {arq}: {e}")
 
-    if not dataframes:
-        print("⚠️ Nenhum dado válido para consolidar.")
-        return
+_MAPA_COLUNAS = {_chave_coluna(c): c for c in COLUNAS_CANONICAS}
+_MAPA_COLUNAS.update({_chave_coluna(alias): canonica for alias, canonica in ALIASES_COLUNAS.items()})
 
-    df_final = pd.concat(dataframes, ignore_index=True)
 
-    # Exporta para Excel
-    caminho_saida = os.path.join(diretorio, "export_notes_MUST_tables.xlsx")
-    with pd.ExcelWriter(caminho_saida, engine="openpyxl") as writer:
-        df_final.to_excel(writer, sheet_name="Notas Consolidada", index=False)
-        pd.DataFrame({"Empresas": sorted(empresas)}).to_excel(writer, sheet_name="Empresas", index=False)
-
-    print(f"✅ Consolidação concluída: {caminho_saida}")
-    print(f"🔎 {len(empresas)} empresas identificadas: {sorted(empresas)}")
+def alinhar_colunas(df: pd.DataFrame):
+    """
+    Renomeia as colunas do arquivo para o schema canônico
 
-# Caminho da pasta onde estão os arquivos de anotações
-diretorio_anotacoes = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\anotacoes_extraidas"
+    Colunas que viram o mesmo nome canônico (ex.: 'num_tabela' e 'Num_Tabela'
+    no mesmo arquivo) são unidas: vale o primeiro valor não nulo.
 
-# Executar consolidação de anotações
-consolidar_anotacoes(diretorio_anotacoes)
+    Returns:
+        (DataFrame renomeado, lista de ajustes feitos)
+    """
+    ajustes = []
+    nomes = []
+    for coluna in df.columns:
+        canonica = _MAPA_COLUNAS.get(_chave_coluna(coluna), coluna)
+        if canonica != coluna:
+            ajustes.append(f"{coluna} → {canonica}")
+        nomes.append(canonica)
+    df = df.set_axis(nomes, axis=1)
+
+    if df.columns.has_duplicates:
+        unidas = {}
+        for nome in dict.fromkeys(nomes):
+            bloco = df.loc[:, df.columns == nome]
+            unidas[nome] = bloco.iloc[:, 0] if bloco.shape[1] == 1 else bloco.bfill(axis=1).iloc[:, 0]
+            if bloco.shape[1] > 1:
+                ajustes.append(f"{bloco.shape[1]} colunas unidas em {nome}")
+        df = pd.DataFrame(unidas, index=df.index)
+    return df, ajustes
+
+
+def ler_arquivo_anotacoes(caminho: str) -> dict:
+    """
+    Lê e normaliza um arquivo de anotações (executado nos processos do pool)
 
+    As colunas são alinhadas ao schema canônico e o filtro Num_Tabela = 1 é
+    aplicado logo após a leitura, então só as linhas úteis voltam para o
+    processo principal.
 
-# -*- coding: utf-8 -*-
-import pandas as pd
-import re
+    Returns:
+        {'arquivo', 'df', 'colunas', 'ajustes', 'linhas', 'segundos', 'erro'}
+    """
+    arq = os.path.basename(caminho)
+    inicio = time.perf_counter()
+    resultado = {'arquivo': arq, 'df': None, 'colunas': None, 'ajustes': [],
+                 'linhas': 0, 'segundos': 0.0, 'erro': None}
+    try:
+        df, resultado['ajustes'] = alinhar_colunas(ler_excel(caminho))
 
-# -----------------------------
-# Caminho do arquivo Excel
-# -----------------------------
-path = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\database\PROTOTIPO_database.xlsx"
-path = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\tabelas_extraidas\database_must.xlsx"
+        # Filtra apenas Num_Tabela = 1
+        if "Num_Tabela" in df.columns:
+            df = df[df["Num_Tabela"] == 1]
 
-# -----------------------------
-# Leitura das planilhas
-# -----------------------------
-planilha_must = pd.read_excel(path, sheet_name="Tabelas Consolidada")
+        resultado['colunas'] = list(df.columns)
+        resultado['df'] = df
+        resultado['linhas'] = len(df)
+    except Exception as e:
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+    resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resultado
 
-# Exibe as primeiras linhas da planilha MUST
-#df_tables = pd.read_excel(path, sheet_name="ANOTAÇÕES")
 
-# Carrega a planilha MUST
-df_notes = pd.read_excel(r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\anotacoes_extraidas\export_notes_MUST_tables.xlsx")
+def _coluna_categorica(valores, tamanhos) -> pd.Categorical:
+    """Um valor por arquivo repetido pelo nº de linhas, direto como códigos (sem strings por linha)"""
+    categorias = sorted(set(valores))
+    posicao = {valor: i for i, valor in enumerate(categorias)}
+    codigos = np.repeat([posicao[v] for v in valores], tamanhos)
+    return pd.Categorical.from_codes(codigos, categories=categorias)
 
 
-# Quando estiver pronto para substituir a aba:
-substituir_aba_excel(df_notes, path, "TABELAS")
+def consolidar_anotacoes(diretorio: str, max_workers: int = None):
+    """
+    Consolida os arquivos de anotações exportados em um único Excel.
+    - Lê os arquivos em paralelo (ProcessPoolExecutor, no máximo `max_workers`).
+    - Alinha as colunas ao schema canônico (COLUNAS_CANONICAS + ALIASES_COLUNAS);
+      colunas extras entram na união e as que faltam ficam vazias.
+    - Filtra Num_Tabela = 1 (quando existir).
+    - Extrai nome da empresa do arquivo (EMPRESA e Arquivo_Origem como category).
+    - Tempo, linhas, ajustes de colunas e falhas de cada arquivo vão para a aba "Relatorio"
+      (gravada mesmo quando nenhum arquivo pôde ser lido).
+
+    Retorna sempre (df_final, df_relatorio); df_final vazio quando não há dados válidos.
+    """
+    arquivos = sorted(f for f in os.listdir(diretorio) if f.endswith(".xlsx") and f.startswith("saida_anotacoes"))
+    caminho_saida = os.path.join(diretorio, "export_notes_MUST_tables.xlsx")
+    df_vazio = pd.DataFrame(columns=["EMPRESA"] + COLUNAS_CANONICAS + ["Arquivo_Origem"])
 
-#  Verificar se foi apenas a tabela 1 no excel database
-print(df_notes.head(5))
-print(df_notes.shape)
-df_notes["EMPRESA"].value_counts()
+    if not arquivos:
+        print("⚠️ Nenhum arquivo encontrado para consolidar.")
+        return df_vazio, pd.DataFrame(columns=COLUNAS_RELATORIO)
+
+    caminhos = [os.path.join(diretorio, arq) for arq in arquivos]
+    workers = max(1, min(max_workers or MAX_WORKERS_PADRAO, os.cpu_count() or 1, len(caminhos)))
+    inicio = time.perf_counter()
+    if workers == 1:
+        resultados = [ler_arquivo_anotacoes(caminho) for caminho in caminhos]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map mantém a ordem dos arquivos (a ordem das colunas extras não depende de quem termina antes)
+            resultados = list(executor.map(ler_arquivo_anotacoes, caminhos))
+
+    validos = [r for r in resultados if r['erro'] is None]
+    colunas = list(COLUNAS_CANONICAS)
+    for resultado in validos:
+        colunas += [c for c in resultado['colunas'] if c not in colunas]
+
+    relatorio = []
+    for resultado in resultados:
+        ajustes = list(resultado['ajustes'])
+        if resultado['erro'] is None:
+            faltando = [c for c in colunas if c not in resultado['colunas']]
+            if faltando:
+                ajustes.append(f"ausentes (vazias): {', '.join(faltando)}")
+        relatorio.append({
+            "Arquivo": resultado['arquivo'],
+            "Empresa": extrair_empresa(resultado['arquivo']),
+            "Status": "erro" if resultado['erro'] else "ok",
+            "Linhas": resultado['linhas'],
+            "Segundos": resultado['segundos'],
+            "Ajustes de colunas": "; ".join(ajustes),
+            "Erro": resultado['erro'] or "",
+        })
+    df_relatorio = pd.DataFrame(relatorio, columns=COLUNAS_RELATORIO)
+
+    if not validos:
+        # Só a aba Relatorio é (re)gravada: a consolidação anterior não é
+        # substituída por uma planilha vazia
+        modo = {"mode": "a", "if_sheet_exists": "replace"} if os.path.exists(caminho_saida) else {}
+        with pd.ExcelWriter(caminho_saida, engine="openpyxl", **modo) as writer:
+            df_relatorio.to_excel(writer, sheet_name="Relatorio", index=False)
+        print(f"⚠️ Nenhum dado válido para consolidar: {len(resultados)} arquivos com erro "
+              f"(detalhes na aba 'Relatorio' de {caminho_saida})")
+        return df_vazio, df_relatorio
+
+    # Uma única concatenação, todos os arquivos já no schema alinhado
+    df_final = pd.concat([r['df'].reindex(columns=colunas) for r in validos], ignore_index=True)
+    tamanhos = [len(r['df']) for r in validos]
+    empresas_por_arquivo = [extrair_empresa(r['arquivo']) for r in validos]
+    df_final.insert(0, "EMPRESA", _coluna_categorica(empresas_por_arquivo, tamanhos))  # força ser a primeira coluna
+    df_final["Arquivo_Origem"] = _coluna_categorica([r['arquivo'] for r in validos], tamanhos)
+    empresas = set(empresas_por_arquivo)
 
+    # Exporta para Excel
+    with pd.ExcelWriter(caminho_saida, engine="openpyxl") as writer:
+        df_final.to_excel(writer, sheet_name="Notas Consolidada", index=False)
+        pd.DataFrame({"Empresas": sorted(empresas)}).to_excel(writer, sheet_name="Empresas", index=False)
+        df_relatorio.to_excel(writer, sheet_name="Relatorio", index=False)
 
+    ajustados = int((df_relatorio["Ajustes de colunas"] != "").sum())
+    print(f"✅ Consolidação concluída: {caminho_saida}")
+    print(f"📊 {len(arquivos)} arquivos em {time.perf_counter() - inicio:.1f}s com {workers} processos: "
+          f"{len(validos)} ok ({ajustados} com colunas ajustadas), {len(resultados) - len(validos)} com erro "
+          f"(detalhes na aba 'Relatorio')")
+    print(f"🔎 {len(empresas)} empresas identificadas: {sorted(empresas)}")
+    return df_final, df_relatorio
 
 
 # -----------------------------
@@ -212,51 +312,91 @@ def normalizar_cod_ons(valor):
     return texto
 
 
-# -----------------------------
-# Aplicando a limpeza nos códigos ONS
-# -----------------------------
-# Padronizar códigos ONS
-planilha_must["Cód ONS"] = planilha_must["Cód ONS"].apply(extrair_cod_ons).str.upper().str.strip()
-df_notes["Cód ONS"] = df_notes["Cód ONS"].apply(extrair_cod_ons).str.upper().str.strip()
+# Execução do script: protegido por __main__ porque os processos do pool
+# (spawn no Windows) reimportam este módulo
+if __name__ == "__main__":
+    # Caminho da pasta onde estão os arquivos de anotações
+    diretorio_anotacoes = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\anotacoes_extraidas"
 
-# Aplica normalização ao COD ONS
-#planilha_must["Cód ONS"] = planilha_must["Cód ONS"].apply(normalizar_cod_ons)
-#df_notes["Cód ONS"] = df_notes["Cód ONS"].apply(normalizar_cod_ons)
+    # Executar consolidação de anotações
+    consolidar_anotacoes(diretorio_anotacoes)
 
 
-print("Primeiras linhas das anotações após limpeza do código ONS:")
-df_notes_filtrado = df_notes[df_notes["Num_Tabela"] == 1].reset_index(drop=True) # Filtra apenas as anotações da Tabela 1
-print(df_notes_filtrado.shape)
-print(df_notes_filtrado.head(5))
 
-# -----------------------------
-# Merge das tabelas com as anotações
-# -----------------------------
-tabela = planilha_must.merge(
-    df_notes_filtrado[["Cód ONS", "Anotacao"]],
-    on="Cód ONS",
-    how="left"
-)
+    # -----------------------------
+    # Caminho do arquivo Excel
+    # -----------------------------
+    path = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\database\PROTOTIPO_database.xlsx"
+    path = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\tabelas_extraidas\database_must.xlsx"
+
+    # -----------------------------
+    # Leitura das planilhas
+    # -----------------------------
+    planilha_must = ler_excel(path, sheet_name="Tabelas Consolidada")
+
+    # Exibe as primeiras linhas da planilha MUST
+    #df_tables = pd.read_excel(path, sheet_name="ANOTAÇÕES")
+
+    # Carrega a planilha MUST
+    df_notes = ler_excel(r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\anotacoes_extraidas\export_notes_MUST_tables.xlsx")
+
+
+    # Quando estiver pronto para substituir a aba:
+    substituir_aba_excel(df_notes, path, "TABELAS")
+
+    #  Verificar se foi apenas a tabela 1 no excel database
+    print(df_notes.head(5))
+    print(df_notes.shape)
+    df_notes["EMPRESA"].value_counts()
+
+
+
+
+    # -----------------------------
+    # Aplicando a limpeza nos códigos ONS
+    # -----------------------------
+    # Padronizar códigos ONS
+    planilha_must["Cód ONS"] = planilha_must["Cód ONS"].apply(extrair_cod_ons).str.upper().str.strip()
+    df_notes["Cód ONS"] = df_notes["Cód ONS"].apply(extrair_cod_ons).str.upper().str.strip()
+
+    # Aplica normalização ao COD ONS
+    #planilha_must["Cód ONS"] = planilha_must["Cód ONS"].apply(normalizar_cod_ons)
+    #df_notes["Cód ONS"] = df_notes["Cód ONS"].apply(normalizar_cod_ons)
+
+
+    print("Primeiras linhas das anotações após limpeza do código ONS:")
+    df_notes_filtrado = df_notes[df_notes["Num_Tabela"] == 1].reset_index(drop=True) # Filtra apenas as anotações da Tabela 1
+    print(df_notes_filtrado.shape)
+    print(df_notes_filtrado.head(5))
+
+    # -----------------------------
+    # Merge das tabelas com as anotações
+    # -----------------------------
+    tabela = planilha_must.merge(
+        df_notes_filtrado[["Cód ONS", "Anotacao"]],
+        on="Cód ONS",
+        how="left"
+    )
 
-# Exibe resultado final
-print("\n\nTabela MUST consolidada:")
-#tabela = tabela[tabela["num_tabela"] == 1].reset_index(drop=True) # Filtra apenas as anotações da Tabela 1
+    # Exibe resultado final
+    print("\n\nTabela MUST consolidada:")
+    #tabela = tabela[tabela["num_tabela"] == 1].reset_index(drop=True) # Filtra apenas as anotações da Tabela 1
 
-print(tabela.shape)
-print(tabela.columns)
-print(tabela)
+    print(tabela.shape)
+    print(tabela.columns)
+    print(tabela)
 
 
 
-tabela.to_excel(
-    r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\database\must_tables_PDF_notes_merged.xlsx",
-    index=False
-)
+    tabela.to_excel(
+        r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\AUTOMACÕES ONS\arquivos\database\must_tables_PDF_notes_merged.xlsx",
+        index=False
+    )
 
 
 
-tabela.to_json(
-    r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\GitHub\dashboard-website-template\dashboard_must_webiste\must_tables_PDF_notes_merged.json",
-    orient="records",
-    force_ascii=False
-)
+    tabela.to_json(
+        r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\GitHub\dashboard-website-template\dashboard_must_webiste\must_tables_PDF_notes_merged.json",
+        orient="records",
+        force_ascii=False
+    )